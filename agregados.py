@@ -0,0 +1,76 @@
+"""Verificação dos totais de recompensa mantidos pelos triggers (migração 004).
+
+Recalcula do zero a partir de Pirata e compara com o que está gravado em
+Bando.RecompensaTotalBando e Alianca.RecompensaTotalAlianca.
+
+Uso: python agregados.py [--corrigir]
+
+Sem --corrigir, só relata e termina com código 1 se houver divergência.
+"""
+import argparse
+import sys
+
+import migracoes
+
+# Bandos com total gravado diferente do recalculado
+DIVERGENCIAS_BANDO = f"""
+    SELECT b.NomeBando, b.RecompensaTotalBando AS gravado, r.calculado
+    FROM Bando b
+    JOIN ({migracoes.BANDOS_RECALCULADOS}) r ON r.NomeBando = b.NomeBando
+    WHERE b.RecompensaTotalBando IS DISTINCT FROM r.calculado
+    ORDER BY b.NomeBando;
+"""
+
+# A aliança é comparada com a soma recalculada dos bandos, não com a gravada,
+# para que uma divergência em um bando também apareça na aliança dele
+DIVERGENCIAS_ALIANCA = f"""
+    SELECT a.NomeAlianca, a.RecompensaTotalAlianca AS gravado, COALESCE(SUM(r.calculado), 0) AS calculado
+    FROM Alianca a
+    LEFT JOIN ({migracoes.BANDOS_RECALCULADOS}) r ON r.NomeAlianca = a.NomeAlianca
+    GROUP BY a.NomeAlianca, a.RecompensaTotalAlianca
+    HAVING a.RecompensaTotalAlianca IS DISTINCT FROM COALESCE(SUM(r.calculado), 0)
+    ORDER BY a.NomeAlianca;
+"""
+
+
+def verificar(cur):
+    """Devolve (divergências de bandos, divergências de alianças) como listas de tuplas."""
+    cur.execute(DIVERGENCIAS_BANDO)
+    bandos = cur.fetchall()
+    cur.execute(DIVERGENCIAS_ALIANCA)
+    aliancas = cur.fetchall()
+    return bandos, aliancas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corrigir", action="store_true", help="regrava os totais recalculados")
+    args = parser.parse_args()
+
+    conn = migracoes.conectar()
+    try:
+        with conn.cursor() as cur:
+            bandos, aliancas = verificar(cur)
+            for nome, gravado, calculado in bandos:
+                print(f"Bando {nome}: gravado {gravado}, recalculado {calculado}")
+            for nome, gravado, calculado in aliancas:
+                print(f"Aliança {nome}: gravado {gravado}, recalculado {calculado}")
+            print(f"{len(bandos)} bando(s) e {len(aliancas)} aliança(s) com divergência.")
+
+            if args.corrigir and (bandos or aliancas):
+                conn.autocommit = False
+                # Trava e recálculo na mesma transação, como na migração 004
+                cur.execute(migracoes.TRAVAR_TOTAIS)
+                cur.execute(migracoes.RECALCULAR_TOTAIS)
+                conn.commit()
+                print("Totais corrigidos.")
+                return
+    finally:
+        conn.close()
+
+    if bandos or aliancas:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Aquecimento do cache: mantém prontos os resultados que toda visita usa.
+
+Na subida do processo, e de novo um pouco antes de cada entrada vencer (ou logo
+depois de ser invalidada), uma thread de fundo recalcula as consultas
+registradas aqui em um pool de threads. Assim a primeira visita depois de um
+deploy ou de um vencimento de TTL não paga pelas consultas. Com cache
+compartilhado (SQLite/Redis), a réplica que encontra lá um resultado recente de
+outra adota esse resultado em vez de recalcular.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import consultas
+import dados
+
+THREADS = int(os.environ.get("AQUECIMENTO_THREADS", "4"))
+# Quanto tempo antes do vencimento a entrada é recalculada
+MARGEM_SEGUNDOS = float(os.environ.get("AQUECIMENTO_MARGEM_SECONDS", "60"))
+# De quanto em quanto tempo o cache é conferido
+INTERVALO_SEGUNDOS = 5
+# Espera depois de uma falha antes de tentar de novo a mesma consulta
+ESPERA_APOS_ERRO = 30
+
+# Tamanho de página padrão do seletor "Linhas por página" do app
+TAMANHO_PAGINA_PADRAO = 100
+
+
+def pedidos_padrao():
+    """Listas dos filtros, sidebar, estado inicial da aba Consultas e todas as abas de estatísticas."""
+    pedidos = [
+        dados.pedido_consulta(nome)
+        for nome in ("especies", "tipos_fruta", "aliancas", "tipos_poneglyph", "areas", "snapshot_mundo")
+    ]
+    pedidos += [
+        dados.pedido_pagina("piratas_por_bando_pagina", None, TAMANHO_PAGINA_PADRAO, min_recompensa=0),
+        dados.pedido_pagina(
+            "personagens_fruta_pagina", None, TAMANHO_PAGINA_PADRAO, especie=None, tipo_fruta=None
+        ),
+        dados.pedido_consulta("capitaes", alianca=None),
+        dados.pedido_consulta("periculosidade", num_membros=3, alianca=None, min_perigo=0),
+        dados.pedido_consulta("poneglyphs", tipo=None, area=None),
+    ]
+    pedidos += [dados.pedido_lote(nome) for nome in consultas.LOTES]
+    return pedidos
+
+
+class Aquecedor:
+    def __init__(self, pedidos, threads=THREADS, margem=MARGEM_SEGUNDOS):
+        self.pedidos = list(pedidos)
+        self.margem = margem
+        self.parar = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="aquecimento")
+        self._em_andamento = set()
+        self._nao_antes_de = {}
+        self._lock = threading.Lock()
+
+    def _vencendo(self, entrada, agora):
+        return entrada is None or entrada.expira_em - self.margem <= agora
+
+    def _atualizar(self, pedido):
+        try:
+            # Antes de ir ao banco, confere o backend compartilhado (SQLite/Redis): se
+            # outra réplica já atualizou, a entrada dela vem para a memória local
+            entrada = dados.cache.obter(pedido.chave, margem=self.margem)
+            if self._vencendo(entrada, time.time()):
+                dados.atualizar(pedido)
+        except Exception as exc:
+            print(f"[aquecimento] falha em {pedido.metrica}: {exc}")
+            with self._lock:
+                self._nao_antes_de[pedido.chave] = time.time() + ESPERA_APOS_ERRO
+        finally:
+            with self._lock:
+                self._em_andamento.discard(pedido.chave)
+
+    def verificar(self):
+        """Dispara a atualização das entradas ausentes ou perto de vencer."""
+        agora = time.time()
+        for pedido in self.pedidos:
+            # Aqui só a memória local, fora do lock; o backend compartilhado (com
+            # I/O) é consultado na thread da atualização
+            if not self._vencendo(dados.cache.local.obter(pedido.chave), agora):
+                continue
+            with self._lock:
+                if pedido.chave in self._em_andamento or self._nao_antes_de.get(pedido.chave, 0) > agora:
+                    continue
+                self._em_andamento.add(pedido.chave)
+            self._executor.submit(self._atualizar, pedido)
+
+    def _loop(self):
+        while not self.parar.is_set():
+            try:
+                self.verificar()
+            except Exception as exc:  # a thread não pode morrer por uma falha pontual
+                print(f"[aquecimento] {exc}")
+            self.parar.wait(INTERVALO_SEGUNDOS)
+
+    def iniciar(self):
+        thread = threading.Thread(target=self._loop, name="aquecimento", daemon=True)
+        thread.start()
+        return thread
+
+
+def iniciar():
+    aquecedor = Aquecedor(pedidos_padrao())
+    aquecedor.iniciar()
+    return aquecedor
@@ -0,0 +1,233 @@
+"""Execução concorrente das consultas do registro com asyncio.
+
+run_queries({...}) dispara as consultas ao mesmo tempo em conexões assíncronas
+do psycopg2 (async_=1) e devolve os DataFrames juntos: o tempo total fica
+próximo ao da consulta mais lenta, não ao da soma. As conexões assíncronas
+abertas no processo (em uso ou ociosas) são no máximo LIMITE, somadas a todas
+as chamadas e threads; com o pool de db.py, o processo abre no máximo
+DB_POOL_MAX + DB_ASYNC_LIMITE conexões.
+
+COPY não funciona em conexões assíncronas, então as consultas colunares vão
+para um pool de threads usando o caminho síncrono de db.py.
+
+Se a execução que pediu as consultas for substituída (db.execucao_superada),
+as que ainda estão no servidor são canceladas e run_queries lança
+db.ConsultaCancelada.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+from psycopg2 import extensions
+
+import consultas
+import db
+import metricas
+
+# Conexões assíncronas abertas ao mesmo tempo no processo
+LIMITE = int(os.environ.get("DB_ASYNC_LIMITE", str(db.POOL_MAX)))
+
+# Uma vaga por conexão assíncrona aberta, ocupada do connect ao close; vale para
+# todos os loops (cada chamada de run_queries roda o seu, em threads diferentes)
+_vagas = threading.BoundedSemaphore(LIMITE)
+# Conexões assíncronas ociosas, reaproveitadas entre chamadas (cada uma com sua vaga)
+_livres = []
+_livres_lock = threading.Lock()
+# Threads para o que não roda nas conexões assíncronas (COPY do caminho colunar)
+_executor = ThreadPoolExecutor(max_workers=db.POOL_MAX, thread_name_prefix="db-colunar")
+
+
+async def _esperar(conn):
+    """Equivalente assíncrono do wait_select: cede o loop até o socket ficar pronto."""
+    loop = asyncio.get_running_loop()
+    while True:
+        estado = conn.poll()
+        if estado == extensions.POLL_OK:
+            return
+        pronto = loop.create_future()
+        fd = conn.fileno()
+
+        def avisar():
+            if not pronto.done():
+                pronto.set_result(None)
+
+        if estado == extensions.POLL_READ:
+            loop.add_reader(fd, avisar)
+            remover = loop.remove_reader
+        elif estado == extensions.POLL_WRITE:
+            loop.add_writer(fd, avisar)
+            remover = loop.remove_writer
+        else:
+            raise psycopg2.OperationalError(f"estado inesperado do poll(): {estado}")
+        try:
+            await pronto
+        finally:
+            remover(fd)
+
+
+def _fechar(conn):
+    conn.close()
+    _vagas.release()
+
+
+async def _abrir():
+    while True:
+        with _livres_lock:
+            while _livres:
+                conn = _livres.pop()
+                if not conn.closed:
+                    return conn
+                # Caiu enquanto estava ociosa: a vaga dela fica livre
+                _vagas.release()
+        # Sem bloquear o loop: as vagas são liberadas por outras threads
+        if _vagas.acquire(blocking=False):
+            break
+        await asyncio.sleep(db.INTERVALO_CANCELAMENTO)
+    try:
+        conn = psycopg2.connect(db.DATABASE_URL, connection_factory=db.ConexaoDashboard, async_=1)
+    except BaseException:
+        _vagas.release()
+        raise
+    try:
+        await _esperar(conn)
+    except BaseException:
+        _fechar(conn)
+        raise
+    return conn
+
+
+def _devolver(conn, ok):
+    # Conexão que falhou ou foi interrompida no meio de uma consulta não volta;
+    # se ainda há consulta rodando, o servidor é avisado para parar antes
+    if not ok or conn.closed or conn.isexecuting():
+        if not conn.closed and conn.isexecuting():
+            try:
+                conn.cancel()
+            except psycopg2.Error:
+                pass
+        _fechar(conn)
+        return
+    with _livres_lock:
+        _livres.append(conn)
+
+
+async def _executar_sql(cur, sql, params=None):
+    cur.execute(sql, params)
+    await _esperar(cur.connection)
+
+
+async def _preparada(conn, consulta, params):
+    # Conexões assíncronas estão sempre em autocommit: PREPARE/EXECUTE como em db.run_prepared
+    valores = consulta.valores(params)
+    with conn.cursor() as cur:
+        # statement_timeout e plan_cache_mode da sessão, como em db._ajustar_sessao
+        comandos = db.comandos_sessao(conn, consulta)
+        if comandos:
+            await _executar_sql(cur, comandos)
+            db.sessao_ajustada(conn, consulta)
+        if consulta.nome not in conn.preparadas:
+            await _executar_sql(cur, f"PREPARE {consulta.nome} AS {consulta.sql_preparado()};")
+            conn.preparadas.add(consulta.nome)
+        if valores:
+            marcadores = ", ".join(["%s"] * len(valores))
+            await _executar_sql(cur, f"EXECUTE {consulta.nome} ({marcadores});", valores)
+        else:
+            await _executar_sql(cur, f"EXECUTE {consulta.nome};")
+        return db._dataframe(cur)
+
+
+async def _com_reconexao(consulta, params):
+    for tentativa in range(db.TENTATIVAS_RECONEXAO + 1):
+        conn = await _abrir()
+        ok = False
+        try:
+            df = await _preparada(conn, consulta, params)
+            ok = True
+            return df
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # Mesma regra de db._com_reconexao: só repete se a conexão caiu
+            if not conn.closed or tentativa == db.TENTATIVAS_RECONEXAO:
+                raise
+        except psycopg2.Error:
+            # Erro de SQL não estraga a conexão (autocommit): ela pode voltar ao pool
+            ok = not conn.closed
+            raise
+        finally:
+            _devolver(conn, ok)
+        await asyncio.sleep(0.1 * (tentativa + 1))
+
+
+async def _executar(consulta, params):
+    try:
+        if consulta.colunar:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(_executor, db.run_colunar, consulta, params)
+        return await _com_reconexao(consulta, params)
+    except db.erros_alternativa(consulta):
+        if consulta.alternativa is None:
+            raise
+        return await _executar(consultas.get(consulta.alternativa), params)
+
+
+async def _medir(consulta, params, limite):
+    async with limite:
+        inicio = time.perf_counter()
+        try:
+            df = await _executar(consulta, params)
+        except asyncio.CancelledError:
+            metricas.registrar_execucao(consulta.nome, time.perf_counter() - inicio, cancelada=True)
+            raise
+        except BaseException:
+            metricas.registrar_execucao(consulta.nome, time.perf_counter() - inicio, erro=True)
+            raise
+        db._registrar(consulta.nome, time.perf_counter() - inicio, df)
+        return df
+
+
+async def _run_queries(pedidos):
+    limite = asyncio.Semaphore(LIMITE)
+    chaves = list(pedidos)
+    tarefas = []
+    for chave in chaves:
+        nome, params = pedidos[chave] if isinstance(pedidos[chave], tuple) else (pedidos[chave], None)
+        tarefas.append(_medir(consultas.get(nome), params, limite))
+    todas = asyncio.gather(*tarefas)
+    # Roda na thread que pediu (asyncio.run), então a verificação funciona aqui
+    vigia = asyncio.create_task(_vigiar(todas)) if db.execucao_superada() is not None else None
+    try:
+        resultados = await todas
+    except asyncio.CancelledError:
+        if vigia is None or not vigia.done():
+            raise
+        raise db.ConsultaCancelada() from None
+    finally:
+        if vigia is not None:
+            vigia.cancel()
+    return dict(zip(chaves, resultados))
+
+
+async def _vigiar(todas):
+    while not todas.done():
+        await asyncio.sleep(db.INTERVALO_CANCELAMENTO)
+        if db.execucao_superada():
+            todas.cancel()
+            return
+
+
+def run_queries(pedidos):
+    """Executa várias consultas do registro ao mesmo tempo.
+
+    pedidos é um dict {chave: nome} ou {chave: (nome, params)}; devolve
+    {chave: DataFrame}. Se alguma consulta falhar, a exceção é propagada.
+    """
+    if not pedidos:
+        return {}
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_run_queries(pedidos))
+    # Já existe um loop rodando nesta thread: executa em outra
+    return _executor.submit(asyncio.run, _run_queries(pedidos)).result()
@@ -0,0 +1,375 @@
+"""Benchmark do dashboard sobre uma base sintética no esquema do One Piece.
+
+Uso: python benchmark.py [--piratas N] [--repeticoes R] [--reaproveitar]
+                         [--saida ARQUIVO] [--base ARQUIVO] [--tolerancia T]
+
+Gera dados sintéticos (de 10 mil a 10 milhões de piratas) no banco apontado
+por BENCH_DATABASE_URL, aplica as migrações do dashboard e mede cada consulta
+do registro pelos dois caminhos de leitura (linhas via EXECUTE e colunar via
+COPY + Arrow), além das partes do app que rodam em Python (modo em memória e
+clusters). O resultado vai para um JSON; com --base, é comparado com um
+relatório anterior e o script termina com código 1 se algo ficou mais lento
+que a tolerância.
+
+--reaproveitar  não recria as tabelas (usa os dados já gerados).
+
+ATENÇÃO: as tabelas do esquema são apagadas e recriadas em BENCH_DATABASE_URL.
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import consultas
+import db
+import explicar
+import migracoes
+
+BENCH_DATABASE_URL = os.environ.get("BENCH_DATABASE_URL")
+
+# Linhas por COPY na carga dos dados
+LOTE_COPY = 500_000
+# Diferenças menores que isso (ms) são ruído, mesmo acima da tolerância
+RUIDO_MS = 5.0
+
+AREAS = ["East Blue", "West Blue", "North Blue", "South Blue", "Grand Line", "Novo Mundo", "Calm Belt", "Red Line"]
+TIPOS_FRUTA = ["Paramecia", "Logia", "Zoan", "Zoan Mítica", "Zoan Ancestral"]
+TIPOS_PONEGLYPH = ["Histórico", "Instrução", "Road"]
+
+# Esquema reconstruído a partir das colunas que o dashboard lê
+DDL = f"""
+    DROP TABLE IF EXISTS Lista_Habilidade, Habilidade, Aparicao_em_capitulo, Localizacao_Capitulo,
+        Capitulo, Poneglyph, Navio, Filiacao_Especie, Especie, Posse_Fruta, AkumaNoMi, Marinheiro,
+        Pirata, Bando, Alianca, Personagem, Ilha, Area, dashboard_migracoes, bando_top_n CASCADE;
+    DROP MATERIALIZED VIEW IF EXISTS mv_estatisticas_mundo;
+    DROP TYPE IF EXISTS tipo_poneglyph;
+
+    CREATE TYPE tipo_poneglyph AS ENUM ({", ".join(f"'{t}'" for t in TIPOS_PONEGLYPH)});
+    CREATE TABLE Area (NomeArea TEXT PRIMARY KEY);
+    CREATE TABLE Ilha (NomeIlha TEXT PRIMARY KEY, NomeArea TEXT REFERENCES Area, Filiacao TEXT);
+    CREATE TABLE Personagem (NomePersonagem TEXT PRIMARY KEY, Alcunha TEXT);
+    CREATE TABLE Alianca (NomeAlianca TEXT PRIMARY KEY, RecompensaTotalAlianca BIGINT NOT NULL DEFAULT 0);
+    CREATE TABLE Bando (
+        NomeBando TEXT PRIMARY KEY,
+        PirataCapitao TEXT REFERENCES Personagem,
+        NomeAlianca TEXT REFERENCES Alianca,
+        RecompensaTotalBando BIGINT NOT NULL DEFAULT 0
+    );
+    CREATE TABLE Pirata (
+        NomePersonagem TEXT PRIMARY KEY REFERENCES Personagem,
+        NomeBando TEXT REFERENCES Bando,
+        Recompensa BIGINT,
+        Shichibukai BOOLEAN NOT NULL DEFAULT FALSE
+    );
+    CREATE TABLE Marinheiro (NomePersonagem TEXT PRIMARY KEY REFERENCES Personagem, Patente TEXT);
+    CREATE TABLE AkumaNoMi (NomeFruta TEXT PRIMARY KEY, TipoFruta TEXT);
+    CREATE TABLE Posse_Fruta (
+        NomePersonagem TEXT REFERENCES Personagem,
+        NomeFruta TEXT REFERENCES AkumaNoMi,
+        PRIMARY KEY (NomePersonagem, NomeFruta)
+    );
+    CREATE TABLE Especie (NomeEspecie TEXT PRIMARY KEY);
+    CREATE TABLE Filiacao_Especie (
+        NomePersonagem TEXT REFERENCES Personagem,
+        NomeEspecie TEXT REFERENCES Especie,
+        PRIMARY KEY (NomePersonagem, NomeEspecie)
+    );
+    CREATE TABLE Navio (NomeNavio TEXT PRIMARY KEY, NomeBando TEXT REFERENCES Bando, Navegando BOOLEAN);
+    CREATE TABLE Poneglyph (
+        IdPoneglyph INTEGER PRIMARY KEY,
+        Tipo tipo_poneglyph,
+        Conteudo TEXT,
+        NomeIlha TEXT REFERENCES Ilha
+    );
+    CREATE TABLE Capitulo (NumeroCapitulo INTEGER PRIMARY KEY, Titulo TEXT);
+    CREATE TABLE Localizacao_Capitulo (
+        NumeroCapitulo INTEGER REFERENCES Capitulo,
+        NomeIlha TEXT REFERENCES Ilha,
+        PRIMARY KEY (NumeroCapitulo, NomeIlha)
+    );
+    CREATE TABLE Aparicao_em_capitulo (
+        NumeroCapitulo INTEGER REFERENCES Capitulo,
+        NomePersonagem TEXT REFERENCES Personagem,
+        PRIMARY KEY (NumeroCapitulo, NomePersonagem)
+    );
+    CREATE TABLE Habilidade (NomeHabilidade TEXT PRIMARY KEY);
+    CREATE TABLE Lista_Habilidade (
+        NomePersonagem TEXT REFERENCES Personagem,
+        NomeHabilidade TEXT REFERENCES Habilidade,
+        PRIMARY KEY (NomePersonagem, NomeHabilidade)
+    );
+"""
+
+# Totais gravados que, na base real, os triggers da migração 004 mantêm
+TOTAIS = """
+    UPDATE Bando b SET RecompensaTotalBando = t.total
+    FROM (SELECT NomeBando, COALESCE(SUM(Recompensa), 0) AS total FROM Pirata GROUP BY NomeBando) t
+    WHERE t.NomeBando = b.NomeBando;
+
+    UPDATE Alianca a SET RecompensaTotalAlianca = t.total
+    FROM (SELECT NomeAlianca, SUM(RecompensaTotalBando) AS total FROM Bando GROUP BY NomeAlianca) t
+    WHERE t.NomeAlianca = a.NomeAlianca;
+"""
+
+
+def _nomes(prefixo, n):
+    return pd.Series([f"{prefixo} {i}" for i in range(n)])
+
+
+def _pares_unicos(rng, n_esquerda, n_direita, quantidade):
+    """quantidade pares (i, j) distintos, sorteados sem reposição."""
+    quantidade = min(quantidade, n_esquerda * n_direita)
+    codigos = np.unique(rng.integers(0, n_esquerda * n_direita, quantidade, dtype=np.int64))
+    return codigos // n_direita, codigos % n_direita
+
+
+def gerar(piratas, semente=42):
+    """Tabelas sintéticas, na ordem de carga: {tabela: DataFrame}."""
+    rng = np.random.default_rng(semente)
+    marinheiros = max(10, piratas // 5)
+    personagens = piratas + marinheiros + piratas // 3
+    bandos = max(10, piratas // 20)
+    aliancas = max(3, bandos // 50)
+    frutas = max(50, piratas // 10)
+    ilhas = max(50, piratas // 100)
+    capitulos = 1100
+    habilidades = 500
+
+    nomes = _nomes("Personagem", personagens)
+    nomes_bandos = _nomes("Bando", bandos)
+    nomes_aliancas = _nomes("Aliança", aliancas)
+    nomes_ilhas = _nomes("Ilha", ilhas)
+    nomes_frutas = _nomes("Fruta", frutas)
+    especies = pd.Series(["Humano", "Tritão", "Gigante", "Mink", "Anão", "Lunariano", "Oni", "Skypiean"])
+
+    # Cada bando tem pelo menos um pirata (o primeiro é o capitão); o resto cai em bandos
+    # sorteados com pesos de cauda longa, como na base real (poucos bandos grandes)
+    pesos = 1 / np.arange(1, bandos + 1)
+    bando_do_pirata = np.arange(piratas) % bandos
+    if piratas > bandos:
+        bando_do_pirata[bandos:] = rng.choice(bandos, piratas - bandos, p=pesos / pesos.sum())
+    recompensa = np.round(rng.lognormal(17.5, 2.0, piratas), -6).astype(np.int64)
+    recompensa[rng.random(piratas) < 0.05] = 0
+    shichibukai = np.zeros(piratas, dtype=bool)
+    shichibukai[rng.choice(piratas, min(7, piratas), replace=False)] = True
+
+    donos = rng.choice(personagens, min(frutas, personagens), replace=False)
+    aparicao_c, aparicao_p = _pares_unicos(rng, capitulos, personagens, piratas * 2)
+    local_c, local_i = _pares_unicos(rng, capitulos, ilhas, capitulos * 2)
+    hab_p, hab_h = _pares_unicos(rng, piratas, habilidades, piratas)
+
+    return {
+        "Area": pd.DataFrame({"NomeArea": AREAS}),
+        "Ilha": pd.DataFrame({
+            "NomeIlha": nomes_ilhas,
+            "NomeArea": rng.choice(AREAS, ilhas),
+            "Filiacao": rng.choice(["Governo Mundial", "Yonkou", "Independente"], ilhas),
+        }),
+        "Personagem": pd.DataFrame({"NomePersonagem": nomes, "Alcunha": _nomes("Alcunha", personagens)}),
+        "Alianca": pd.DataFrame({"NomeAlianca": nomes_aliancas, "RecompensaTotalAlianca": 0}),
+        "Bando": pd.DataFrame({
+            "NomeBando": nomes_bandos,
+            "PirataCapitao": nomes[:bandos],
+            # Metade dos bandos sem aliança
+            "NomeAlianca": np.where(rng.random(bandos) < 0.5, nomes_aliancas[rng.integers(0, aliancas, bandos)], None),
+            "RecompensaTotalBando": 0,
+        }),
+        "Pirata": pd.DataFrame({
+            "NomePersonagem": nomes[:piratas],
+            "NomeBando": nomes_bandos[bando_do_pirata].to_numpy(),
+            "Recompensa": recompensa,
+            "Shichibukai": shichibukai,
+        }),
+        "Marinheiro": pd.DataFrame({
+            "NomePersonagem": nomes[piratas:piratas + marinheiros].to_numpy(),
+            "Patente": rng.choice(["Almirante", "Vice-Almirante", "Capitão", "Soldado"], marinheiros),
+        }),
+        "AkumaNoMi": pd.DataFrame({"NomeFruta": nomes_frutas, "TipoFruta": rng.choice(TIPOS_FRUTA, frutas)}),
+        "Posse_Fruta": pd.DataFrame({"NomePersonagem": nomes[donos].to_numpy(), "NomeFruta": nomes_frutas[:len(donos)]}),
+        "Especie": pd.DataFrame({"NomeEspecie": especies}),
+        "Filiacao_Especie": pd.DataFrame({
+            "NomePersonagem": nomes,
+            "NomeEspecie": especies[rng.integers(0, len(especies), personagens)].to_numpy(),
+        }),
+        "Navio": pd.DataFrame({
+            "NomeNavio": _nomes("Navio", bandos * 2),
+            "NomeBando": np.tile(nomes_bandos, 2),
+            "Navegando": rng.random(bandos * 2) < 0.7,
+        }),
+        "Poneglyph": pd.DataFrame({
+            "IdPoneglyph": np.arange(ilhas // 2),
+            "Tipo": rng.choice(TIPOS_PONEGLYPH, ilhas // 2),
+            "Conteudo": [f"Texto antigo {i}" for i in range(ilhas // 2)],
+            "NomeIlha": rng.choice(nomes_ilhas, ilhas // 2, replace=False),
+        }),
+        "Capitulo": pd.DataFrame({
+            "NumeroCapitulo": np.arange(1, capitulos + 1),
+            "Titulo": [f"Capítulo {i}" for i in range(1, capitulos + 1)],
+        }),
+        "Localizacao_Capitulo": pd.DataFrame({"NumeroCapitulo": local_c + 1, "NomeIlha": nomes_ilhas[local_i].to_numpy()}),
+        "Aparicao_em_capitulo": pd.DataFrame({"NumeroCapitulo": aparicao_c + 1, "NomePersonagem": nomes[aparicao_p].to_numpy()}),
+        "Habilidade": pd.DataFrame({"NomeHabilidade": _nomes("Habilidade", habilidades)}),
+        "Lista_Habilidade": pd.DataFrame({
+            "NomePersonagem": nomes[hab_p].to_numpy(),
+            "NomeHabilidade": _nomes("Habilidade", habilidades)[hab_h].to_numpy(),
+        }),
+    }
+
+
+def carregar(conn, tabelas, saida=print):
+    with conn.cursor() as cur:
+        cur.execute(DDL)
+        for tabela, df in tabelas.items():
+            inicio = time.perf_counter()
+            for comeco in range(0, max(len(df), 1), LOTE_COPY):
+                buffer = io.StringIO()
+                df.iloc[comeco:comeco + LOTE_COPY].to_csv(buffer, index=False, header=False)
+                buffer.seek(0)
+                colunas = ", ".join(df.columns)
+                cur.copy_expert(f"COPY {tabela} ({colunas}) FROM STDIN WITH (FORMAT csv)", buffer)
+            saida(f"  {tabela}: {len(df):,} linhas em {time.perf_counter() - inicio:.1f} s")
+        cur.execute(TOTAIS)
+    migracoes.aplicar(conn, saida=lambda msg: saida(f"  {msg}"))
+    with conn.cursor() as cur:
+        cur.execute("ANALYZE;")
+
+
+def _tempos(funcao, repeticoes):
+    funcao()  # aquecimento: PREPARE, cache do Postgres e import do pyarrow
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return {"mediana_ms": statistics.median(tempos), "minimo_ms": min(tempos)}, resultado
+
+
+def medir_consultas(repeticoes, saida=print):
+    resultados = {}
+    for nome, consulta in consultas.CONSULTAS.items():
+        params = {p: explicar.EXEMPLOS.get(p) for p in consulta.parametros}
+        try:
+            linhas, df = _tempos(lambda: db.run_prepared(consulta, params), repeticoes)
+            colunar, _ = _tempos(lambda: db.run_colunar(consulta, params), repeticoes)
+        except Exception as exc:
+            saida(f"  {nome}: erro ({exc})")
+            continue
+        resultados[nome] = {
+            "linhas": len(df),
+            "bytes_memoria": int(df.memory_usage(deep=True).sum()),
+            "linhas_ms": linhas,
+            "colunar_ms": colunar,
+        }
+        saida(
+            f"  {nome}: {len(df):,} linhas, linhas {linhas['mediana_ms']:.1f} ms, "
+            f"colunar {colunar['mediana_ms']:.1f} ms"
+        )
+    return resultados
+
+
+def medir_python(repeticoes, saida=print):
+    """Partes do app que rodam sobre os frames já carregados."""
+    import clusters
+    import memoria
+
+    base = db.run_colunar(consultas.get("base_piratas"))
+    piratas = db.run_colunar(consultas.get("stats_clusters_piratas"))
+    casos = {
+        "memoria_montar_base": lambda: memoria.BaseMemoria(base),
+        "memoria_piratas_por_bando": lambda: memoria.BaseMemoria(base).piratas_por_bando(0),
+        # Sem o LRU, para medir o cálculo de todos os k
+        "clusters_agrupar": lambda: (clusters._lru.clear(), clusters.agrupar(piratas["recompensaindividual"])),
+    }
+    resultados = {}
+    for nome, funcao in casos.items():
+        resultados[nome], _ = _tempos(funcao, repeticoes)
+        saida(f"  {nome}: {resultados[nome]['mediana_ms']:.1f} ms")
+    return resultados
+
+
+def comparar(atual, base, tolerancia):
+    """Lista de (medição, mediana base, mediana atual) que pioraram além da tolerância."""
+    pioras = []
+    for grupo in ("consultas", "python"):
+        for nome, medidas in atual[grupo].items():
+            anterior = base.get(grupo, {}).get(nome)
+            if anterior is None:
+                continue
+            for caminho in ("linhas_ms", "colunar_ms") if grupo == "consultas" else (None,):
+                agora = (medidas[caminho] if caminho else medidas)["mediana_ms"]
+                antes = (anterior[caminho] if caminho else anterior)["mediana_ms"]
+                if agora > antes * (1 + tolerancia) and agora - antes > RUIDO_MS:
+                    pioras.append((f"{nome}{f' [{caminho}]' if caminho else ''}", antes, agora))
+    return pioras
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--piratas", type=int, default=10_000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--reaproveitar", action="store_true")
+    parser.add_argument("--saida", default="benchmark.json")
+    parser.add_argument("--base")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if not BENCH_DATABASE_URL:
+        sys.exit("Defina BENCH_DATABASE_URL com um banco descartável para o benchmark.")
+    if BENCH_DATABASE_URL == os.environ.get("DATABASE_URL"):
+        sys.exit("BENCH_DATABASE_URL não pode ser o mesmo banco do dashboard (as tabelas são recriadas).")
+    # Pool, migrações e consultas passam a usar o banco do benchmark
+    db.DATABASE_URL = BENCH_DATABASE_URL
+
+    conn = migracoes.conectar()
+    try:
+        if not args.reaproveitar:
+            print(f"Gerando {args.piratas:,} piratas...")
+            inicio = time.perf_counter()
+            tabelas = gerar(args.piratas)
+            print(f"  dados gerados em {time.perf_counter() - inicio:.1f} s")
+            carregar(conn, tabelas)
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM Pirata;")
+            piratas = cur.fetchone()[0]
+            cur.execute("SHOW server_version;")
+            versao = cur.fetchone()[0]
+    finally:
+        conn.close()
+
+    print("Consultas:")
+    relatorio = {
+        "gerado_em": datetime.now(timezone.utc).isoformat(),
+        "piratas": piratas,
+        "postgres": versao,
+        "repeticoes": args.repeticoes,
+        "consultas": medir_consultas(args.repeticoes),
+    }
+    print("Python:")
+    relatorio["python"] = medir_python(args.repeticoes)
+
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+    print(f"\nRelatório gravado em {args.saida}.")
+
+    if args.base:
+        with open(args.base, encoding="utf-8") as arquivo:
+            base = json.load(arquivo)
+        if base.get("piratas") != piratas:
+            print(f"Aviso: a base foi medida com {base.get('piratas')} piratas, esta com {piratas}.")
+        pioras = comparar(relatorio, base, args.tolerancia)
+        for nome, antes, agora in pioras:
+            print(f"  PIOROU {nome}: {antes:.1f} ms -> {agora:.1f} ms")
+        print(f"{len(pioras)} medição(ões) acima da tolerância de {args.tolerancia:.0%}.")
+        if pioras:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+"""Cache de resultados das consultas, compartilhável entre sessões e réplicas.
+
+Backends (variável DASHBOARD_CACHE):
+    local   - LRU em memória limitado por bytes (padrão)
+    sqlite  - LRU local na frente de um arquivo SQLite compartilhado pelas
+              réplicas da mesma máquina (DASHBOARD_CACHE_PATH)
+    redis   - LRU local na frente de um Redis (REDIS_URL); precisa do pacote redis
+
+Cada entrada guarda as tabelas de onde veio. Triggers no banco (migracoes.py)
+publicam em NOTIFY dashboard_invalidacao o nome da tabela alterada, e a thread
+de escuta apaga só as entradas que dependem dela. Cada invalidação também muda
+a geração da tabela: um resultado calculado antes do aviso e guardado depois
+dele é descartado (ver CacheEmCamadas.geracao).
+"""
+import hashlib
+import json
+import os
+import pickle
+import select
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+TTL_PADRAO = float(os.environ.get("DASHBOARD_CACHE_TTL", "600"))
+MAX_BYTES = int(float(os.environ.get("DASHBOARD_CACHE_MAX_MB", "256")) * 1024 * 1024)
+CANAL = "dashboard_invalidacao"
+# Valores de texto medidos por coluna ao estimar o tamanho de um frame
+AMOSTRA_TAMANHO = 1000
+
+
+def chave(nome, params=None):
+    """Chave normalizada: nome + parâmetros ordenados (independe do texto do SQL)."""
+    texto = json.dumps(params or {}, sort_keys=True, default=str, separators=(",", ":"))
+    return f"{nome}:{hashlib.sha1(texto.encode()).hexdigest()}"
+
+
+def _tamanho_pandas(valor):
+    # memory_usage(deep=True) mede cada string; com milhões de linhas isso leva
+    # mais que a consulta. As colunas de objetos são estimadas por uma amostra
+    total = int(np.sum(valor.memory_usage(index=True, deep=False)))
+    colunas = valor.items() if hasattr(valor, "columns") else [(valor.name, valor)]
+    for _, coluna in colunas:
+        if coluna.dtype == object and len(coluna):
+            amostra = coluna.iloc[:: max(len(coluna) // AMOSTRA_TAMANHO, 1)]
+            total += int(sum(map(sys.getsizeof, amostra)) * len(coluna) / len(amostra))
+    return total
+
+
+def tamanho(valor):
+    """Bytes aproximados de um resultado (DataFrame, dict de DataFrames, tupla...).
+
+    Objetos próprios (ex.: memoria.BaseMemoria) informam o tamanho em nbytes,
+    como os arrays do NumPy. Serializar com pickle, a última opção, custa uma
+    cópia inteira do valor a cada gravação.
+    """
+    if hasattr(valor, "memory_usage"):
+        return _tamanho_pandas(valor)
+    if hasattr(valor, "nbytes"):
+        return int(valor.nbytes)
+    if isinstance(valor, dict):
+        return sum(tamanho(v) for v in valor.values())
+    if isinstance(valor, (tuple, list)):
+        return sum(tamanho(v) for v in valor)
+    try:
+        return len(pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 1024
+
+
+class Entrada:
+    __slots__ = ("valor", "expira_em", "tabelas", "tamanho")
+
+    def __init__(self, valor, expira_em, tabelas, tamanho):
+        self.valor = valor
+        self.expira_em = expira_em
+        self.tabelas = frozenset(tabelas)
+        self.tamanho = tamanho
+
+    @property
+    def expirada(self):
+        return time.time() >= self.expira_em
+
+
+class CacheLocal:
+    """LRU em memória limitado pelo total de bytes dos resultados.
+
+    Entradas vencidas continuam guardadas até serem expulsas pelo LRU (quem
+    chama decide se aceita um resultado vencido); entradas invalidadas somem.
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()
+        self._por_tabela = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                self._entradas.move_to_end(chave)
+            return entrada
+
+    def guardar(self, chave, entrada):
+        if entrada.tamanho > self.max_bytes:
+            return
+        with self._lock:
+            self._remover(chave)
+            self._entradas[chave] = entrada
+            self._bytes += entrada.tamanho
+            for tabela in entrada.tabelas:
+                self._por_tabela.setdefault(tabela, set()).add(chave)
+            while self._bytes > self.max_bytes and self._entradas:
+                self._remover(next(iter(self._entradas)))
+
+    def invalidar_tabela(self, tabela):
+        with self._lock:
+            for chave in list(self._por_tabela.get(tabela, ())):
+                self._remover(chave)
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._por_tabela.clear()
+            self._bytes = 0
+
+    def _remover(self, chave):
+        entrada = self._entradas.pop(chave, None)
+        if entrada is None:
+            return
+        self._bytes -= entrada.tamanho
+        for tabela in entrada.tabelas:
+            chaves = self._por_tabela.get(tabela)
+            if chaves is not None:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._por_tabela[tabela]
+
+
+class CacheSQLite:
+    """Cache em arquivo SQLite, visível para todos os processos da máquina."""
+
+    def __init__(self, caminho, max_bytes=MAX_BYTES * 4):
+        self.caminho = caminho
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        with self._conexao() as conn:
+            conn.executescript("""
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS entradas (
+                    chave TEXT PRIMARY KEY,
+                    valor BLOB NOT NULL,
+                    expira_em REAL NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    usado_em REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS tabelas (
+                    tabela TEXT NOT NULL,
+                    chave TEXT NOT NULL,
+                    PRIMARY KEY (tabela, chave)
+                );
+            """)
+
+    def _conexao(self):
+        # sqlite3 não deve compartilhar conexão entre threads: uma por thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.caminho, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def obter(self, chave):
+        conn = self._conexao()
+        linha = conn.execute("SELECT valor, expira_em FROM entradas WHERE chave = ?;", (chave,)).fetchone()
+        if linha is None:
+            return None
+        tabelas = [t for (t,) in conn.execute("SELECT tabela FROM tabelas WHERE chave = ?;", (chave,))]
+        with conn:
+            conn.execute("UPDATE entradas SET usado_em = ? WHERE chave = ?;", (time.time(), chave))
+        return Entrada(pickle.loads(linha[0]), linha[1], tabelas, len(linha[0]))
+
+    def guardar(self, chave, entrada):
+        blob = pickle.dumps(entrada.valor, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        conn = self._conexao()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entradas VALUES (?, ?, ?, ?, ?);",
+                (chave, blob, entrada.expira_em, len(blob), time.time()),
+            )
+            conn.execute("DELETE FROM tabelas WHERE chave = ?;", (chave,))
+            conn.executemany("INSERT INTO tabelas VALUES (?, ?);", [(t, chave) for t in entrada.tabelas])
+            self._expulsar(conn)
+
+    def _expulsar(self, conn):
+        (total,) = conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM entradas;").fetchone()
+        if total <= self.max_bytes:
+            return
+        for chave, tam in conn.execute("SELECT chave, tamanho FROM entradas ORDER BY usado_em;").fetchall():
+            conn.execute("DELETE FROM entradas WHERE chave = ?;", (chave,))
+            conn.execute("DELETE FROM tabelas WHERE chave = ?;", (chave,))
+            total -= tam
+            if total <= self.max_bytes:
+                break
+
+    def invalidar_tabela(self, tabela):
+        conn = self._conexao()
+        with conn:
+            chaves = conn.execute("SELECT chave FROM tabelas WHERE tabela = ?;", (tabela,)).fetchall()
+            conn.executemany("DELETE FROM entradas WHERE chave = ?;", chaves)
+            conn.executemany("DELETE FROM tabelas WHERE chave = ?;", chaves)
+
+    def limpar(self):
+        conn = self._conexao()
+        with conn:
+            conn.execute("DELETE FROM entradas;")
+            conn.execute("DELETE FROM tabelas;")
+
+
+class CacheRedis:
+    """Cache em Redis (ou qualquer servidor compatível), compartilhado entre máquinas."""
+
+    def __init__(self, url, prefixo="dashboard:"):
+        import redis
+
+        self.redis = redis.Redis.from_url(url)
+        self.prefixo = prefixo
+
+    def obter(self, chave):
+        dados = self.redis.get(self.prefixo + chave)
+        if dados is None:
+            return None
+        valor, expira_em, tabelas = pickle.loads(dados)
+        return Entrada(valor, expira_em, tabelas, len(dados))
+
+    def guardar(self, chave, entrada):
+        dados = pickle.dumps((entrada.valor, entrada.expira_em, list(entrada.tabelas)), protocol=pickle.HIGHEST_PROTOCOL)
+        # Guarda além do vencimento para permitir servir resultado vencido;
+        # a memória do servidor é limitada pela política de expulsão do Redis
+        vida = int(max(entrada.expira_em - time.time(), 0) + TTL_PADRAO)
+        agora = time.time()
+        pipe = self.redis.pipeline()
+        pipe.set(self.prefixo + chave, dados, ex=vida)
+        for tabela in entrada.tabelas:
+            # Índice por tabela com o fim da vida de cada chave: as que já expiraram
+            # saem a cada escrita, então o índice não cresce com chaves antigas
+            indice = f"{self.prefixo}indice:{tabela}"
+            pipe.zadd(indice, {chave: agora + vida})
+            pipe.zremrangebyscore(indice, "-inf", agora)
+        pipe.execute()
+
+    def invalidar_tabela(self, tabela):
+        conjunto = f"{self.prefixo}indice:{tabela}"
+        chaves = self.redis.zrange(conjunto, 0, -1)
+        pipe = self.redis.pipeline()
+        for c in chaves:
+            pipe.delete(self.prefixo + c.decode())
+        pipe.delete(conjunto)
+        pipe.execute()
+
+    def limpar(self):
+        for c in self.redis.scan_iter(self.prefixo + "*"):
+            self.redis.delete(c)
+
+
+class CacheEmCamadas:
+    """LRU local na frente de um backend compartilhado (opcional).
+
+    Guarda também a geração de cada tabela neste processo, que muda a cada
+    invalidação; limpar() (escuta de invalidações perdida) muda todas.
+    """
+
+    def __init__(self, local, compartilhado=None):
+        self.local = local
+        self.compartilhado = compartilhado
+        self._geracoes = {}
+        self._limpezas = 0
+        self._lock = threading.Lock()
+
+    def obter(self, chave, margem=0):
+        """Entrada da chave (local ou, se preciso, do backend compartilhado).
+
+        O compartilhado é consultado quando a entrada local falta ou vence em
+        menos de margem segundos (0: quando já venceu).
+        """
+        entrada = self.local.obter(chave)
+        if (entrada is None or entrada.expira_em - margem <= time.time()) and self.compartilhado is not None:
+            remota = self.compartilhado.obter(chave)
+            if remota is not None and (entrada is None or remota.expira_em > entrada.expira_em):
+                # Outra réplica já calculou: traz para a memória local
+                remota.tamanho = tamanho(remota.valor)
+                self.local.guardar(chave, remota)
+                entrada = remota
+        return entrada
+
+    def geracao(self, tabelas):
+        """Marca das tabelas neste momento, para passar a guardar(..., geracao=).
+
+        Tirada antes de começar o cálculo: se alguma das tabelas for invalidada
+        até o resultado ficar pronto, ele já nasceu velho e não é guardado.
+        """
+        with self._lock:
+            return self._marca(tabelas)
+
+    def guardar(self, chave, entrada, compartilhar=True, geracao=None):
+        """Grava a entrada; com geracao, só se nenhuma tabela dela foi invalidada desde então.
+
+        Devolve False quando o resultado foi descartado por isso.
+        """
+        # O lock fica com quem grava até o fim: uma invalidação que chegar no meio
+        # espera a gravação terminar e então apaga a entrada recém-gravada
+        with self._lock:
+            if geracao is not None and geracao != self._marca(entrada.tabelas):
+                return False
+            self.local.guardar(chave, entrada)
+            if compartilhar and self.compartilhado is not None:
+                self.compartilhado.guardar(chave, entrada)
+        return True
+
+    def _marca(self, tabelas):
+        return self._limpezas, tuple(sorted((t, self._geracoes.get(t, 0)) for t in tabelas))
+
+    def invalidar_tabela(self, tabela):
+        with self._lock:
+            self._geracoes[tabela] = self._geracoes.get(tabela, 0) + 1
+        self.local.invalidar_tabela(tabela)
+        if self.compartilhado is not None:
+            self.compartilhado.invalidar_tabela(tabela)
+
+    def limpar(self):
+        """Esquece tudo o que está na memória deste processo.
+
+        O backend compartilhado fica como está: ele é das outras réplicas também,
+        e as invalidações que elas recebem continuam apagando o que for preciso.
+        """
+        with self._lock:
+            self._limpezas += 1
+        self.local.limpar()
+
+
+def criar_cache():
+    backend = os.environ.get("DASHBOARD_CACHE", "local")
+    local = CacheLocal()
+    if backend == "sqlite":
+        caminho = os.environ.get("DASHBOARD_CACHE_PATH", "dashboard_cache.sqlite3")
+        return CacheEmCamadas(local, CacheSQLite(caminho))
+    if backend == "redis":
+        return CacheEmCamadas(local, CacheRedis(os.environ["REDIS_URL"]))
+    return CacheEmCamadas(local)
+
+
+def escutar_invalidacoes(conectar, cache, ao_invalidar=None, parar=None):
+    """Loop de LISTEN: apaga do cache as entradas das tabelas notificadas.
+
+    conectar() deve devolver uma conexão psycopg2 dedicada (fora do pool).
+    Se a conexão cair, a camada local do cache é limpa (alterações podem ter
+    sido perdidas) e a escuta é refeita. ao_invalidar(tabela), se dado, é
+    chamado depois de cada invalidação, com None quando tudo foi limpo.
+    """
+    ao_invalidar = ao_invalidar or (lambda tabela: None)
+    parar = parar or threading.Event()
+    espera = 1
+    while not parar.is_set():
+        conn = None
+        try:
+            conn = conectar()
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CANAL};")
+            espera = 1
+            while not parar.is_set():
+                if select.select([conn], [], [], 5) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    aviso = conn.notifies.pop(0)
+                    tabela = aviso.payload.lower()
+                    cache.invalidar_tabela(tabela)
+                    ao_invalidar(tabela)
+        except Exception as exc:
+            print(f"[cache] escuta de invalidações caiu: {exc}")
+            cache.limpar()
+            ao_invalidar(None)
+            parar.wait(espera)
+            espera = min(espera * 2, 60)
+        finally:
+            if conn is not None:
+                conn.close()
+
+
+def iniciar_escuta(conectar, cache, ao_invalidar=None):
+    thread = threading.Thread(
+        target=escutar_invalidacoes,
+        args=(conectar, cache, ao_invalidar),
+        name="cache-invalidacao",
+        daemon=True,
+    )
+    thread.start()
+    return thread
@@ -0,0 +1,198 @@
+"""Agrupamento 1-D das recompensas para a aba "Clusters e Outliers".
+
+Em uma dimensão o k-means ótimo pode ser calculado exatamente: com os valores
+ordenados, cada cluster é um intervalo contíguo e a melhor partição sai de uma
+programação dinâmica. A DP roda sobre os valores distintos (com peso = número
+de repetições), com a otimização "divide and conquer" feita um nível da
+recursão por vez em numpy, o que dá O(k · m log m) para m valores distintos.
+Uma única passada calcula todos os k de 1 até K_MAX.
+
+Acima de LIMITE_EXATO valores distintos usa o MiniBatchKMeans do scikit-learn
+com pesos. Os resultados ficam em um LRU pela versão dos dados (hash dos
+valores), então mexer no slider de k não recalcula nada.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+K_MAX = 8
+LIMITE_EXATO = int(os.environ.get("CLUSTERS_LIMITE_EXATO", "200000"))
+# Versões dos dados guardadas (cada uma com todos os k)
+MAX_VERSOES = 8
+
+_lru = OrderedDict()
+_lock = threading.Lock()
+
+
+class Agrupamento:
+    """Clusters de k=1..k_max de uma versão dos dados.
+
+    Cada cluster é um intervalo de valores; limites[k] guarda os k-1 valores
+    em que um cluster novo começa. Os rótulos seguem a ordem dos valores
+    (0 = menores recompensas).
+    """
+
+    def __init__(self, limites, inercia, centros, metodo):
+        self.limites = limites
+        self.inercia = inercia
+        self.centros = centros
+        self.metodo = metodo
+
+    @property
+    def k_max(self):
+        return max(self.limites)
+
+    def rotulos(self, k, valores):
+        """Cluster de cada valor (float, NaN onde o valor é nulo)."""
+        valores = np.asarray(valores, dtype=float)
+        rotulos = np.searchsorted(self.limites[min(k, self.k_max)], valores, side="right").astype(float)
+        rotulos[np.isnan(valores)] = np.nan
+        return rotulos
+
+
+def _prefixos(x, w):
+    # Centralizar antes evita perder precisão em Σx² - (Σx)²/n com recompensas na casa dos bilhões
+    media = np.average(x, weights=w)
+    x = x - media
+    zero = np.zeros(1)
+    return (
+        np.concatenate([zero, np.cumsum(w)]),
+        np.concatenate([zero, np.cumsum(w * x)]),
+        np.concatenate([zero, np.cumsum(w * x * x)]),
+        media,
+    )
+
+
+def _custo(prefixos, i, j):
+    """Soma dos quadrados dos desvios do intervalo x[i..j] (vetorizado)."""
+    pw, px, pxx, _ = prefixos
+    sw = pw[j + 1] - pw[i]
+    sx = px[j + 1] - px[i]
+    return np.maximum(pxx[j + 1] - pxx[i] - sx * sx / sw, 0.0)
+
+
+def _camada(prefixos, anterior, k, m):
+    """D_k[j] = min_i D_{k-1}[i-1] + custo(i, j), com o início ótimo monótono em j.
+
+    Resolve a recursão divide and conquer nível por nível: todos os pontos
+    médios de um nível são independentes e são avaliados juntos.
+    """
+    custo = np.full(m, np.inf)
+    inicio = np.zeros(m, dtype=np.int64)
+    jlo = np.array([k - 1])
+    jhi = np.array([m - 1])
+    ilo = np.array([k - 1])
+    ihi = np.array([m - 1])
+    while len(jlo):
+        meio = (jlo + jhi) // 2
+        contagens = np.minimum(ihi, meio) - ilo + 1
+        comecos = np.concatenate([[0], np.cumsum(contagens)[:-1]])
+        segmento = np.repeat(np.arange(len(meio)), contagens)
+        i = ilo[segmento] + (np.arange(contagens.sum()) - comecos[segmento])
+        j = meio[segmento]
+        total = anterior[i - 1] + _custo(prefixos, i, j)
+        # Menor valor de cada segmento: primeiro elemento após ordenar por (segmento, total)
+        melhor = np.lexsort((total, segmento))[comecos]
+        custo[meio] = total[melhor]
+        inicio[meio] = i[melhor]
+
+        esquerda = jlo <= meio - 1
+        direita = meio + 1 <= jhi
+        jlo, jhi, ilo, ihi = (
+            np.concatenate([jlo[esquerda], meio[direita] + 1]),
+            np.concatenate([meio[esquerda] - 1, jhi[direita]]),
+            np.concatenate([ilo[esquerda], inicio[meio][direita]]),
+            np.concatenate([inicio[meio][esquerda], ihi[direita]]),
+        )
+    return custo, inicio
+
+
+def _exato(x, w, k_max):
+    m = len(x)
+    prefixos = _prefixos(x, w)
+    indices = np.arange(m)
+    custo = _custo(prefixos, np.zeros(m, dtype=np.int64), indices)
+    inicios = [None, np.zeros(m, dtype=np.int64)]
+    inercia = {1: float(custo[-1])}
+    for k in range(2, k_max + 1):
+        custo, inicio = _camada(prefixos, custo, k, m)
+        inicios.append(inicio)
+        inercia[k] = float(custo[-1])
+
+    limites, centros = {}, {}
+    for k in range(1, k_max + 1):
+        # Volta pelas camadas a partir do último valor para achar onde cada cluster começa
+        comecos = []
+        j = m - 1
+        for camada in range(k, 0, -1):
+            i = int(inicios[camada][j])
+            comecos.append(i)
+            j = i - 1
+        comecos.reverse()
+        limites[k] = x[comecos[1:]]
+        centros[k] = _centros(prefixos, comecos, m)
+    return limites, inercia, centros
+
+
+def _centros(prefixos, comecos, m):
+    pw, px, _, media = prefixos
+    fins = np.array(comecos[1:] + [m])
+    comecos = np.array(comecos)
+    return media + (px[fins] - px[comecos]) / (pw[fins] - pw[comecos])
+
+
+def _mini_batch(x, w, k_max):
+    from sklearn.cluster import MiniBatchKMeans
+
+    prefixos = _prefixos(x, w)
+    limites, inercia, centros = {}, {}, {}
+    for k in range(1, k_max + 1):
+        modelo = MiniBatchKMeans(n_clusters=k, batch_size=4096, n_init=3, random_state=42)
+        modelo.fit(x.reshape(-1, 1), sample_weight=w)
+        c = np.unique(modelo.cluster_centers_.ravel())
+        # Em 1-D o centro mais próximo muda no ponto médio entre centros vizinhos
+        cortes = (c[:-1] + c[1:]) / 2
+        comecos = [0] + list(np.searchsorted(x, cortes, side="right"))
+        comecos = sorted(set(comecos) - {len(x)})
+        limites[k] = x[comecos[1:]]
+        inercia[k] = float(sum(
+            _custo(prefixos, np.array([a]), np.array([b - 1]))[0]
+            for a, b in zip(comecos, comecos[1:] + [len(x)])
+        ))
+        centros[k] = _centros(prefixos, comecos, len(x))
+    return limites, inercia, centros
+
+
+def versao(valores):
+    """Identifica o conteúdo da série (muda quando qualquer valor muda)."""
+    return len(valores), int(pd.util.hash_pandas_object(valores, index=False).sum())
+
+
+def agrupar(valores, k_max=K_MAX):
+    """Agrupamento de todos os k até k_max para a série de valores (nulos ignorados)."""
+    valores = pd.Series(valores, dtype=float)
+    chave = (versao(valores), k_max)
+    with _lock:
+        if chave in _lru:
+            _lru.move_to_end(chave)
+            return _lru[chave]
+
+    x, w = np.unique(valores.dropna().to_numpy(), return_counts=True)
+    w = w.astype(float)
+    k_max = max(1, min(k_max, len(x)))
+    if not len(x):
+        resultado = Agrupamento({1: np.array([])}, {1: 0.0}, {1: np.array([])}, "vazio")
+    elif len(x) <= LIMITE_EXATO:
+        resultado = Agrupamento(*_exato(x, w, k_max), "exato")
+    else:
+        resultado = Agrupamento(*_mini_batch(x, w, k_max), "mini-batch")
+
+    with _lock:
+        _lru[chave] = resultado
+        _lru.move_to_end(chave)
+        while len(_lru) > MAX_VERSOES:
+            _lru.popitem(last=False)
+    return resultado
@@ -0,0 +1,178 @@
+"""Grafo de coaparições dos personagens (seção "Coaparições").
+
+A tabela Aparicao_em_capitulo vira uma matriz esparsa de incidência B
+(personagem × capítulo, scipy.sparse). As coaparições são C = B · Bᵀ:
+C[i, j] é o número de capítulos em que i e j aparecem juntos, e a diagonal é o
+número de aparições de cada personagem.
+
+Capítulos novos entram sem refazer nada: como cada capítulo é uma coluna,
+C += B_novos · B_novosᵀ, e só as linhas dos capítulos novos saem do banco. Se
+algo mudar nos capítulos já carregados (o resumo, com o número de linhas e a
+soma de um hash de cada uma, não bate com a matriz), ela é montada de novo. A matriz fica em memória, uma por processo.
+"""
+import copy
+import threading
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import consultas
+import dados
+import db
+
+# Iteração de potência da centralidade de autovetor
+ITERACOES_MAX = 200
+TOLERANCIA = 1e-9
+
+_grafo = None
+_lock = threading.Lock()
+
+
+class Grafo:
+    """Matriz de incidência e de coaparições, acrescentada capítulo a capítulo."""
+
+    def __init__(self):
+        self.nomes = []
+        self._indice = {}
+        self.capitulos = np.empty(0, dtype=np.int64)
+        self.incidencia = sparse.csr_matrix((0, 0), dtype=np.int32)
+        self.coaparicoes = sparse.csr_matrix((0, 0), dtype=np.int32)
+        # Linhas de Aparicao_em_capitulo já na matriz (quantas e a soma dos hashes
+        # delas, ver "aparicoes_resumo") e último capítulo carregado
+        self.linhas = 0
+        self.assinatura = 0
+        self.ultimo = None
+        self._centralidade = None
+
+    def acrescentar(self, aparicoes):
+        """Soma as aparições de capítulos posteriores a self.ultimo."""
+        if aparicoes.empty:
+            return
+        # Só troca atributos, sem alterar nada no lugar: uma cópia rasa (copy.copy)
+        # pode receber os capítulos novos enquanto a original continua em uso
+        nomes, indice = list(self.nomes), dict(self._indice)
+        for nome in aparicoes["nomepersonagem"].unique():
+            if nome not in indice:
+                indice[nome] = len(nomes)
+                nomes.append(nome)
+        n = len(nomes)
+
+        capitulos, colunas = np.unique(aparicoes["numerocapitulo"].to_numpy(), return_inverse=True)
+        linhas = aparicoes["nomepersonagem"].map(indice).to_numpy()
+        novos = sparse.csr_matrix(
+            (np.ones(len(linhas), dtype=np.int32), (linhas, colunas)),
+            shape=(n, len(capitulos)),
+        )
+
+        incidencia = self.incidencia.copy()
+        incidencia.resize((n, incidencia.shape[1]))
+        self.incidencia = sparse.hstack([incidencia, novos], format="csr")
+
+        coaparicoes = self.coaparicoes.copy()
+        coaparicoes.resize((n, n))
+        self.coaparicoes = (coaparicoes + novos @ novos.T).tocsr()
+
+        self.nomes, self._indice = nomes, indice
+        self.capitulos = np.concatenate([self.capitulos, capitulos])
+        self.linhas += len(aparicoes)
+        self.assinatura += int(aparicoes["assinatura"].sum())
+        self.ultimo = int(capitulos[-1])
+        self._centralidade = None
+
+    def _sem_diagonal(self):
+        c = self.coaparicoes.tocoo()
+        fora = c.row != c.col
+        return c.row[fora], c.col[fora], c.data[fora]
+
+    def parceiros(self, nome, n=10):
+        """Os n personagens que mais aparecem junto com nome."""
+        if nome not in self._indice:
+            return pd.DataFrame(columns=["parceiro", "capitulos_juntos"])
+        i = self._indice[nome]
+        linha = self.coaparicoes.getrow(i)
+        fora = linha.indices != i
+        colunas, juntos = linha.indices[fora], linha.data[fora]
+        ordem = np.lexsort((colunas, -juntos))[:n]
+        return pd.DataFrame({
+            "parceiro": [self.nomes[j] for j in colunas[ordem]],
+            "capitulos_juntos": juntos[ordem],
+        })
+
+    def pares(self, n=20):
+        """Os n pares de personagens com mais capítulos em comum."""
+        linhas, colunas, juntos = self._sem_diagonal()
+        metade = linhas < colunas
+        linhas, colunas, juntos = linhas[metade], colunas[metade], juntos[metade]
+        ordem = np.argsort(-juntos, kind="stable")[:n]
+        return pd.DataFrame({
+            "personagem_1": [self.nomes[i] for i in linhas[ordem]],
+            "personagem_2": [self.nomes[j] for j in colunas[ordem]],
+            "capitulos_juntos": juntos[ordem],
+        })
+
+    def centralidade(self):
+        """Grau, força e centralidade de autovetor de cada personagem.
+
+        grau: personagens distintos com quem apareceu; forca: soma dos capítulos
+        em comum com todos eles; autovetor: importância pelos vizinhos
+        importantes (iteração de potência em C sem a diagonal, normalizada para
+        máximo 1). Calculada uma vez por versão da matriz.
+        """
+        if self._centralidade is None:
+            self._centralidade = self._calcular_centralidade()
+        return self._centralidade
+
+    def _calcular_centralidade(self):
+        n = len(self.nomes)
+        linhas, colunas, juntos = self._sem_diagonal()
+        adjacencia = sparse.csr_matrix((juntos.astype(float), (linhas, colunas)), shape=(n, n))
+
+        grau = np.diff(adjacencia.indptr)
+        forca = np.asarray(adjacencia.sum(axis=1)).ravel()
+
+        # A + I: mesmos autovetores, sem oscilar quando o grafo é bipartido
+        x = np.ones(n) / max(n, 1)
+        for _ in range(ITERACOES_MAX):
+            proximo = adjacencia @ x + x
+            norma = np.linalg.norm(proximo)
+            if norma == 0:
+                break
+            proximo /= norma
+            if np.abs(proximo - x).max() < TOLERANCIA:
+                x = proximo
+                break
+            x = proximo
+        autovetor = x / x.max() if n and x.max() > 0 else x
+
+        return pd.DataFrame({
+            "personagem": self.nomes,
+            "aparicoes": self.coaparicoes.diagonal(),
+            "grau": grau,
+            "forca": forca.astype(np.int64),
+            "autovetor": autovetor,
+        }).sort_values("autovetor", ascending=False, ignore_index=True)
+
+
+def _novas_aparicoes(apos):
+    return db.executar(consultas.get("aparicoes_desde"), {"apos": apos})
+
+
+def atual():
+    """Grafo com todos os capítulos do banco (só os novos são lidos)."""
+    global _grafo
+    with _lock:
+        grafo = _grafo or Grafo()
+        resumo = dados.consulta("aparicoes_resumo", ate=grafo.ultimo).iloc[0]
+        if grafo.ultimo is not None and (
+            int(resumo["ate_ultimo"]) != grafo.linhas or int(resumo["assinatura"]) != grafo.assinatura
+        ):
+            # Capítulos antigos mudaram: recomeça do zero
+            grafo = Grafo()
+        ultimo = None if pd.isna(resumo["ultimo"]) else int(resumo["ultimo"])
+        if ultimo is not None and (grafo.ultimo is None or ultimo > grafo.ultimo):
+            # Cópia: quem ainda está lendo o grafo anterior não vê a troca no meio
+            grafo = copy.copy(grafo)
+            grafo.acrescentar(_novas_aparicoes(grafo.ultimo))
+        _grafo = grafo
+        return grafo
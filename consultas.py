@@ -0,0 +1,631 @@
+import os
+import re
+from dataclasses import dataclass, field
+
+# Registro das consultas do dashboard.
+# O SQL usa o estilo do psycopg2 (%(nome)s para parâmetros, %% para um % literal);
+# na hora de preparar no Postgres os parâmetros viram $1, $2, ... na ordem em que aparecem.
+# "alternativa" é a consulta usada quando a principal depende de um objeto criado em
+# migracoes.py que ainda não existe no banco.
+# "extensao" é a extensão do Postgres de que a consulta depende (funções e
+# operadores dela); sem a extensão instalada, a alternativa também é usada.
+# "colunar" faz a consulta ser lida via COPY + Arrow (resultados grandes ou largos).
+# "tempo_limite" é o statement_timeout da consulta, em segundos (padrão abaixo).
+# Consultas com filtro opcional, "(col = %(p)s OR %(p)s IS NULL)", rodam com
+# plan_cache_mode=force_custom_plan (ver Consulta.plano_custom e db.py).
+
+TEMPO_LIMITE_PADRAO = float(os.environ.get("DB_STATEMENT_TIMEOUT_SECONDS", "30"))
+
+_PARAMETRO = re.compile(r"%\((\w+)\)s")
+_FILTRO_OPCIONAL = re.compile(r"%\(\w+\)s\s+IS\s+NULL", re.IGNORECASE)
+_TABELA = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class Consulta:
+    nome: str
+    sql: str
+    alternativa: str = None
+    colunar: bool = False
+    tempo_limite: float = TEMPO_LIMITE_PADRAO
+    extensao: str = None
+    parametros: tuple = field(init=False)
+    tabelas: frozenset = field(init=False)
+    plano_custom: bool = field(init=False)
+
+    def __post_init__(self):
+        nomes = []
+        for nome in _PARAMETRO.findall(self.sql):
+            if nome not in nomes:
+                nomes.append(nome)
+        object.__setattr__(self, "parametros", tuple(nomes))
+        # Tabelas lidas (em minúsculas), usadas para invalidar o cache quando mudam
+        object.__setattr__(self, "tabelas", frozenset(t.lower() for t in _TABELA.findall(self.sql)))
+        # "%(p)s IS NULL" só é resolvido com o valor na mão: num plano genérico do
+        # prepared statement o filtro não usa índice nenhum
+        object.__setattr__(self, "plano_custom", _FILTRO_OPCIONAL.search(self.sql) is not None)
+
+    def tabelas_com_alternativa(self):
+        tabelas = set(self.tabelas)
+        if self.alternativa is not None:
+            tabelas |= get(self.alternativa).tabelas
+        return frozenset(tabelas)
+
+    def sql_preparado(self):
+        """SQL com $1, $2, ... para ser usado em PREPARE."""
+        posicoes = {nome: i + 1 for i, nome in enumerate(self.parametros)}
+        sql = _PARAMETRO.sub(lambda m: f"${posicoes[m.group(1)]}", self.sql)
+        return sql.replace("%%", "%").strip().rstrip(";")
+
+    def valores(self, params):
+        """Valores dos parâmetros na ordem do PREPARE (ausentes viram NULL)."""
+        params = params or {}
+        return [params.get(nome) for nome in self.parametros]
+
+
+CONSULTAS = {}
+
+
+def registrar(nome, sql, alternativa=None, colunar=False, tempo_limite=TEMPO_LIMITE_PADRAO, extensao=None):
+    CONSULTAS[nome] = Consulta(nome, sql, alternativa, colunar, tempo_limite, extensao)
+    return CONSULTAS[nome]
+
+
+def get(nome):
+    return CONSULTAS[nome]
+
+
+# Listas usadas nos filtros
+
+registrar("especies", """
+    SELECT DISTINCT NomeEspecie FROM Filiacao_Especie ORDER BY NomeEspecie;
+""")
+
+registrar("tipos_fruta", """
+    SELECT DISTINCT TipoFruta FROM AkumaNoMi ORDER BY TipoFruta;
+""")
+
+registrar("aliancas", """
+    SELECT DISTINCT NomeAlianca
+    FROM Bando
+    WHERE NomeAlianca IS NOT NULL
+    ORDER BY NomeAlianca;
+""")
+
+registrar("tipos_poneglyph", """
+    SELECT DISTINCT unnest(enum_range(NULL::tipo_poneglyph)) as tipo;
+""")
+
+registrar("areas", """
+    SELECT DISTINCT NomeArea FROM Area ORDER BY NomeArea;
+""")
+
+
+# Consultas da aba "Consultas"
+# Filtros opcionais ("Todas"/"Todos") são passados como NULL. A comparação vem antes
+# do "IS NULL" para que o Postgres consiga inferir o tipo do parâmetro no PREPARE.
+
+#Consulta1 - Filtro de piratas por recompensa do bando
+registrar("piratas_por_bando", """
+    SELECT
+        p.NomePersonagem,
+        p.Alcunha,
+        pir.Recompensa AS Recompensa,
+        b.NomeBando,
+        b.RecompensaTotalBando,
+        b.NomeAlianca
+    FROM Pirata pir
+    JOIN Personagem p ON pir.NomePersonagem = p.NomePersonagem
+    JOIN Bando b ON pir.NomeBando = b.NomeBando
+    WHERE b.RecompensaTotalBando >= %(min_recompensa)s
+    ORDER BY b.RecompensaTotalBando DESC, pir.Recompensa DESC;
+""")
+
+#Consulta2 - Personagens com Akuma no Mi por espécie e tipo de fruta
+registrar("personagens_fruta", """
+    SELECT
+        p.NomePersonagem,
+        p.Alcunha,
+        f.NomeEspecie,
+        pf.NomeFruta,
+        a.TipoFruta
+    FROM Personagem p
+    JOIN Filiacao_Especie f ON p.NomePersonagem = f.NomePersonagem
+    JOIN Posse_Fruta pf ON p.NomePersonagem = pf.NomePersonagem
+    JOIN AkumaNoMi a ON pf.NomeFruta = a.NomeFruta
+    WHERE (f.NomeEspecie = %(especie)s OR %(especie)s IS NULL)
+      AND (a.TipoFruta = %(tipo_fruta)s OR %(tipo_fruta)s IS NULL)
+    ORDER BY p.NomePersonagem ASC;
+""")
+
+#Consulta3 - Capitães de bando por recompensa total, com filtro de aliança
+registrar("capitaes", """
+    SELECT
+        pr.NomePersonagem,
+        p.Alcunha,
+        pr.Recompensa,
+        b.NomeBando,
+        b.RecompensaTotalBando,
+        b.NomeAlianca
+    FROM Pirata pr
+    JOIN Personagem p ON pr.NomePersonagem = p.NomePersonagem
+    JOIN Bando b ON pr.NomePersonagem = b.PirataCapitao
+    WHERE (b.NomeAlianca = %(alianca)s OR %(alianca)s IS NULL)
+    ORDER BY b.RecompensaTotalBando DESC;
+""")
+
+#Periculosidade - soma das N maiores recompensas de cada bando.
+#Lê a tabela pré-calculada bando_top_n (migração 005); sem ela, calcula com a janela.
+registrar("periculosidade", """
+    SELECT
+        b.NomeBando,
+        b.NomeAlianca,
+        t.soma AS RecompensaCombinada
+    FROM bando_top_n t
+    JOIN Bando b ON b.NomeBando = t.NomeBando
+    WHERE t.n = %(num_membros)s
+      AND t.soma >= %(min_perigo)s
+      AND (b.NomeAlianca = %(alianca)s OR %(alianca)s IS NULL)
+    ORDER BY t.soma DESC;
+""", alternativa="periculosidade_janela")
+
+registrar("periculosidade_janela", """
+    WITH rank_piratas AS (
+        SELECT
+            NomeBando,
+            NomePersonagem,
+            Recompensa,
+            ROW_NUMBER() OVER (
+                PARTITION BY NomeBando
+                ORDER BY Recompensa DESC
+            ) AS rn
+        FROM Pirata
+    )
+    SELECT
+        b.NomeBando,
+        b.NomeAlianca,
+        SUM(rp.Recompensa) AS RecompensaCombinada
+    FROM rank_piratas rp
+    JOIN Bando b ON b.NomeBando = rp.NomeBando
+    WHERE rp.rn <= %(num_membros)s
+      AND (b.NomeAlianca = %(alianca)s OR %(alianca)s IS NULL)
+    GROUP BY b.NomeBando, b.NomeAlianca
+    HAVING SUM(rp.Recompensa) >= %(min_perigo)s
+    ORDER BY RecompensaCombinada DESC;
+""")
+
+#Consulta4 - Poneglyphs com ilha e região
+registrar("poneglyphs", """
+    SELECT
+        p.Tipo,
+        p.Conteudo,
+        i.NomeIlha,
+        i.Filiacao AS FiliacaoPolitica,
+        a.NomeArea
+    FROM Poneglyph p
+    JOIN Ilha i ON p.NomeIlha = i.NomeIlha
+    JOIN Area a ON i.NomeArea = a.NomeArea
+    WHERE (p.Tipo = %(tipo)s OR %(tipo)s IS NULL)
+      AND (a.NomeArea = %(area)s OR %(area)s IS NULL)
+    ORDER BY p.Tipo, i.NomeIlha;
+""", colunar=True)
+
+#Base do modo em memória: Pirata ⋈ Personagem ⋈ Bando sem filtros
+registrar("base_piratas", """
+    SELECT
+        p.NomePersonagem,
+        p.Alcunha,
+        pir.Recompensa AS Recompensa,
+        b.NomeBando,
+        b.RecompensaTotalBando,
+        b.NomeAlianca
+    FROM Pirata pir
+    JOIN Personagem p ON pir.NomePersonagem = p.NomePersonagem
+    JOIN Bando b ON pir.NomeBando = b.NomeBando;
+""", colunar=True, tempo_limite=120)
+
+
+# Sidebar "Estatísticas do Mundo": tudo em uma linha, lido da view materializada.
+# A versão direta é o mesmo cálculo em uma passada (também é a definição da view).
+registrar("snapshot_mundo_direto", """
+    SELECT
+        1 AS id,
+        mb.NomeBando AS nome_bando,
+        mb.RecompensaTotalBando AS valor_bando,
+        mp.NomePersonagem AS nome_pirata,
+        mp.Recompensa AS valor_pirata,
+        pir.qtd_piratas,
+        mar.qtd_marinha,
+        fr.qtd_frutas,
+        fr.qtd_logia,
+        fr.qtd_zoan,
+        fr.qtd_paramecia,
+        il.total_ilhas,
+        nv.navios_ativos,
+        now() AS atualizado_em
+    FROM (SELECT COUNT(*) AS qtd_piratas FROM Pirata) pir
+    CROSS JOIN (SELECT COUNT(*) AS qtd_marinha FROM Marinheiro) mar
+    CROSS JOIN (
+        -- ILIKE '%%Zoan%%' pega 'Zoan Mítica', 'Zoan Ancestral', etc.
+        SELECT
+            COUNT(*) AS qtd_frutas,
+            COUNT(*) FILTER (WHERE TipoFruta ILIKE '%%Logia%%') AS qtd_logia,
+            COUNT(*) FILTER (WHERE TipoFruta ILIKE '%%Zoan%%') AS qtd_zoan,
+            COUNT(*) FILTER (WHERE TipoFruta ILIKE '%%Paramecia%%') AS qtd_paramecia
+        FROM AkumaNoMi
+    ) fr
+    CROSS JOIN (SELECT COUNT(*) AS total_ilhas FROM Ilha) il
+    CROSS JOIN (SELECT COUNT(*) FILTER (WHERE Navegando = TRUE) AS navios_ativos FROM Navio) nv
+    LEFT JOIN LATERAL (
+        SELECT NomeBando, RecompensaTotalBando
+        FROM Bando
+        ORDER BY RecompensaTotalBando DESC NULLS LAST
+        LIMIT 1
+    ) mb ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT p.NomePersonagem, pi.Recompensa
+        FROM Pirata pi
+        JOIN Personagem p ON pi.NomePersonagem = p.NomePersonagem
+        ORDER BY pi.Recompensa DESC NULLS LAST
+        LIMIT 1
+    ) mp ON TRUE;
+""")
+
+registrar("snapshot_mundo", """
+    SELECT * FROM mv_estatisticas_mundo;
+""", alternativa="snapshot_mundo_direto")
+
+
+# Abas de estatísticas. Cada aba é um "lote": as consultas dele são disparadas
+# juntas (em paralelo, em conexões diferentes do pool) e voltam como um dict.
+
+LOTES = {}
+
+
+def lote(nome_lote, colunares=(), tempo_limite=TEMPO_LIMITE_PADRAO, **consultas_lote):
+    """Registra as consultas de um lote; a chave no dict é a usada pela aba.
+
+    As chaves listadas em colunares são lidas pelo caminho COPY + Arrow;
+    tempo_limite vale para todas as consultas do lote.
+    """
+    LOTES[nome_lote] = {}
+    for chave, sql in consultas_lote.items():
+        nome = f"{nome_lote}_{chave}"
+        registrar(nome, sql, colunar=chave in colunares, tempo_limite=tempo_limite)
+        LOTES[nome_lote][chave] = nome
+
+
+lote(
+    "stats_piratas",
+    total="SELECT COUNT(*) AS total_piratas FROM pirata;",
+    resumo="""
+        SELECT
+            AVG(recompensa) AS media,
+            PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY recompensa) AS mediana,
+            STDDEV(recompensa) AS desvio,
+            MIN(recompensa) AS minimo,
+            MAX(recompensa) AS maximo
+        FROM pirata;
+    """,
+    top10="""
+        SELECT nomepersonagem AS nomepirata, recompensa AS recompensa
+        FROM pirata
+        ORDER BY recompensa DESC
+        LIMIT 10;
+    """,
+    shichibukai="SELECT COUNT(*) AS total_shichibukai FROM Pirata WHERE Shichibukai = TRUE;",
+)
+
+lote(
+    "stats_bandos",
+    total="SELECT COUNT(*) AS total_bandos FROM bando;",
+    media="SELECT AVG(recompensatotalbando) AS media_bando FROM bando;",
+    top="""
+        SELECT nomebando, recompensatotalbando
+        FROM bando
+        ORDER BY recompensatotalbando DESC
+        LIMIT 10;
+    """,
+    capitao="""
+        SELECT
+            b.nomebando,
+            p.recompensa AS recompensacapitao,
+            b.recompensatotalbando,
+            CASE
+                WHEN p.recompensa > 0 THEN ROUND(b.recompensatotalbando::numeric / p.recompensa::numeric, 2)
+                ELSE NULL
+            END AS multiplicador
+        FROM bando b
+        JOIN pirata p ON p.nomepersonagem = b.piratacapitao
+        ORDER BY multiplicador DESC NULLS LAST;
+    """,
+)
+
+lote(
+    "stats_aliancas",
+    total="SELECT COUNT(*) AS total_aliancas FROM alianca;",
+    top="""
+        SELECT nomealianca, recompensatotalalianca
+        FROM alianca
+        ORDER BY recompensatotalalianca DESC;
+    """,
+    bandos="""
+        SELECT nomealianca, COUNT(*) AS total_bandos
+        FROM bando
+        WHERE nomealianca IS NOT NULL
+        GROUP BY nomealianca;
+    """,
+)
+
+lote(
+    "stats_frutas",
+    total="SELECT COUNT(*) AS total_frutas FROM akumanomi;",
+    tipos="""
+        SELECT tipofruta, COUNT(*) AS total
+        FROM akumanomi
+        GROUP BY tipofruta;
+    """,
+    media="""
+        SELECT
+            a.tipofruta,
+            AVG(p.recompensa) AS mediarecompensa
+        FROM pirata p
+        JOIN posse_fruta pf ON p.nomepersonagem = pf.nomepersonagem
+        JOIN akumanomi a ON pf.nomefruta = a.nomefruta
+        GROUP BY a.tipofruta
+        ORDER BY mediarecompensa DESC;
+    """,
+)
+
+lote(
+    "stats_especies",
+    total="SELECT COUNT(*) AS total_especies FROM especie;",
+    personagens="""
+        SELECT nomeespecie, COUNT(*) AS total_personagens
+        FROM filiacao_especie
+        GROUP BY nomeespecie
+        ORDER BY total_personagens DESC;
+    """,
+    media="""
+        SELECT fe.nomeespecie, AVG(p.recompensa) AS mediarecompensa
+        FROM pirata p
+        JOIN filiacao_especie fe ON p.nomepersonagem = fe.nomepersonagem
+        GROUP BY fe.nomeespecie
+        ORDER BY mediarecompensa DESC;
+    """,
+)
+
+lote(
+    "stats_navios",
+    total="SELECT COUNT(*) AS total_navios FROM navio;",
+    por_bando="""
+        SELECT nomebando, COUNT(*) AS total_navios
+        FROM navio
+        GROUP BY nomebando;
+    """,
+)
+
+lote(
+    "stats_ilhas_capitulos",
+    ilhas="SELECT COUNT(*) AS total_ilhas FROM ilha;",
+    capitulos="""
+        SELECT nomeilha, COUNT(*) AS total_capitulos
+        FROM localizacao_capitulo
+        GROUP BY nomeilha;
+    """,
+    aparicoes="""
+        SELECT nomepersonagem, COUNT(*) AS aparicoes
+        FROM aparicao_em_capitulo
+        GROUP BY nomepersonagem
+        ORDER BY aparicoes DESC
+        LIMIT 10;
+    """,
+)
+
+lote(
+    "stats_habilidades",
+    total="SELECT COUNT(*) AS total_habs FROM habilidade;",
+    ranking="""
+        SELECT nomepersonagem, COUNT(*) AS qtd_habs
+        FROM lista_habilidade
+        GROUP BY nomepersonagem
+        ORDER BY qtd_habs DESC
+        LIMIT 10;
+    """,
+)
+
+# A tabela Pirata inteira: mesmo tempo limite da outra leitura completa (aparicoes_desde)
+lote(
+    "stats_clusters",
+    colunares=("piratas",),
+    tempo_limite=120,
+    piratas="SELECT nomepersonagem AS nomepirata, recompensa AS recompensaindividual FROM pirata;",
+)
+
+# Quartis e outliers (IQR) da recompensa calculados no banco: só as linhas acima
+# do limite saem do Postgres. percentual é o tamanho da amostra (TABLESAMPLE
+# SYSTEM) usada nos quartis; com 100 a tabela inteira é lida e o valor é exato.
+# Quem escolhe o percentual é estatisticas.py, a partir de tamanho_pirata.
+
+registrar("tamanho_pirata", """
+    SELECT GREATEST(reltuples, 0)::bigint AS linhas
+    FROM pg_class
+    WHERE oid = 'pirata'::regclass;
+""")
+
+# Uma passada só: os quartis saem da amostra uma vez (CTE) e cada linha traz
+# q1/q3 junto com um outlier. O LEFT JOIN LATERAL garante uma linha (com o
+# pirata NULL) mesmo sem outliers; a subconsulta recebe o limite já calculado e
+# usa o índice idx_pirata_recompensa para ler só as linhas acima dele. O limite
+# vira bigint (o tipo da coluna) para o índice servir; com recompensas inteiras,
+# "> floor(limite)" é o mesmo que "> limite".
+registrar("outliers_recompensa", """
+    WITH quartis AS (
+        SELECT
+            PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY recompensa) AS q1,
+            PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY recompensa) AS q3,
+            COUNT(recompensa) AS amostra
+        FROM pirata TABLESAMPLE SYSTEM (%(percentual)s) REPEATABLE (0)
+    )
+    SELECT q.q1, q.q3, q.amostra, o.nomepirata, o.recompensaindividual
+    FROM quartis q
+    LEFT JOIN LATERAL (
+        SELECT nomepersonagem AS nomepirata, recompensa AS recompensaindividual
+        FROM pirata
+        WHERE recompensa > floor(q.q3 + 1.5 * (q.q3 - q.q1))::bigint
+    ) o ON true
+    ORDER BY o.recompensaindividual DESC;
+""")
+
+
+# Versões paginadas (keyset) das consultas que podem devolver tabelas inteiras.
+# As colunas chave_N formam a chave de ordenação: a próxima página começa depois
+# da chave da última linha (%(chave_N)s), e NULL nelas significa primeira página.
+# chave_N e limite são preenchidos por db.run_pagina.
+
+# Mesma ordem de "piratas_por_bando" (Recompensa DESC põe os NULL primeiro); a
+# recompensa entra na chave como (é NULL, valor) porque NULL não compara em linhas
+registrar("piratas_por_bando_pagina", """
+    SELECT
+        p.NomePersonagem,
+        p.Alcunha,
+        pir.Recompensa AS Recompensa,
+        b.NomeBando,
+        b.RecompensaTotalBando,
+        b.NomeAlianca,
+        b.RecompensaTotalBando AS chave_1,
+        pir.Recompensa IS NULL AS chave_2,
+        COALESCE(pir.Recompensa, 0) AS chave_3,
+        p.NomePersonagem AS chave_4
+    FROM Pirata pir
+    JOIN Personagem p ON pir.NomePersonagem = p.NomePersonagem
+    JOIN Bando b ON pir.NomeBando = b.NomeBando
+    WHERE b.RecompensaTotalBando >= %(min_recompensa)s
+      AND ((b.RecompensaTotalBando, pir.Recompensa IS NULL, COALESCE(pir.Recompensa, 0), p.NomePersonagem)
+           < (%(chave_1)s, %(chave_2)s, %(chave_3)s, %(chave_4)s)
+           OR %(chave_1)s IS NULL)
+    ORDER BY b.RecompensaTotalBando DESC, pir.Recompensa IS NULL DESC,
+             COALESCE(pir.Recompensa, 0) DESC, p.NomePersonagem DESC
+    LIMIT %(limite)s;
+""")
+
+registrar("personagens_fruta_pagina", """
+    SELECT
+        p.NomePersonagem,
+        p.Alcunha,
+        f.NomeEspecie,
+        pf.NomeFruta,
+        a.TipoFruta,
+        p.NomePersonagem AS chave_1,
+        pf.NomeFruta AS chave_2,
+        f.NomeEspecie AS chave_3
+    FROM Personagem p
+    JOIN Filiacao_Especie f ON p.NomePersonagem = f.NomePersonagem
+    JOIN Posse_Fruta pf ON p.NomePersonagem = pf.NomePersonagem
+    JOIN AkumaNoMi a ON pf.NomeFruta = a.NomeFruta
+    WHERE (f.NomeEspecie = %(especie)s OR %(especie)s IS NULL)
+      AND (a.TipoFruta = %(tipo_fruta)s OR %(tipo_fruta)s IS NULL)
+      AND ((p.NomePersonagem, pf.NomeFruta, f.NomeEspecie)
+           > (%(chave_1)s, %(chave_2)s, %(chave_3)s)
+           OR %(chave_1)s IS NULL)
+    ORDER BY p.NomePersonagem ASC, pf.NomeFruta ASC, f.NomeEspecie ASC
+    LIMIT %(limite)s;
+""")
+
+
+# Busca global (caixa de busca da aba "Consultas"): personagens por nome/alcunha,
+# frutas pelo nome e poneglyphs pelo conteúdo. Usa os índices GIN de expressão de
+# migracoes.py ("006_busca_textual"): palavras inteiras pelo to_tsvector (escrito
+# exatamente como no índice, senão o Postgres não o usa), nomes aproximados por trigramas (%(termo)s <% nome, ou seja, o termo
+# parecido com alguma parte do nome). Cada origem traz no máximo %(limite)s
+# linhas já ordenadas, e o total também é limitado.
+
+registrar("busca_global", """
+    SELECT origem, resultado, detalhe, relevancia
+    FROM (
+        (SELECT 'Personagem' AS origem, p.NomePersonagem AS resultado, p.Alcunha AS detalhe,
+                ts_rank(to_tsvector('simple', coalesce(p.NomePersonagem, '') || ' ' || coalesce(p.Alcunha, '')), websearch_to_tsquery('simple', %(termo)s))
+                + GREATEST(word_similarity(%(termo)s, p.NomePersonagem),
+                           word_similarity(%(termo)s, coalesce(p.Alcunha, ''))) AS relevancia
+         FROM Personagem p
+         WHERE to_tsvector('simple', coalesce(p.NomePersonagem, '') || ' ' || coalesce(p.Alcunha, '')) @@ websearch_to_tsquery('simple', %(termo)s)
+            OR %(termo)s <%% p.NomePersonagem
+            OR %(termo)s <%% p.Alcunha
+         ORDER BY relevancia DESC
+         LIMIT %(limite)s)
+        UNION ALL
+        (SELECT 'Akuma no Mi', a.NomeFruta, a.TipoFruta,
+                ts_rank(to_tsvector('simple', coalesce(a.NomeFruta, '')), websearch_to_tsquery('simple', %(termo)s))
+                + word_similarity(%(termo)s, a.NomeFruta)
+         FROM AkumaNoMi a
+         WHERE to_tsvector('simple', coalesce(a.NomeFruta, '')) @@ websearch_to_tsquery('simple', %(termo)s)
+            OR %(termo)s <%% a.NomeFruta
+         ORDER BY 4 DESC
+         LIMIT %(limite)s)
+        UNION ALL
+        (SELECT 'Poneglyph', pg.NomeIlha, pg.Conteudo,
+                ts_rank(to_tsvector('simple', coalesce(pg.Conteudo, '')), websearch_to_tsquery('simple', %(termo)s))
+         FROM Poneglyph pg
+         WHERE to_tsvector('simple', coalesce(pg.Conteudo, '')) @@ websearch_to_tsquery('simple', %(termo)s)
+         ORDER BY 4 DESC
+         LIMIT %(limite)s)
+    ) r
+    ORDER BY relevancia DESC, origem, resultado
+    LIMIT %(limite)s;
+""", alternativa="busca_global_simples", tempo_limite=5, extensao="pg_trgm")
+
+# Mesma busca sem a migração (nem pg_trgm): ILIKE lê as tabelas inteiras. A
+# relevância é a fração do texto coberta pelo termo.
+registrar("busca_global_simples", """
+    SELECT origem, resultado, detalhe, relevancia
+    FROM (
+        SELECT 'Personagem' AS origem, p.NomePersonagem AS resultado, p.Alcunha AS detalhe,
+               length(%(termo)s::text)::float / GREATEST(length(p.NomePersonagem), 1) AS relevancia
+        FROM Personagem p
+        WHERE p.NomePersonagem ILIKE '%%' || %(termo)s || '%%'
+           OR p.Alcunha ILIKE '%%' || %(termo)s || '%%'
+        UNION ALL
+        SELECT 'Akuma no Mi', a.NomeFruta, a.TipoFruta,
+               length(%(termo)s::text)::float / GREATEST(length(a.NomeFruta), 1)
+        FROM AkumaNoMi a
+        WHERE a.NomeFruta ILIKE '%%' || %(termo)s || '%%'
+        UNION ALL
+        SELECT 'Poneglyph', pg.NomeIlha, pg.Conteudo,
+               length(%(termo)s::text)::float / GREATEST(length(pg.Conteudo), 1)
+        FROM Poneglyph pg
+        WHERE pg.Conteudo ILIKE '%%' || %(termo)s || '%%'
+    ) r
+    ORDER BY relevancia DESC, origem, resultado
+    LIMIT %(limite)s;
+""", tempo_limite=15)
+
+
+# Grafo de coaparições (coaparicoes.py). A matriz personagem × capítulo é montada
+# uma vez e depois só recebe os capítulos novos (NumeroCapitulo > %(apos)s, NULL
+# na primeira carga). O resumo diz se algo mudou nos capítulos já carregados,
+# caso em que ela é refeita: ate_ultimo conta as linhas e assinatura soma um
+# hash de cada uma (a mesma "assinatura" que aparicoes_desde traz por linha), de
+# modo que trocar um personagem por outro no mesmo capítulo também aparece.
+# O nome da coluna do número do capítulo não aparece em nenhuma outra consulta
+# do app: NumeroCapitulo é suposição (a mesma do esquema de benchmark.py) e pode
+# ser trocado por COAPARICOES_COLUNA_CAPITULO sem mexer no SQL.
+COLUNA_CAPITULO = os.environ.get("COAPARICOES_COLUNA_CAPITULO", "NumeroCapitulo")
+if not COLUNA_CAPITULO.isidentifier():
+    raise ValueError(f"COAPARICOES_COLUNA_CAPITULO inválida: {COLUNA_CAPITULO!r}")
+
+registrar("aparicoes_resumo", f"""
+    SELECT
+        COUNT(*) FILTER (WHERE {COLUNA_CAPITULO} <= %(ate)s) AS ate_ultimo,
+        COALESCE(SUM(hashtext(NomePersonagem || ':' || {COLUNA_CAPITULO}))
+                 FILTER (WHERE {COLUNA_CAPITULO} <= %(ate)s), 0) AS assinatura,
+        MAX({COLUNA_CAPITULO}) AS ultimo
+    FROM Aparicao_em_capitulo;
+""")
+
+registrar("aparicoes_desde", f"""
+    SELECT {COLUNA_CAPITULO} AS NumeroCapitulo, NomePersonagem,
+           hashtext(NomePersonagem || ':' || {COLUNA_CAPITULO}) AS assinatura
+    FROM Aparicao_em_capitulo
+    WHERE {COLUNA_CAPITULO} > COALESCE(%(apos)s, -1)
+    ORDER BY {COLUNA_CAPITULO};
+""", colunar=True, tempo_limite=120)
@@ -0,0 +1,387 @@
+"""Camada de dados do app: cache de resultados + métricas + execução no banco.
+
+Os resultados devolvidos aqui são compartilhados entre sessões (vêm do cache
+em memória); quem for alterar um DataFrame deve trabalhar sobre uma cópia.
+
+Na frente do banco há um single-flight: pedidos iguais (mesma chave do cache)
+que chegam enquanto a consulta ainda roda esperam essa mesma execução em vez
+de disparar outra. Uma entrada vencida há menos de STALE_SEGUNDOS é devolvida
+na hora e atualizada em segundo plano (stale-while-revalidate), então o fim do
+TTL não faz todas as sessões consultarem o banco juntas. Entradas invalidadas
+por alteração nas tabelas somem do cache e nunca são servidas assim; execuções
+que já estavam lendo essas tabelas deixam de receber quem chega depois (que
+dispara uma execução nova) e o resultado delas não é guardado.
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+import assincrono
+import cache_resultados
+import consultas
+import db
+import memoria
+import metricas
+import migracoes
+
+# Por quanto tempo depois de vencer uma entrada ainda é servida enquanto é atualizada
+STALE_SEGUNDOS = float(os.environ.get("DASHBOARD_CACHE_STALE_SECONDS", "300"))
+
+cache = cache_resultados.criar_cache()
+
+# Tudo o que é preciso para buscar (ou recalcular) um resultado do cache
+Pedido = namedtuple("Pedido", "metrica chave tabelas calcular compartilhar")
+
+# Resultados vencidos servidos nesta thread (execução do script) porque a consulta
+# foi interrompida, até alguém ler com resultados_antigos()
+_antigos = threading.local()
+
+# Execuções em andamento, pela chave do cache (single-flight)
+_voos = {}
+_voos_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=db.POOL_MAX, thread_name_prefix="dados-voo")
+
+
+class _Voo:
+    """Uma execução em andamento, compartilhada por todos que pedirem a mesma chave.
+
+    esperando conta quem ainda aguarda o resultado; quando chega a zero (todos
+    foram substituídos por um rerun) a consulta é cancelada no servidor, a não
+    ser que alguém em segundo plano (aquecimento, revalidação) também dependa dela.
+    """
+
+    __slots__ = ("futuro", "esperando", "cancelavel", "tabelas")
+
+    def __init__(self, tabelas):
+        self.futuro = Future()
+        self.esperando = 0
+        self.cancelavel = True
+        self.tabelas = tabelas
+
+
+def _embarcar(pedidos, esperar=True):
+    """Entra na execução em andamento de cada chave ou cria uma nova.
+
+    Devolve ({chave: voo}, chaves dos voos novos); os novos precisam de _decolar.
+    """
+    voos, novos = {}, []
+    with _voos_lock:
+        for chave, pedido in pedidos.items():
+            voo = _voos.get(chave)
+            if voo is None:
+                voo = _voos[chave] = _Voo(pedido.tabelas)
+                novos.append(chave)
+            if esperar:
+                voo.esperando += 1
+            else:
+                voo.cancelavel = False
+            voos[chave] = voo
+    return voos, novos
+
+
+def _soltar_voos(tabela):
+    """Tira do single-flight as execuções que leem tabela (None: todas).
+
+    Chamada quando a tabela é invalidada: quem já espera continua esperando a
+    execução antiga, mas quem pedir depois começa uma nova, que já vê a alteração.
+    """
+    with _voos_lock:
+        for chave, voo in list(_voos.items()):
+            if tabela is None or tabela in voo.tabelas:
+                del _voos[chave]
+
+
+def _desembarcar(voos):
+    with _voos_lock:
+        for voo in voos.values():
+            voo.esperando -= 1
+
+
+def _decolar(pedidos, voos, executar, ttl=cache_resultados.TTL_PADRAO):
+    """Roda executar() -> {chave: valor} em outra thread, guarda no cache e libera quem espera."""
+    # Tiradas antes de começar: o que for invalidado durante a execução não é guardado
+    geracoes = {chave: cache.geracao(pedido.tabelas) for chave, pedido in pedidos.items()}
+
+    def abandonado():
+        # Verificação de db.py para esta execução: cancela quando ninguém mais espera
+        with _voos_lock:
+            if any(voo.esperando or not voo.cancelavel for voo in voos.values()):
+                return False
+            # Quem chegar depois disso começa uma execução nova
+            for chave, voo in voos.items():
+                if _voos.get(chave) is voo:
+                    del _voos[chave]
+            return True
+
+    def rodar():
+        try:
+            with db.verificacao(abandonado):
+                valores = executar()
+            for chave, valor in valores.items():
+                _guardar(pedidos[chave], valor, ttl, geracoes[chave])
+        except BaseException as exc:
+            for voo in voos.values():
+                voo.futuro.set_exception(exc)
+        else:
+            for chave, voo in voos.items():
+                voo.futuro.set_result(valores[chave])
+        finally:
+            with _voos_lock:
+                for chave, voo in voos.items():
+                    if _voos.get(chave) is voo:
+                        del _voos[chave]
+
+    _executor.submit(rodar)
+
+
+def _aguardar(voos):
+    """Espera os voos. Se quem pediu for substituído (rerun), desiste e lança db.ConsultaCancelada."""
+    futuros = [voo.futuro for voo in voos.values()]
+    try:
+        if db.execucao_superada() is None:
+            wait(futuros)
+        else:
+            while wait(futuros, timeout=db.INTERVALO_CANCELAMENTO).not_done:
+                if db.execucao_superada():
+                    raise db.ConsultaCancelada()
+        return {chave: voo.futuro.result() for chave, voo in voos.items()}
+    finally:
+        _desembarcar(voos)
+
+
+def _voar(pedidos, executar):
+    """Resultados de {chave: pedido} com uma única execução por chave no processo.
+
+    executar(chaves) calcula as chaves que ninguém está calculando e devolve
+    {chave: valor}; as demais esperam a execução que já está em andamento.
+    """
+    voos, novos = _embarcar(pedidos)
+    novos = _ja_guardados(voos, novos)
+    for chave in pedidos:
+        if chave not in novos:
+            metricas.registrar_compartilhada(pedidos[chave].metrica)
+    if novos:
+        _decolar(
+            {chave: pedidos[chave] for chave in novos},
+            {chave: voos[chave] for chave in novos},
+            lambda: executar(novos),
+        )
+    return _aguardar(voos)
+
+
+def _ja_guardados(voos, novos):
+    """Resolve pelo cache os voos novos cuja chave já foi guardada; devolve os que faltam.
+
+    Entre a falta no cache e o _embarcar, outra execução da mesma chave pode ter
+    terminado e guardado o resultado: sem olhar de novo ela seria repetida.
+    """
+    prontos = {}
+    for chave in novos:
+        entrada = cache.obter(chave)
+        if entrada is not None and not entrada.expirada:
+            prontos[chave] = entrada.valor
+    if prontos:
+        with _voos_lock:
+            for chave in prontos:
+                if _voos.get(chave) is voos[chave]:
+                    del _voos[chave]
+        for chave, valor in prontos.items():
+            voos[chave].futuro.set_result(valor)
+    return [chave for chave in novos if chave not in prontos]
+
+
+def _revalidavel(entrada):
+    return entrada is not None and time.time() < entrada.expira_em + STALE_SEGUNDOS
+
+
+def _revalidar(pedido):
+    """Atualiza a entrada em segundo plano (se ninguém já estiver atualizando)."""
+    def avisar_falha(futuro):
+        # Ninguém espera este resultado: a falha só aparece no log (a entrada vencida continua)
+        if futuro.exception() is not None:
+            print(f"[cache] falha ao revalidar {pedido.metrica}: {futuro.exception()}")
+
+    voos, novos = _embarcar({pedido.chave: pedido}, esperar=False)
+    if novos:
+        metricas.registrar_revalidacao(pedido.metrica)
+        voos[pedido.chave].futuro.add_done_callback(avisar_falha)
+        _decolar({pedido.chave: pedido}, voos, lambda: {pedido.chave: pedido.calcular()})
+
+
+def _obter(pedido):
+    metricas.registrar_chamada(pedido.metrica)
+    entrada = cache.obter(pedido.chave)
+    if entrada is not None and not entrada.expirada:
+        return entrada.valor
+    if _revalidavel(entrada):
+        # Vencida há pouco: responde com ela e atualiza uma vez, em segundo plano
+        _revalidar(pedido)
+        return entrada.valor
+    metricas.registrar_falha_cache(pedido.metrica)
+    try:
+        return _voar({pedido.chave: pedido}, lambda chaves: {pedido.chave: pedido.calcular()})[pedido.chave]
+    except db.INTERROMPIDA:
+        # Consulta cancelada ou acima do statement_timeout: serve o último resultado
+        # guardado para a mesma chave, mesmo vencido; sem ele, a exceção segue
+        entrada = cache.obter(pedido.chave)
+        if entrada is None:
+            raise
+        _servir_antigo(pedido, entrada)
+        return entrada.valor
+
+
+def _servir_antigo(pedido, entrada):
+    metricas.registrar_resultado_antigo(pedido.metrica)
+    if not hasattr(_antigos, "vencidos"):
+        _antigos.vencidos = []
+    _antigos.vencidos.append((pedido.metrica, time.time() - entrada.expira_em))
+
+
+def resultados_antigos():
+    """[(métrica, segundos desde que venceu)] dos resultados vencidos servidos nesta thread.
+
+    Só os servidos porque a consulta foi cancelada ou passou do tempo limite;
+    a lista é esvaziada a cada chamada.
+    """
+    vencidos = getattr(_antigos, "vencidos", [])
+    _antigos.vencidos = []
+    return vencidos
+
+
+def _guardar(pedido, valor, ttl=cache_resultados.TTL_PADRAO, geracao=None):
+    entrada = cache_resultados.Entrada(
+        valor, time.time() + ttl, pedido.tabelas, cache_resultados.tamanho(valor)
+    )
+    cache.guardar(pedido.chave, entrada, pedido.compartilhar, geracao)
+    return entrada
+
+
+def atualizar(pedido, ttl=cache_resultados.TTL_PADRAO):
+    """Recalcula o resultado e grava no cache, esteja ele válido ou não.
+
+    Se a mesma chave já está sendo calculada, espera essa execução.
+    """
+    voos, novos = _embarcar({pedido.chave: pedido}, esperar=False)
+    if novos:
+        _decolar({pedido.chave: pedido}, voos, lambda: {pedido.chave: pedido.calcular()}, ttl)
+    return voos[pedido.chave].futuro.result()
+
+
+def _normalizados(c, params):
+    # Parâmetros normalizados pela ordem do registro (ausente == None)
+    return dict(zip(c.parametros, c.valores(params)))
+
+
+def pedido_consulta(nome, **params):
+    c = consultas.get(nome)
+    normalizados = _normalizados(c, params)
+    return Pedido(
+        nome,
+        cache_resultados.chave(nome, normalizados),
+        c.tabelas_com_alternativa(),
+        lambda: db.executar(c, normalizados),
+        True,
+    )
+
+
+def pedido_lote(nome_lote):
+    nomes = consultas.LOTES[nome_lote]
+    tabelas = frozenset().union(*(consultas.get(n).tabelas_com_alternativa() for n in nomes.values()))
+    return Pedido(
+        f"lote:{nome_lote}",
+        cache_resultados.chave(f"lote:{nome_lote}"),
+        tabelas,
+        lambda: assincrono.run_queries(nomes),
+        True,
+    )
+
+
+def pedido_pagina(nome, apos, tamanho, **params):
+    c = consultas.get(nome)
+    return Pedido(
+        nome,
+        cache_resultados.chave(nome, dict(params, apos=apos, tamanho=tamanho)),
+        c.tabelas,
+        lambda: db.run_pagina(c, params, apos, tamanho),
+        True,
+    )
+
+
+def pedido_base_memoria():
+    c = consultas.get("base_piratas")
+    # O objeto com os arrays pré-calculados fica só na memória deste processo
+    return Pedido(
+        "base_piratas",
+        cache_resultados.chave("base_memoria"),
+        c.tabelas,
+        lambda: memoria.BaseMemoria(db.executar(c)),
+        False,
+    )
+
+
+def consulta(nome, **params):
+    return _obter(pedido_consulta(nome, **params))
+
+
+def varias(pedidos):
+    """Várias consultas do registro de uma vez: {chave: (nome, params)} -> {chave: DataFrame}.
+
+    O que já está no cache sai de lá; o resto é executado ao mesmo tempo e
+    guardado, então quem pedir depois com os mesmos parâmetros já encontra.
+    Chaves que outra sessão já está calculando esperam aquela execução.
+    """
+    resultados, faltando, argumentos, antigas = {}, {}, {}, {}
+    for chave, (nome, params) in pedidos.items():
+        pedido = pedido_consulta(nome, **params)
+        metricas.registrar_chamada(pedido.metrica)
+        entrada = cache.obter(pedido.chave)
+        if entrada is not None and not entrada.expirada:
+            resultados[chave] = entrada.valor
+            continue
+        if _revalidavel(entrada):
+            _revalidar(pedido)
+            resultados[chave] = entrada.valor
+            continue
+        metricas.registrar_falha_cache(pedido.metrica)
+        faltando[chave] = pedido
+        argumentos[pedido.chave] = (nome, _normalizados(consultas.get(nome), params))
+        if entrada is not None:
+            antigas[chave] = entrada
+
+    try:
+        # As chaves que ninguém está calculando vão juntas para o asyncio
+        valores = _voar(
+            {pedido.chave: pedido for pedido in faltando.values()},
+            lambda chaves: assincrono.run_queries({c: argumentos[c] for c in chaves}),
+        )
+    except db.INTERROMPIDA:
+        # Como em _obter: só dá para responder se todas as que faltam têm resultado antigo
+        if len(antigas) < len(faltando):
+            raise
+        for chave, entrada in antigas.items():
+            _servir_antigo(faltando[chave], entrada)
+            resultados[chave] = entrada.valor
+        return resultados
+
+    for chave, pedido in faltando.items():
+        resultados[chave] = valores[pedido.chave]
+    return resultados
+
+
+def lote(nome_lote):
+    return _obter(pedido_lote(nome_lote))
+
+
+def pagina(nome, apos, tamanho, **params):
+    return _obter(pedido_pagina(nome, apos, tamanho, **params))
+
+
+def base_memoria():
+    return _obter(pedido_base_memoria())
+
+
+def iniciar_invalidacao():
+    """Começa a escutar os NOTIFY de alteração de tabelas (uma thread por processo)."""
+    return cache_resultados.iniciar_escuta(migracoes.conectar, cache, _soltar_voos)
@@ -0,0 +1,533 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as EsperaEsgotada
+from contextlib import contextmanager
+from decimal import Decimal
+
+import pandas as pd
+import psycopg2
+import psycopg2.errors
+from psycopg2 import extensions
+from psycopg2 import pool as pg_pool
+
+import consultas
+import metricas
+
+DATABASE_URL = os.environ.get("DATABASE_URL")
+
+# Limites do pool (podem ser ajustados por variável de ambiente). POOL_MIN é só
+# quantas conexões abrem junto com o pool: devolvidas, até POOL_MAX ficam abertas
+POOL_MIN = int(os.environ.get("DB_POOL_MIN", "1"))
+POOL_MAX = int(os.environ.get("DB_POOL_MAX", "10"))
+
+# Conexões paradas há mais tempo que isso passam por um "SELECT 1" antes do uso
+HEALTHCHECK_SEGUNDOS = float(os.environ.get("DB_POOL_HEALTHCHECK_SECONDS", "30"))
+
+# Tentativas extras quando a conexão cai no meio de uma consulta
+TENTATIVAS_RECONEXAO = 2
+
+# De quanto em quanto tempo (s) quem espera uma consulta confere se ela ainda interessa
+INTERVALO_CANCELAMENTO = float(os.environ.get("DB_INTERVALO_CANCELAMENTO_SECONDS", "0.05"))
+
+_pool = None
+_pool_lock = threading.Lock()
+# O ThreadedConnectionPool lança erro quando esgota; o semáforo faz a thread esperar
+_vagas = threading.BoundedSemaphore(POOL_MAX)
+# Último uso de cada conexão aberta do pool, por id(conn)
+_ultimo_uso = {}
+# Threads que executam as consultas canceláveis enquanto quem pediu espera
+_executor = ThreadPoolExecutor(max_workers=POOL_MAX, thread_name_prefix="db-consulta")
+# Ver definir_verificacao e verificacao
+_superada = None
+_local = threading.local()
+
+
+class ConsultaCancelada(Exception):
+    """A consulta foi cancelada no servidor porque o resultado deixou de interessar."""
+
+
+# Consulta interrompida no servidor: cancelada por nós ou acima do statement_timeout
+INTERROMPIDA = (ConsultaCancelada, psycopg2.errors.QueryCanceled)
+
+
+class ConexaoDashboard(extensions.connection):
+    """Conexão que lembra quais consultas do registro já foram preparadas nela,
+    o statement_timeout em vigor na sessão (None = o padrão do servidor) e se
+    plan_cache_mode está em force_custom_plan."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.preparadas = set()
+        self.tempo_limite_ms = None
+        self.plano_custom = False
+
+
+def definir_verificacao(funcao):
+    """Registra a função que diz se quem pediu as consultas ainda espera por elas.
+
+    funcao() é chamada na thread que pediu a consulta e devolve True quando a
+    execução foi substituída (ex.: o Streamlit recebeu um novo rerun), False
+    quando não foi e None quando não há como saber (threads de fundo). Com
+    True a consulta é cancelada no servidor e ConsultaCancelada é lançada.
+    """
+    global _superada
+    _superada = funcao
+
+
+@contextmanager
+def verificacao(funcao):
+    """Usa funcao no lugar da verificação registrada, só nesta thread.
+
+    Para quem executa consultas em nome de outros (ex.: o single-flight de
+    dados.py, que cancela quando ninguém mais espera o resultado).
+    """
+    anterior = getattr(_local, "verificar", None)
+    _local.verificar = funcao
+    try:
+        yield
+    finally:
+        _local.verificar = anterior
+
+
+def execucao_superada():
+    verificar = getattr(_local, "verificar", None) or _superada
+    return None if verificar is None else verificar()
+
+
+def tempo_limite_ms(consulta):
+    return int(consulta.tempo_limite * 1000)
+
+
+def comandos_sessao(conn, consulta):
+    """SETs que faltam na sessão de conn para rodar consulta ("" se nada muda).
+
+    statement_timeout e plan_cache_mode valem para a sessão: só são enviados
+    quando mudam de uma consulta para outra. As consultas com filtro opcional
+    (Consulta.plano_custom) forçam o plano custom, porque o plano genérico
+    que o Postgres adota depois de cinco EXECUTEs não usa os índices; as
+    demais ficam com o padrão e reaproveitam o plano do prepared statement.
+    """
+    comandos = []
+    ms = tempo_limite_ms(consulta)
+    if conn.tempo_limite_ms != ms:
+        comandos.append(f"SET statement_timeout = {ms};")
+    if conn.plano_custom != consulta.plano_custom:
+        comandos.append(
+            "SET plan_cache_mode = force_custom_plan;" if consulta.plano_custom else "RESET plan_cache_mode;"
+        )
+    return " ".join(comandos)
+
+
+def sessao_ajustada(conn, consulta):
+    """Registra em conn que os comandos_sessao de consulta foram executados."""
+    conn.tempo_limite_ms = tempo_limite_ms(consulta)
+    conn.plano_custom = consulta.plano_custom
+
+
+def _ajustar_sessao(conn, consulta):
+    comandos = comandos_sessao(conn, consulta)
+    if comandos:
+        with conn.cursor() as cur:
+            cur.execute(comandos)
+        sessao_ajustada(conn, consulta)
+
+
+class _Pool(pg_pool.ThreadedConnectionPool):
+    """ThreadedConnectionPool que mantém abertas até maxconn conexões ociosas.
+
+    O do psycopg2 fecha toda conexão devolvida quando já tem minconn paradas:
+    com consultas simultâneas, quase todo empréstimo abriria uma sessão nova
+    (e perderia os PREPARE e o statement_timeout já enviados nela).
+    """
+
+    def _putconn(self, conn, key=None, close=False):
+        # Chamado com o lock do pool: o limite de ociosas passa a ser maxconn
+        minimo, self.minconn = self.minconn, self.maxconn
+        try:
+            super()._putconn(conn, key, close)
+        finally:
+            self.minconn = minimo
+        if conn.closed:
+            # O id pode ser reaproveitado por uma conexão nova
+            _ultimo_uso.pop(id(conn), None)
+
+
+def get_pool():
+    """Cria o pool na primeira chamada e reaproveita nas seguintes."""
+    global _pool
+    if _pool is None or _pool.closed:
+        with _pool_lock:
+            if _pool is None or _pool.closed:
+                _ultimo_uso.clear()
+                _pool = _Pool(
+                    POOL_MIN, POOL_MAX, DATABASE_URL,
+                    connection_factory=ConexaoDashboard,
+                )
+    return _pool
+
+
+def _conexao_saudavel(conn):
+    # Checagem rápida: conexão fechada ou em estado inválido é descartada
+    if conn.closed:
+        return False
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1;")
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _checkout():
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        # O dashboard só lê dados; autocommit evita sessões "idle in transaction"
+        # (e precisa vir antes do "SELECT 1", que senão abriria uma transação)
+        if not conn.closed and not conn.autocommit:
+            conn.autocommit = True
+        # Conexões recém-abertas ainda não têm último uso e não precisam de checagem
+        ultimo = _ultimo_uso.get(id(conn))
+        ocioso = ultimo is not None and time.monotonic() - ultimo > HEALTHCHECK_SEGUNDOS
+        if conn.closed or (ocioso and not _conexao_saudavel(conn)):
+            # Conexão quebrada: devolve fechando e pede uma nova ao pool
+            pool.putconn(conn, close=True)
+            conn = None
+            conn = pool.getconn()
+            conn.autocommit = True
+    except BaseException:
+        # Sem isso a conexão ficaria emprestada para sempre e o pool esgotaria.
+        # Mesmo fechada ela precisa voltar: só o putconn libera a vaga no pool
+        if conn is not None:
+            pool.putconn(conn, close=True)
+        raise
+    return conn
+
+
+@contextmanager
+def conexao():
+    """Empresta uma conexão do pool pelo tempo de uma consulta."""
+    _vagas.acquire()
+    try:
+        conn = _checkout()
+    except BaseException:
+        _vagas.release()
+        raise
+    try:
+        yield conn
+    finally:
+        # Conexões que caíram durante o uso são fechadas em vez de voltar ao pool
+        if conn.closed:
+            get_pool().putconn(conn, close=True)
+        else:
+            _ultimo_uso[id(conn)] = time.monotonic()
+            get_pool().putconn(conn)
+        _vagas.release()
+
+
+def _com_reconexao(executar):
+    """Roda executar(conn) em uma conexão do pool.
+
+    Se a conexão cair durante a execução, ela é descartada e a execução é
+    repetida em uma conexão nova.
+    """
+    for tentativa in range(TENTATIVAS_RECONEXAO + 1):
+        with conexao() as conn:
+            try:
+                return _cancelavel(conn, executar)
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                # Só repete se o erro derrubou a conexão (não em timeouts, por exemplo)
+                if not conn.closed or tentativa == TENTATIVAS_RECONEXAO:
+                    raise
+        time.sleep(0.1 * (tentativa + 1))
+
+
+def _cancelavel(conn, executar):
+    """executar(conn), cancelando a consulta no servidor se ela deixar de interessar.
+
+    Sem como saber (ver definir_verificacao) roda direto nesta thread. Senão a
+    consulta roda em outra thread e esta confere a cada INTERVALO_CANCELAMENTO;
+    conn.cancel() faz o Postgres parar o trabalho e a conexão volta ao pool.
+    """
+    if execucao_superada() is None:
+        return executar(conn)
+    futuro = _executor.submit(executar, conn)
+    try:
+        while True:
+            try:
+                return futuro.result(timeout=INTERVALO_CANCELAMENTO)
+            except EsperaEsgotada:
+                if execucao_superada():
+                    break
+    except BaseException:
+        # Interrompido enquanto esperava: a conexão só pode voltar ao pool
+        # depois que a outra thread largar dela
+        if not futuro.done():
+            conn.cancel()
+            wait([futuro])
+        raise
+    conn.cancel()
+    try:
+        # Espera a thread terminar antes de devolver a conexão; se a consulta
+        # acabou antes do cancelamento chegar, o resultado ainda serve
+        return futuro.result()
+    except psycopg2.errors.QueryCanceled:
+        raise ConsultaCancelada() from None
+
+
+def _dataframe(cur):
+    columns = [desc[0] for desc in cur.description]
+    data = cur.fetchall()
+    return pd.DataFrame(data, columns=columns)
+
+
+def run_query(query, params=None):
+    """Executa SQL avulso em uma conexão do pool e devolve um DataFrame."""
+    def executar(conn):
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            return _dataframe(cur)
+
+    return _com_reconexao(executar)
+
+
+def run_prepared(consulta, params=None):
+    """Executa uma consulta do registro como prepared statement.
+
+    O PREPARE acontece uma vez por conexão do pool; depois disso só o EXECUTE
+    com os parâmetros é enviado, e o Postgres reaproveita o plano.
+    """
+    valores = consulta.valores(params)
+
+    def executar(conn):
+        _ajustar_sessao(conn, consulta)
+        with conn.cursor() as cur:
+            if consulta.nome not in conn.preparadas:
+                cur.execute(f"PREPARE {consulta.nome} AS {consulta.sql_preparado()};")
+                conn.preparadas.add(consulta.nome)
+            if valores:
+                marcadores = ", ".join(["%s"] * len(valores))
+                cur.execute(f"EXECUTE {consulta.nome} ({marcadores});", valores)
+            else:
+                cur.execute(f"EXECUTE {consulta.nome};")
+            return _dataframe(cur)
+
+    return _com_reconexao(executar)
+
+
+def _sql_com_valores(cur, consulta, params):
+    # COPY não aceita parâmetros nem EXECUTE: os valores são escapados pelo psycopg2
+    sql = consulta.sql.strip().rstrip(";")
+    if not consulta.parametros:
+        return sql.replace("%%", "%")
+    valores = dict(zip(consulta.parametros, consulta.valores(params)))
+    return cur.mogrify(sql, valores).decode(extensions.encodings[cur.connection.encoding])
+
+
+# Tipos do Postgres (OID) com tipo Arrow equivalente ao que o psycopg2 devolve no
+# caminho de tuplas. NUMERIC é convertido para Decimal depois do Arrow; TIMESTAMPTZ
+# chega em UTC (no caminho de tuplas vem no fuso da sessão: mesmo dtype quando o
+# TimeZone é UTC). Qualquer outro tipo chega como texto, o que NÃO é o que o
+# psycopg2 faz com json/jsonb (dict), arrays (list), interval (timedelta) etc.:
+# consultas colunares devem devolver só os tipos abaixo, texto ou NUMERIC.
+_TIPOS_ARROW = {
+    16: "bool_",      # boolean
+    20: "int64",      # bigint
+    21: "int64",      # smallint
+    23: "int64",      # integer
+    700: "float64",   # real
+    701: "float64",   # double precision
+    1082: "date32",   # date
+}
+_NUMERIC = 1700
+_TIMESTAMP = 1114
+_TIMESTAMPTZ = 1184
+_TIME = 1083
+
+# Colunas (nome, OID) do resultado de cada consulta colunar, descobertas uma vez
+_colunas_colunares = {}
+# Threads que convertem o CSV enquanto o COPY ainda está chegando
+_executor_csv = ThreadPoolExecutor(max_workers=POOL_MAX, thread_name_prefix="db-csv")
+
+
+def _colunas(cur, consulta, sql):
+    # O COPY não tem cur.description: um LIMIT 0 só planeja e devolve os tipos
+    if consulta.nome not in _colunas_colunares:
+        cur.execute(f"SELECT * FROM ({sql}) AS resultado LIMIT 0;")
+        _colunas_colunares[consulta.nome] = [(desc.name, desc.type_code) for desc in cur.description]
+    return _colunas_colunares[consulta.nome]
+
+
+def _tipo_arrow(oid):
+    import pyarrow as pa
+
+    if oid == _TIMESTAMP:
+        return pa.timestamp("us")
+    if oid == _TIMESTAMPTZ:
+        # O CSV traz o deslocamento ("+00", "-03"); o Arrow converte para UTC
+        return pa.timestamp("us", tz="UTC")
+    if oid == _TIME:
+        return pa.time64("us")
+    if oid in _TIPOS_ARROW:
+        return getattr(pa, _TIPOS_ARROW[oid])()
+    return pa.string()
+
+
+class _Contador:
+    """Arquivo de escrita para o copy_expert que conta os bytes recebidos."""
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self.bytes = 0
+
+    def write(self, dados):
+        self.bytes += len(dados)
+        return self.arquivo.write(dados)
+
+
+def _ler_csv(entrada, colunas):
+    from pyarrow import csv as pa_csv
+
+    try:
+        leitor = pa_csv.open_csv(
+            entrada,
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(
+                # Tipos vindos do Postgres: nada é adivinhado a partir do conteúdo
+                column_types={nome: _tipo_arrow(oid) for nome, oid in colunas},
+                # No CSV do Postgres, NULL é campo vazio sem aspas e '' é ""
+                strings_can_be_null=True,
+                quoted_strings_can_be_null=False,
+                # Só valem para as colunas boolean
+                true_values=["t"],
+                false_values=["f"],
+            ),
+        )
+        return leitor.read_all()
+    except BaseException:
+        # Esvazia o pipe para o COPY do outro lado não ficar bloqueado escrevendo
+        while entrada.read(1 << 16):
+            pass
+        raise
+
+
+def run_colunar(consulta, params=None):
+    """Executa a consulta via COPY ... TO STDOUT e monta o DataFrame pelo Arrow.
+
+    Em vez de uma tupla Python por linha (fetchall), o resultado chega como CSV
+    e é convertido coluna a coluna pelo pyarrow, o que usa bem menos memória e
+    CPU em resultados grandes ou com textos longos. O CSV passa por um pipe e é
+    convertido em blocos enquanto o COPY chega, sem ficar inteiro na memória;
+    o pico é a tabela Arrow mais o DataFrame, liberados coluna a coluna.
+
+    Os tipos das colunas vêm do Postgres, e o resultado tem os mesmos dtypes de
+    run_prepared (NUMERIC vira Decimal, texto continua texto).
+    """
+    def executar(conn):
+        _ajustar_sessao(conn, consulta)
+        with conn.cursor() as cur:
+            sql = _sql_com_valores(cur, consulta, params)
+            colunas = _colunas(cur, consulta, sql)
+            leitura, escrita = os.pipe()
+            with open(leitura, "rb") as entrada, open(escrita, "wb") as saida:
+                leitor = _executor_csv.submit(_ler_csv, entrada, colunas)
+                contador = _Contador(saida)
+                try:
+                    cur.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)", contador)
+                finally:
+                    # Fim do arquivo para o leitor; a entrada só fecha depois que ele terminar
+                    saida.close()
+                    wait([leitor])
+            return leitor.result(), colunas, contador.bytes
+
+    tabela, colunas, bytes_lidos = _com_reconexao(executar)
+    # split_blocks/self_destruct liberam o buffer Arrow conforme as colunas são convertidas
+    df = tabela.to_pandas(split_blocks=True, self_destruct=True)
+    for nome, oid in colunas:
+        if oid == _NUMERIC:
+            df[nome] = df[nome].map(Decimal, na_action="ignore")
+    df.attrs["bytes_lidos"] = bytes_lidos
+    return df
+
+
+def _medir(nome, buscar):
+    """Executa buscar() registrando tempo, linhas e bytes em metricas."""
+    inicio = time.perf_counter()
+    try:
+        df = buscar()
+    except ConsultaCancelada:
+        metricas.registrar_execucao(nome, time.perf_counter() - inicio, cancelada=True)
+        raise
+    except BaseException:
+        metricas.registrar_execucao(nome, time.perf_counter() - inicio, erro=True)
+        raise
+    _registrar(nome, time.perf_counter() - inicio, df)
+    return df
+
+
+def _registrar(nome, segundos, df):
+    # No caminho colunar o tamanho do CSV é conhecido; no outro, estima pela memória do frame
+    bytes_lidos = df.attrs.pop("bytes_lidos", None)
+    if bytes_lidos is None:
+        bytes_lidos = int(df.memory_usage(deep=True).sum())
+    metricas.registrar_execucao(nome, segundos, len(df), bytes_lidos)
+
+
+def executar(consulta, params=None, colunar=None):
+    """Executa uma consulta do registro pelo caminho configurado nela.
+
+    colunar=None usa o padrão da consulta; True/False força um dos caminhos.
+    """
+    return _medir(consulta.nome, lambda: _executar(consulta, params, colunar))
+
+
+# Erro de um objeto de migracoes.py (tabela ou view) que ainda não existe no banco
+OBJETO_AUSENTE = (psycopg2.errors.UndefinedTable,)
+
+
+def erros_alternativa(consulta):
+    """Erros que fazem consulta cair na alternativa.
+
+    Função ou operador inexistente só conta nas consultas que dependem de uma
+    extensão (Consulta.extensao); nas demais é erro no SQL e deve aparecer.
+    """
+    if consulta.extensao is not None:
+        return OBJETO_AUSENTE + (psycopg2.errors.UndefinedFunction,)
+    return OBJETO_AUSENTE
+
+
+def _executar(consulta, params, colunar):
+    if colunar is None:
+        colunar = consulta.colunar
+    try:
+        if colunar:
+            return run_colunar(consulta, params)
+        return run_prepared(consulta, params)
+    except erros_alternativa(consulta):
+        # Objeto de migracoes.py ainda não criado: usa a consulta equivalente
+        if consulta.alternativa is None:
+            raise
+        return _executar(consultas.get(consulta.alternativa), params, colunar)
+
+
+def run_pagina(consulta, params=None, apos=None, tamanho=100):
+    """Busca uma página de uma consulta paginada por keyset.
+
+    apos é a chave da última linha da página anterior (None na primeira).
+    Devolve (DataFrame sem as colunas chave_N, chave da última linha ou None
+    se não há próxima página). Cada página é um EXECUTE com LIMIT, então o
+    Postgres só produz as linhas dela; uma linha a mais diz se há outra página.
+    """
+    chaves = [nome for nome in consulta.parametros if nome.startswith("chave_")]
+    params = dict(params or {}, limite=tamanho + 1)
+    params.update(zip(chaves, apos or [None] * len(chaves)))
+
+    df = _medir(consulta.nome, lambda: run_prepared(consulta, params))
+    proxima = None
+    if len(df) > tamanho:
+        df = df.iloc[:tamanho]
+        # tolist() devolve escalares Python, que o psycopg2 sabe adaptar
+        proxima = tuple(df[chave].iloc[-1:].tolist()[0] for chave in chaves)
+    return df.drop(columns=chaves), proxima
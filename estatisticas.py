@@ -0,0 +1,52 @@
+"""Estatísticas calculadas no servidor (quartis e outliers da recompensa).
+
+Em vez de trazer a tabela pirata inteira para o pandas, os quartis e o filtro
+de outliers rodam no Postgres e só as linhas acima do limite voltam. Em
+tabelas muito grandes os quartis saem de uma amostra por blocos
+(TABLESAMPLE SYSTEM), que lê só uma fração das páginas.
+"""
+import os
+
+import dados
+
+# Acima disso (linhas estimadas pelo último ANALYZE) os quartis são aproximados
+LIMITE_EXATO = int(os.environ.get("ESTATISTICAS_LIMITE_EXATO", "1000000"))
+# Quantas linhas a amostra tenta ler quando é usada
+LINHAS_AMOSTRA = int(os.environ.get("ESTATISTICAS_LINHAS_AMOSTRA", "200000"))
+
+
+def percentual_amostra():
+    """100 (tabela inteira) ou a porcentagem de páginas para ~LINHAS_AMOSTRA linhas."""
+    linhas = int(dados.consulta("tamanho_pirata")["linhas"].iloc[0])
+    if linhas <= LIMITE_EXATO:
+        return 100.0
+    # Arredondado para a chave do cache não mudar a cada ANALYZE
+    return round(max(0.01, 100.0 * LINHAS_AMOSTRA / linhas), 2)
+
+
+def _numero(valor):
+    return None if valor is None or valor != valor else float(valor)
+
+
+def outliers_recompensa():
+    """Devolve (quartis, outliers).
+
+    quartis é um dict com q1, q3, iqr, limite (q3 + 1.5 · iqr) e aproximado;
+    outliers tem só os piratas com recompensa acima do limite.
+    """
+    percentual = percentual_amostra()
+    # Os quartis vêm repetidos em cada linha (e numa linha sem pirata se não há outliers)
+    resultado = dados.consulta("outliers_recompensa", percentual=percentual)
+
+    linha = resultado.iloc[0]
+    q1, q3 = _numero(linha["q1"]), _numero(linha["q3"])
+    iqr = None if q1 is None else q3 - q1
+    quartis = {
+        "q1": q1,
+        "q3": q3,
+        "iqr": iqr,
+        "limite": None if iqr is None else q3 + 1.5 * iqr,
+        "aproximado": percentual < 100,
+    }
+    outliers = resultado.loc[resultado["nomepirata"].notna(), ["nomepirata", "recompensaindividual"]]
+    return quartis, outliers.reset_index(drop=True)
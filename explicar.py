@@ -0,0 +1,102 @@
+"""Roda EXPLAIN (ANALYZE, BUFFERS) em todas as consultas do registro e aponta Seq Scans.
+
+Uso: python explicar.py [--min-linhas N] [--estrito]
+
+--min-linhas  ignora Seq Scans em tabelas com menos linhas que N (padrão 1000);
+              em tabelas pequenas o Postgres prefere varrer mesmo com índice.
+--estrito     termina com código 1 se algum Seq Scan for encontrado.
+"""
+import argparse
+import json
+import sys
+
+import psycopg2
+
+import consultas
+import migracoes
+
+# Valores usados nos parâmetros ao explicar; os ausentes vão como NULL,
+# que nos filtros opcionais equivale a "Todas"/"Todos"
+EXEMPLOS = {
+    "min_recompensa": 0,
+    "num_membros": 3,
+    "min_perigo": 0,
+    "limite": 100,
+    "percentual": 100,
+    "termo": "Luffy",
+}
+
+
+def _nos(plano):
+    yield plano
+    for filho in plano.get("Plans", []):
+        yield from _nos(filho)
+
+
+def explicar(cur, consulta):
+    params = {nome: EXEMPLOS.get(nome) for nome in consulta.parametros}
+    sql = consulta.sql.strip().rstrip(";")
+    if params:
+        sql = cur.mogrify(sql, params).decode()
+    else:
+        sql = sql.replace("%%", "%")
+    cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")
+    resultado = cur.fetchone()[0]
+    if isinstance(resultado, str):
+        resultado = json.loads(resultado)
+    return resultado[0]
+
+
+def seq_scans(explicado, min_linhas):
+    achados = []
+    for no in _nos(explicado["Plan"]):
+        if no["Node Type"] != "Seq Scan":
+            continue
+        # Linhas lidas = devolvidas + descartadas pelo filtro, por loop
+        lidas = (no.get("Actual Rows", 0) + no.get("Rows Removed by Filter", 0)) * no.get("Actual Loops", 1)
+        if lidas >= min_linhas:
+            achados.append({
+                "tabela": no.get("Relation Name"),
+                "linhas_lidas": lidas,
+                "blocos": no.get("Shared Hit Blocks", 0) + no.get("Shared Read Blocks", 0),
+                "filtro": no.get("Filter"),
+            })
+    return achados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-linhas", type=int, default=1000)
+    parser.add_argument("--estrito", action="store_true")
+    args = parser.parse_args()
+
+    conn = migracoes.conectar()
+    total = 0
+    try:
+        with conn.cursor() as cur:
+            for nome, consulta in consultas.CONSULTAS.items():
+                try:
+                    explicado = explicar(cur, consulta)
+                except psycopg2.Error as exc:
+                    print(f"{nome}: não foi possível explicar ({exc.pgerror or exc})".strip())
+                    continue
+
+                achados = seq_scans(explicado, args.min_linhas)
+                total += len(achados)
+                status = "SEQ SCAN" if achados else "ok"
+                print(f"{nome}: {explicado['Execution Time']:.1f} ms [{status}]")
+                for achado in achados:
+                    print(
+                        f"    Seq Scan em {achado['tabela']}: {achado['linhas_lidas']} linhas, "
+                        f"{achado['blocos']} blocos" + (f", filtro {achado['filtro']}" if achado["filtro"] else "")
+                    )
+    finally:
+        conn.close()
+
+    print(f"\n{total} Seq Scan(s) acima de {args.min_linhas} linhas.")
+    if args.estrito and total:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Prepara os dados dos gráficos antes de irem para o navegador.
+
+O Plotly manda cada ponto (com hover) no JSON da figura; com tabelas grandes
+isso vira megabytes e o navegador trava. Aqui os frames são reduzidos no
+servidor: scatter com LTTB (Largest-Triangle-Three-Buckets), contagens por
+categoria limitadas com um balde "Outros" e histogramas por faixa. As figuras
+montadas ficam em cache pelo conteúdo do frame de origem (ou por uma chave
+dada por quem chama, para frames derivados que nascem de novo a cada rerun).
+"""
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Pontos máximos de um scatter antes do downsampling
+PONTOS_MAX = int(os.environ.get("GRAFICOS_PONTOS_MAX", "2000"))
+# Barras máximas em um gráfico de categorias (a última é "Outros")
+CATEGORIAS_MAX = int(os.environ.get("GRAFICOS_CATEGORIAS_MAX", "20"))
+OUTROS = "Outros"
+
+
+def lttb(x, y, n):
+    """Índices dos n pontos que preservam o formato da série (x crescente).
+
+    O primeiro e o último ponto são mantidos; de cada balde intermediário fica
+    o ponto que forma o maior triângulo com o escolhido no balde anterior e a
+    média do balde seguinte.
+    """
+    total = len(x)
+    if n >= total or n < 3:
+        return np.arange(total)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    escolhidos = np.empty(n, dtype=np.int64)
+    escolhidos[0], escolhidos[-1] = 0, total - 1
+    bordas = np.linspace(1, total - 1, n - 1).astype(np.int64)
+    a = 0
+    for balde in range(n - 2):
+        inicio, fim = bordas[balde], bordas[balde + 1]
+        seguinte = slice(fim, bordas[balde + 2] if balde + 2 < len(bordas) else total)
+        media_x, media_y = x[seguinte].mean(), y[seguinte].mean()
+        areas = np.abs(
+            (x[a] - media_x) * (y[inicio:fim] - y[a])
+            - (x[a] - x[inicio:fim]) * (media_y - y[a])
+        )
+        a = inicio + int(np.argmax(areas))
+        escolhidos[balde + 1] = a
+    return escolhidos
+
+
+def reduzir_pontos(df, y, x=None, max_pontos=PONTOS_MAX):
+    """Frame com no máximo max_pontos linhas para um scatter de y por x.
+
+    x=None usa o índice. As linhas sem y são descartadas (o Plotly não as
+    desenha mesmo). Devolve o próprio df se já for pequeno.
+    """
+    df = df.dropna(subset=[y])
+    if len(df) <= max_pontos:
+        return df
+    eixo_x = df.index.to_numpy() if x is None else df[x].to_numpy()
+    ordem = np.argsort(eixo_x, kind="stable")
+    indices = lttb(eixo_x[ordem], df[y].to_numpy()[ordem], max_pontos)
+    return df.iloc[ordem[indices]]
+
+
+def limitar_categorias(contagens, max_categorias=CATEGORIAS_MAX):
+    """Série de contagens com as maiores categorias e o resto somado em "Outros"."""
+    contagens = contagens.sort_values(ascending=False)
+    if len(contagens) <= max_categorias:
+        return contagens
+    mantidas = contagens.iloc[: max_categorias - 1]
+    outros = pd.Series({OUTROS: contagens.iloc[max_categorias - 1:].sum()})
+    return pd.concat([mantidas, outros]).rename(contagens.name)
+
+
+def histograma(valores, faixas=40):
+    """Contagem por faixa de valores (nulos ignorados), indexada pelo início da faixa."""
+    valores = pd.Series(valores).dropna()
+    if valores.empty:
+        return pd.Series(dtype="int64", name="total")
+    contagens, bordas = np.histogram(valores.to_numpy(dtype=float), bins=faixas)
+    return pd.Series(contagens, index=pd.Index(bordas[:-1], name="faixa"), name="total")
+
+
+# Figuras já montadas, pela combinação (construtor, conteúdo do frame, argumentos)
+FIGURAS_MAX = int(os.environ.get("GRAFICOS_FIGURAS_MAX", "64"))
+_figuras = OrderedDict()
+# Hash já calculado de cada frame vivo. Um frame do cache local de resultados é
+# o mesmo objeto enquanto a entrada vale, então o hash sai uma vez por entrada;
+# frames montados a cada rerun (cópias, recortes) são hasheados de novo toda
+# vez, e para eles figura() aceita uma chave pronta
+_hashes = {}
+_lock = threading.Lock()
+
+
+def assinatura(df):
+    """Hash do conteúdo de df (colunas, tipos e valores), calculado uma vez por objeto."""
+    guardado = _hashes.get(id(df))
+    if guardado is not None and guardado[0]() is df:
+        return guardado[1]
+    valor = (
+        tuple(df.columns),
+        tuple(str(t) for t in df.dtypes),
+        len(df),
+        int(pd.util.hash_pandas_object(df, index=True).sum()),
+    )
+    chave = id(df)
+    _hashes[chave] = (weakref.ref(df, lambda _, chave=chave: _hashes.pop(chave, None)), valor)
+    return valor
+
+
+def _chave_argumento(valor):
+    """Valor de kwargs/traces/layout na chave: repr trunca Series e arrays grandes."""
+    if isinstance(valor, pd.DataFrame):
+        return assinatura(valor)
+    if isinstance(valor, (pd.Series, pd.Index)):
+        return (type(valor).__name__, str(valor.dtype), len(valor),
+                int(pd.util.hash_pandas_object(valor).sum()))
+    if isinstance(valor, np.ndarray):
+        return ("ndarray", str(valor.dtype), valor.shape,
+                int(pd.util.hash_array(valor.ravel()).sum()))
+    if isinstance(valor, dict):
+        return tuple(sorted((k, _chave_argumento(v)) for k, v in valor.items()))
+    if isinstance(valor, (list, tuple)):
+        return (type(valor).__name__,) + tuple(_chave_argumento(v) for v in valor)
+    return repr(valor)
+
+
+def figura(construtor, df, traces=None, layout=None, chave=None, **kwargs):
+    """Figura do plotly.express memoizada pelo conteúdo de df e pelos argumentos.
+
+    traces e layout são aplicados com update_traces/update_layout. chave, se
+    dada, identifica o conteúdo de df no lugar do hash dele: serve para frames
+    derivados que são recriados a cada rerun (quem chama garante que a mesma
+    chave sempre corresponde ao mesmo conteúdo). Cada chamada devolve uma cópia
+    da figura em cache, que pode ser alterada à vontade.
+    """
+    chave = (
+        construtor.__module__,
+        construtor.__qualname__,
+        assinatura(df) if chave is None else ("chave", _chave_argumento(chave)),
+        _chave_argumento(kwargs),
+        _chave_argumento(traces),
+        _chave_argumento(layout),
+    )
+    with _lock:
+        fig = _figuras.get(chave)
+        if fig is not None:
+            _figuras.move_to_end(chave)
+    if fig is None:
+        fig = construtor(df, **kwargs)
+        if traces:
+            fig.update_traces(**traces)
+        if layout:
+            fig.update_layout(**layout)
+
+        with _lock:
+            _figuras[chave] = fig
+            while len(_figuras) > FIGURAS_MAX:
+                _figuras.popitem(last=False)
+    # A que fica em cache é compartilhada entre reruns e sessões
+    return go.Figure(fig)
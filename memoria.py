@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+import cache_resultados
+
+# Modo em memória da aba "Consultas": a junção Pirata ⋈ Personagem ⋈ Bando é
+# carregada uma vez e os filtros dos sliders viram operações vetorizadas.
+
+COLUNAS_PIRATAS = [
+    "nomepersonagem", "alcunha", "recompensa",
+    "nomebando", "recompensatotalbando", "nomealianca",
+]
+
+
+class BaseMemoria:
+    """Frame base já ordenado, com as somas acumuladas por bando pré-calculadas."""
+
+    def __init__(self, df):
+        df = df[COLUNAS_PIRATAS].copy()
+        # numeric do Postgres chega como Decimal; converte para operar com NumPy
+        df["recompensa"] = pd.to_numeric(df["recompensa"])
+        df["recompensatotalbando"] = pd.to_numeric(df["recompensatotalbando"])
+
+        # Consulta 1: mesma ordem do SQL (bando DESC, pirata DESC com NULL primeiro).
+        # Bandos sem total nunca passam no filtro ">=", então ficam de fora.
+        ordenado = df[df["recompensatotalbando"].notna()].sort_values(
+            ["recompensatotalbando", "recompensa"],
+            ascending=[False, False],
+            na_position="first",
+            kind="mergesort",
+        )
+        self.piratas = ordenado.reset_index(drop=True)
+        # Totais negados ficam em ordem crescente, prontos para busca binária
+        self._totais_neg = -self.piratas["recompensatotalbando"].to_numpy()
+
+        # Periculosidade: piratas de cada bando em ordem decrescente (NULL primeiro,
+        # como o ROW_NUMBER() do SQL), com soma e contagem de não nulos acumuladas
+        por_bando = df[df["nomebando"].notna()].sort_values(
+            ["nomebando", "recompensa"],
+            ascending=[True, False],
+            na_position="first",
+            kind="mergesort",
+        )
+        valores = por_bando["recompensa"].to_numpy(dtype="float64")
+        self._soma_acum = np.concatenate(([0.0], np.cumsum(np.nan_to_num(valores))))
+        self._nao_nulos_acum = np.concatenate(([0], np.cumsum(~np.isnan(valores))))
+
+        # Início e tamanho do bloco de cada bando no array ordenado
+        nomes = por_bando["nomebando"].to_numpy()
+        novo_bando = np.ones(len(nomes), dtype=bool)
+        novo_bando[1:] = nomes[1:] != nomes[:-1]
+        self._inicio = np.flatnonzero(novo_bando)
+        self._tamanho = np.diff(np.append(self._inicio, len(nomes)))
+        self._bandos = por_bando.iloc[self._inicio][["nomebando", "nomealianca"]].reset_index(drop=True)
+
+    @property
+    def nbytes(self):
+        """Bytes aproximados dos frames e arrays (usado no limite do cache de resultados)."""
+        return sum(cache_resultados.tamanho(v) for v in vars(self).values())
+
+    def piratas_por_bando(self, min_recompensa):
+        """Piratas de bandos com RecompensaTotalBando >= min_recompensa."""
+        fim = np.searchsorted(self._totais_neg, -min_recompensa, side="right")
+        return self.piratas.iloc[:fim]
+
+    def periculosidade(self, num_membros, min_perigo, alianca=None):
+        """Soma das num_membros maiores recompensas de cada bando."""
+        fim = self._inicio + np.minimum(num_membros, self._tamanho)
+        soma = self._soma_acum[fim] - self._soma_acum[self._inicio]
+        # SUM() só de NULLs é NULL no SQL e não passa no HAVING
+        tem_valor = (self._nao_nulos_acum[fim] - self._nao_nulos_acum[self._inicio]) > 0
+
+        mascara = tem_valor & (soma >= min_perigo)
+        if alianca is not None:
+            mascara &= (self._bandos["nomealianca"] == alianca).to_numpy()
+
+        resultado = self._bandos[mascara].assign(recompensacombinada=soma[mascara])
+        return resultado.sort_values("recompensacombinada", ascending=False, kind="mergesort").reset_index(drop=True)
@@ -0,0 +1,180 @@
+"""Métricas de execução das consultas (tempo, linhas, bytes, acertos de cache).
+
+Os dados ficam na memória do processo; o painel "Performance" do app lê daqui e
+exporta em JSON ou no formato texto do Prometheus.
+"""
+import json
+import threading
+from collections import deque
+
+# Limites (em segundos) dos buckets do histograma de latência
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Quantas execuções recentes guardar por consulta para calcular p50/p95
+AMOSTRAS = 1000
+
+_lock = threading.Lock()
+_metricas = {}
+
+
+def _nova():
+    return {
+        "chamadas": 0,
+        "falhas_cache": 0,
+        "execucoes": 0,
+        "erros": 0,
+        "canceladas": 0,
+        "resultados_antigos": 0,
+        "compartilhadas": 0,
+        "revalidacoes": 0,
+        "segundos": 0.0,
+        "linhas": 0,
+        "bytes": 0,
+        "buckets": [0] * len(BUCKETS),
+        "amostras": deque(maxlen=AMOSTRAS),
+    }
+
+
+def _get(nome):
+    if nome not in _metricas:
+        _metricas[nome] = _nova()
+    return _metricas[nome]
+
+
+def registrar_chamada(nome):
+    """Pedido de resultado (vindo do cache ou não)."""
+    with _lock:
+        _get(nome)["chamadas"] += 1
+
+
+def registrar_falha_cache(nome):
+    """O resultado não estava no cache e a consulta precisou ser executada."""
+    with _lock:
+        _get(nome)["falhas_cache"] += 1
+
+
+def registrar_compartilhada(nome):
+    """O resultado não estava no cache, mas outra sessão já estava executando a mesma consulta."""
+    with _lock:
+        _get(nome)["compartilhadas"] += 1
+
+
+def registrar_revalidacao(nome):
+    """Entrada vencida servida enquanto uma atualização roda em segundo plano."""
+    with _lock:
+        _get(nome)["revalidacoes"] += 1
+
+
+def registrar_resultado_antigo(nome):
+    """A consulta foi interrompida e o último resultado guardado (vencido) foi usado."""
+    with _lock:
+        _get(nome)["resultados_antigos"] += 1
+
+
+def registrar_execucao(nome, segundos, linhas=0, bytes_lidos=0, erro=False, cancelada=False):
+    with _lock:
+        m = _get(nome)
+        m["execucoes"] += 1
+        m["erros"] += int(erro)
+        m["canceladas"] += int(cancelada)
+        m["segundos"] += segundos
+        m["linhas"] += linhas
+        m["bytes"] += bytes_lidos
+        m["amostras"].append(segundos)
+        for i, limite in enumerate(BUCKETS):
+            if segundos <= limite:
+                m["buckets"][i] += 1
+                break
+
+
+def limpar():
+    with _lock:
+        _metricas.clear()
+
+
+def _percentil(ordenadas, p):
+    if not ordenadas:
+        return None
+    # Nearest-rank: suficiente para um painel de acompanhamento
+    indice = max(0, min(len(ordenadas) - 1, round(p * len(ordenadas)) - 1))
+    return ordenadas[indice]
+
+
+def resumo():
+    """Uma linha por consulta, com p50/p95 em milissegundos."""
+    with _lock:
+        copia = {nome: dict(m, amostras=sorted(m["amostras"])) for nome, m in _metricas.items()}
+
+    linhas = []
+    for nome, m in sorted(copia.items()):
+        acertos = m["chamadas"] - m["falhas_cache"] if m["chamadas"] else None
+        p50 = _percentil(m["amostras"], 0.50)
+        p95 = _percentil(m["amostras"], 0.95)
+        linhas.append({
+            "consulta": nome,
+            "chamadas": m["chamadas"],
+            "acertos_cache": acertos,
+            "falhas_cache": m["falhas_cache"],
+            "execucoes": m["execucoes"],
+            "erros": m["erros"],
+            "canceladas": m["canceladas"],
+            "resultados_antigos": m["resultados_antigos"],
+            "compartilhadas": m["compartilhadas"],
+            "revalidacoes": m["revalidacoes"],
+            "p50_ms": None if p50 is None else p50 * 1000,
+            "p95_ms": None if p95 is None else p95 * 1000,
+            "max_ms": m["amostras"][-1] * 1000 if m["amostras"] else None,
+            "linhas": m["linhas"],
+            "bytes": m["bytes"],
+        })
+    return linhas
+
+
+def exportar_json():
+    return json.dumps(resumo(), indent=2, ensure_ascii=False)
+
+
+def _rotulo(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def exportar_prometheus():
+    with _lock:
+        copia = {nome: dict(m, buckets=list(m["buckets"])) for nome, m in _metricas.items()}
+
+    saida = [
+        "# HELP dashboard_consulta_duracao_segundos Tempo de execução das consultas no banco.",
+        "# TYPE dashboard_consulta_duracao_segundos histogram",
+    ]
+    for nome, m in sorted(copia.items()):
+        acumulado = 0
+        for limite, qtd in zip(BUCKETS, m["buckets"]):
+            acumulado += qtd
+            saida.append(f'dashboard_consulta_duracao_segundos_bucket{{consulta="{_rotulo(nome)}",le="{limite}"}} {acumulado}')
+        saida.append(f'dashboard_consulta_duracao_segundos_bucket{{consulta="{_rotulo(nome)}",le="+Inf"}} {m["execucoes"]}')
+        saida.append(f'dashboard_consulta_duracao_segundos_sum{{consulta="{_rotulo(nome)}"}} {m["segundos"]}')
+        saida.append(f'dashboard_consulta_duracao_segundos_count{{consulta="{_rotulo(nome)}"}} {m["execucoes"]}')
+
+    contadores = [
+        ("dashboard_consulta_linhas_total", "Linhas devolvidas pelas consultas.", "linhas"),
+        ("dashboard_consulta_bytes_total", "Bytes lidos do banco pelas consultas.", "bytes"),
+        ("dashboard_consulta_erros_total", "Execuções que terminaram em erro.", "erros"),
+        ("dashboard_consulta_canceladas_total", "Execuções canceladas porque o resultado deixou de interessar.", "canceladas"),
+        ("dashboard_consulta_resultados_antigos_total", "Interrupções respondidas com o último resultado guardado.", "resultados_antigos"),
+        ("dashboard_consulta_compartilhadas_total", "Pedidos que esperaram uma execução já em andamento.", "compartilhadas"),
+        ("dashboard_consulta_revalidacoes_total", "Atualizações em segundo plano de entradas vencidas.", "revalidacoes"),
+    ]
+    for metrica, ajuda, campo in contadores:
+        saida.append(f"# HELP {metrica} {ajuda}")
+        saida.append(f"# TYPE {metrica} counter")
+        for nome, m in sorted(copia.items()):
+            saida.append(f'{metrica}{{consulta="{_rotulo(nome)}"}} {m[campo]}')
+
+    saida.append("# HELP dashboard_cache_acessos_total Pedidos de resultado, por acerto ou falha do cache.")
+    saida.append("# TYPE dashboard_cache_acessos_total counter")
+    for nome, m in sorted(copia.items()):
+        if not m["chamadas"]:
+            continue
+        saida.append(f'dashboard_cache_acessos_total{{consulta="{_rotulo(nome)}",resultado="hit"}} {m["chamadas"] - m["falhas_cache"]}')
+        saida.append(f'dashboard_cache_acessos_total{{consulta="{_rotulo(nome)}",resultado="miss"}} {m["falhas_cache"]}')
+    return "\n".join(saida) + "\n"
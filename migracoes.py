@@ -0,0 +1,373 @@
+"""Objetos de banco usados pelo dashboard (views, índices, triggers).
+
+Uso: python migracoes.py
+
+Cada migração roda uma única vez; as já aplicadas ficam registradas na tabela
+dashboard_migracoes.
+"""
+import re
+
+import psycopg2
+
+import consultas
+import db
+
+MIGRACOES = []
+
+
+def migracao(nome, *comandos):
+    # Cada comando vai em uma chamada separada: CREATE INDEX CONCURRENTLY não pode
+    # rodar junto com outros comandos na mesma string
+    MIGRACOES.append((nome, comandos))
+
+
+# Snapshot do mundo para a sidebar: todos os recordes e contagens em uma linha.
+# A definição é a mesma consulta registrada como "snapshot_mundo_direto".
+migracao(
+    "001_mv_estatisticas_mundo",
+    f"""
+    CREATE MATERIALIZED VIEW IF NOT EXISTS mv_estatisticas_mundo AS
+    {consultas.get("snapshot_mundo_direto").sql_preparado()};
+    """,
+    # REFRESH ... CONCURRENTLY exige um índice único
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS mv_estatisticas_mundo_id
+        ON mv_estatisticas_mundo (id);
+    """,
+)
+
+
+# Índices para os filtros e ordenações das consultas do registro.
+# CONCURRENTLY para não travar escrita nas tabelas durante a criação.
+migracao(
+    "002_indices_dashboard",
+    # Consulta 1, recordes e top 10 de bandos
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bando_recompensa_total ON Bando (RecompensaTotalBando DESC);",
+    # Junção Pirata -> Bando e top N por bando (ROW_NUMBER ... PARTITION BY NomeBando ORDER BY Recompensa DESC)
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pirata_bando_recompensa ON Pirata (NomeBando, Recompensa DESC);",
+    # Maior recompensa individual, top 10 e quartis
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pirata_recompensa ON Pirata (Recompensa DESC);",
+    # Consulta 3 (capitães) e multiplicador capitão x bando
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bando_capitao ON Bando (PirataCapitao);",
+    # Filtro por aliança e bandos por aliança
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bando_alianca ON Bando (NomeAlianca);",
+    # Consulta 2 (espécie e tipo de fruta)
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_filiacao_especie_especie ON Filiacao_Especie (NomeEspecie);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_posse_fruta_fruta ON Posse_Fruta (NomeFruta);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_akumanomi_tipo ON AkumaNoMi (TipoFruta);",
+    # Contagens com ILIKE '%Zoan%' etc.: btree não ajuda com curinga no início, trigrama sim
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_akumanomi_tipo_trgm ON AkumaNoMi USING gin (TipoFruta gin_trgm_ops);",
+    # Consulta 4 (poneglyphs por tipo e região)
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_poneglyph_tipo ON Poneglyph (Tipo);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_poneglyph_ilha ON Poneglyph (NomeIlha);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ilha_area ON Ilha (NomeArea);",
+    # Contagens com filtro booleano (Shichibukai, navios navegando)
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pirata_shichibukai ON Pirata (NomePersonagem) WHERE Shichibukai = TRUE;",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_navio_navegando ON Navio (NomeNavio) WHERE Navegando = TRUE;",
+)
+
+
+# Avisos de alteração para o cache de resultados (cache_resultados.py): a cada
+# comando que altera uma tabela lida pelo dashboard, um NOTIFY com o nome dela.
+TABELAS_NOTIFICADAS = (
+    "Personagem", "Pirata", "Marinheiro", "Bando", "Alianca", "AkumaNoMi",
+    "Posse_Fruta", "Especie", "Filiacao_Especie", "Navio", "Ilha", "Area",
+    "Poneglyph", "Localizacao_Capitulo", "Aparicao_em_capitulo",
+    "Habilidade", "Lista_Habilidade",
+)
+
+migracao(
+    "003_notificar_alteracoes",
+    """
+    CREATE OR REPLACE FUNCTION dashboard_notificar_alteracao() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('dashboard_invalidacao', lower(TG_TABLE_NAME));
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    *[
+        f"""
+        DROP TRIGGER IF EXISTS dashboard_notificar ON {tabela};
+        CREATE TRIGGER dashboard_notificar
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {tabela}
+            FOR EACH STATEMENT EXECUTE FUNCTION dashboard_notificar_alteracao();
+        """
+        for tabela in TABELAS_NOTIFICADAS
+    ],
+)
+
+
+# Totais de recompensa mantidos por trigger (ver agregados.py para a verificação):
+#   Bando.RecompensaTotalBando     = soma de Pirata.Recompensa dos piratas do bando
+#   Alianca.RecompensaTotalAlianca = soma de Bando.RecompensaTotalBando dos bandos da aliança
+# Cada alteração aplica só a diferença (O(1)); a alteração no bando dispara a da aliança.
+
+# Totais por bando recalculados do zero a partir dos piratas
+BANDOS_RECALCULADOS = """
+    SELECT b.NomeBando, b.NomeAlianca, COALESCE(SUM(p.Recompensa), 0) AS calculado
+    FROM Bando b
+    LEFT JOIN Pirata p ON p.NomeBando = b.NomeBando
+    GROUP BY b.NomeBando, b.NomeAlianca
+"""
+
+# Trava de escrita em Pirata e Bando para o recálculo: com ela, nenhum delta de
+# trigger é confirmado no meio e depois sobrescrito por uma soma mais antiga.
+# Tem de vir na mesma transação, antes de RECALCULAR_TOTAIS
+TRAVAR_TOTAIS = "LOCK TABLE Pirata, Bando IN SHARE ROW EXCLUSIVE MODE;"
+
+# Regrava os totais recalculados. Com os triggers já criados, a correção dos
+# bandos dispara a das alianças; o segundo UPDATE acerta alianças que estavam
+# erradas por conta própria (e faz o trabalho todo quando ainda não há trigger)
+RECALCULAR_TOTAIS = f"""
+    UPDATE Bando b
+    SET RecompensaTotalBando = r.calculado
+    FROM ({BANDOS_RECALCULADOS}) r
+    WHERE r.NomeBando = b.NomeBando
+      AND b.RecompensaTotalBando IS DISTINCT FROM r.calculado;
+
+    UPDATE Alianca a
+    SET RecompensaTotalAlianca = t.calculado
+    FROM (
+        SELECT a2.NomeAlianca, COALESCE(SUM(b.RecompensaTotalBando), 0) AS calculado
+        FROM Alianca a2
+        LEFT JOIN Bando b ON b.NomeAlianca = a2.NomeAlianca
+        GROUP BY a2.NomeAlianca
+    ) t
+    WHERE t.NomeAlianca = a.NomeAlianca
+      AND a.RecompensaTotalAlianca IS DISTINCT FROM t.calculado;
+"""
+
+migracao(
+    "004_agregados_recompensa",
+    """
+    CREATE OR REPLACE FUNCTION dashboard_pirata_total_bando() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            IF OLD.NomeBando IS NOT NULL AND OLD.Recompensa IS NOT NULL THEN
+                UPDATE Bando
+                SET RecompensaTotalBando = COALESCE(RecompensaTotalBando, 0) - OLD.Recompensa
+                WHERE NomeBando = OLD.NomeBando;
+            END IF;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            IF NEW.NomeBando IS NOT NULL AND NEW.Recompensa IS NOT NULL THEN
+                UPDATE Bando
+                SET RecompensaTotalBando = COALESCE(RecompensaTotalBando, 0) + NEW.Recompensa
+                WHERE NomeBando = NEW.NomeBando;
+            END IF;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION dashboard_bando_total_alianca() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            IF OLD.NomeAlianca IS NOT NULL AND OLD.RecompensaTotalBando IS NOT NULL THEN
+                UPDATE Alianca
+                SET RecompensaTotalAlianca = COALESCE(RecompensaTotalAlianca, 0) - OLD.RecompensaTotalBando
+                WHERE NomeAlianca = OLD.NomeAlianca;
+            END IF;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            IF NEW.NomeAlianca IS NOT NULL AND NEW.RecompensaTotalBando IS NOT NULL THEN
+                UPDATE Alianca
+                SET RecompensaTotalAlianca = COALESCE(RecompensaTotalAlianca, 0) + NEW.RecompensaTotalBando
+                WHERE NomeAlianca = NEW.NomeAlianca;
+            END IF;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    # Os triggers só aplicam diferenças: os totais gravados precisam estar certos
+    # antes. Tudo em um comando (uma transação), com as tabelas travadas para
+    # escrita, para nenhuma alteração cair entre o recálculo e os triggers.
+    f"""
+    {TRAVAR_TOTAIS}
+    {RECALCULAR_TOTAIS}
+    DROP TRIGGER IF EXISTS dashboard_total_bando ON Pirata;
+    CREATE TRIGGER dashboard_total_bando
+        AFTER INSERT OR DELETE OR UPDATE OF Recompensa, NomeBando ON Pirata
+        FOR EACH ROW EXECUTE FUNCTION dashboard_pirata_total_bando();
+
+    DROP TRIGGER IF EXISTS dashboard_total_alianca ON Bando;
+    CREATE TRIGGER dashboard_total_alianca
+        AFTER INSERT OR DELETE OR UPDATE OF RecompensaTotalBando, NomeAlianca ON Bando
+        FOR EACH ROW EXECUTE FUNCTION dashboard_bando_total_alianca();
+    """,
+)
+
+
+# Periculosidade: soma das n maiores recompensas de cada bando, para n = 1..20
+# (o máximo do slider), mantida por trigger. Só o bando afetado é recalculado, e
+# a consulta vira uma busca pelo índice (n, soma). Bandos com menos de n piratas
+# somam todos, como no ROW_NUMBER() ... rn <= n da versão original.
+migracao(
+    "005_bando_top_n",
+    """
+    CREATE TABLE IF NOT EXISTS bando_top_n (
+        NomeBando VARCHAR NOT NULL REFERENCES Bando (NomeBando) ON DELETE CASCADE ON UPDATE CASCADE,
+        n SMALLINT NOT NULL,
+        soma NUMERIC,
+        PRIMARY KEY (NomeBando, n)
+    );
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_bando_top_n_n_soma ON bando_top_n (n, soma DESC);",
+    """
+    CREATE OR REPLACE FUNCTION dashboard_recalcular_top_n(p_bando VARCHAR) RETURNS void AS $$
+    BEGIN
+        -- Uma transação por bando de cada vez: sem a trava, duas alterações no
+        -- mesmo bando apagam e inserem juntas e a segunda viola a chave primária
+        PERFORM 1 FROM Bando WHERE NomeBando = p_bando FOR NO KEY UPDATE;
+        DELETE FROM bando_top_n WHERE NomeBando = p_bando;
+        INSERT INTO bando_top_n (NomeBando, n, soma)
+        SELECT p_bando, g.n, SUM(r.Recompensa) FILTER (WHERE r.rn <= g.n)
+        FROM generate_series(1, 20) AS g(n)
+        CROSS JOIN (
+            SELECT Recompensa, ROW_NUMBER() OVER (ORDER BY Recompensa DESC) AS rn
+            FROM (
+                SELECT Recompensa FROM Pirata
+                WHERE NomeBando = p_bando
+                ORDER BY Recompensa DESC
+                LIMIT 20
+            ) top
+        ) r
+        GROUP BY g.n
+        ON CONFLICT (NomeBando, n) DO UPDATE SET soma = EXCLUDED.soma;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION dashboard_pirata_top_n() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.NomeBando IS NOT NULL THEN
+            PERFORM dashboard_recalcular_top_n(OLD.NomeBando);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.NomeBando IS NOT NULL THEN
+            IF TG_OP = 'INSERT' OR NEW.NomeBando IS DISTINCT FROM OLD.NomeBando THEN
+                PERFORM dashboard_recalcular_top_n(NEW.NomeBando);
+            END IF;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    DROP TRIGGER IF EXISTS dashboard_top_n ON Pirata;
+    CREATE TRIGGER dashboard_top_n
+        AFTER INSERT OR DELETE OR UPDATE OF Recompensa, NomeBando ON Pirata
+        FOR EACH ROW EXECUTE FUNCTION dashboard_pirata_top_n();
+    """,
+    # Carga inicial de todos os bandos
+    """
+    INSERT INTO bando_top_n (NomeBando, n, soma)
+    SELECT r.NomeBando, g.n, SUM(r.Recompensa) FILTER (WHERE r.rn <= g.n)
+    FROM generate_series(1, 20) AS g(n)
+    CROSS JOIN (
+        SELECT pi.NomeBando, pi.Recompensa,
+               ROW_NUMBER() OVER (PARTITION BY pi.NomeBando ORDER BY pi.Recompensa DESC) AS rn
+        FROM Pirata pi
+        JOIN Bando b ON b.NomeBando = pi.NomeBando
+    ) r
+    WHERE r.rn <= 20
+    GROUP BY r.NomeBando, g.n
+    ON CONFLICT (NomeBando, n) DO UPDATE SET soma = EXCLUDED.soma;
+    """,
+    "ANALYZE bando_top_n;",
+)
+
+
+# Busca textual (consulta "busca_global"): índices GIN sobre a expressão
+# to_tsvector de cada tabela, criados sem bloquear escritas (uma coluna gerada
+# STORED reescreveria a tabela inteira sob ACCESS EXCLUSIVE); e índices de
+# trigramas nos nomes para a busca aproximada (erros de digitação, pedaços do
+# nome). A consulta repete as expressões exatamente como aqui. Configuração
+# 'simple': nomes próprios não passam por stemming.
+migracao(
+    "006_busca_textual",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_personagem_busca ON Personagem
+        USING gin (to_tsvector('simple', coalesce(NomePersonagem, '') || ' ' || coalesce(Alcunha, '')));
+    """,
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_poneglyph_busca ON Poneglyph
+        USING gin (to_tsvector('simple', coalesce(Conteudo, '')));
+    """,
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_akumanomi_busca ON AkumaNoMi
+        USING gin (to_tsvector('simple', coalesce(NomeFruta, '')));
+    """,
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_personagem_nome_trgm ON Personagem USING gin (NomePersonagem gin_trgm_ops);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_personagem_alcunha_trgm ON Personagem USING gin (Alcunha gin_trgm_ops);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_akumanomi_nome_trgm ON AkumaNoMi USING gin (NomeFruta gin_trgm_ops);",
+    "ANALYZE Personagem, Poneglyph, AkumaNoMi;",
+)
+
+
+def conectar():
+    """Conexão dedicada (fora do pool) em autocommit, para DDL e jobs."""
+    conn = psycopg2.connect(db.DATABASE_URL)
+    conn.autocommit = True
+    return conn
+
+
+# Nome do índice em "CREATE [UNIQUE] INDEX CONCURRENTLY IF NOT EXISTS nome"
+_INDICE_CONCORRENTE = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE
+)
+
+
+def _indice_invalido(cur, nome):
+    cur.execute("""
+        SELECT NOT i.indisvalid
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s AND pg_table_is_visible(c.oid);
+    """, (nome.lower(),))
+    linha = cur.fetchone()
+    return linha is not None and linha[0]
+
+
+def _executar_comando(cur, sql, saida):
+    # Um CREATE INDEX CONCURRENTLY que falha deixa o índice criado, mas INVALID; o
+    # IF NOT EXISTS da próxima tentativa pularia esse índice sem que ele sirva
+    indice = _INDICE_CONCORRENTE.search(sql)
+    if indice and _indice_invalido(cur, indice[1]):
+        saida(f"  Recriando o índice inválido {indice[1]}...")
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {indice[1]};")
+    cur.execute(sql)
+    if indice and _indice_invalido(cur, indice[1]):
+        raise psycopg2.ProgrammingError(f"o índice {indice[1]} ficou inválido")
+
+
+def aplicar(conn, saida=print):
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS dashboard_migracoes (
+                nome TEXT PRIMARY KEY,
+                aplicada_em TIMESTAMPTZ NOT NULL DEFAULT now()
+            );
+        """)
+        cur.execute("SELECT nome FROM dashboard_migracoes;")
+        aplicadas = {linha[0] for linha in cur.fetchall()}
+
+        for nome, comandos in MIGRACOES:
+            if nome in aplicadas:
+                continue
+            saida(f"Aplicando {nome}...")
+            for sql in comandos:
+                _executar_comando(cur, sql, saida)
+            cur.execute("INSERT INTO dashboard_migracoes (nome) VALUES (%s);", (nome,))
+
+
+if __name__ == "__main__":
+    conn = conectar()
+    try:
+        aplicar(conn)
+    finally:
+        conn.close()
@@ -0,0 +1 @@
+"""Páginas do dashboard, uma por aba ou seção; app.py só monta a estrutura."""
@@ -0,0 +1,300 @@
+"""Aba "Consultas": uma seção (fragmento) por consulta filtrável."""
+import os
+
+import streamlit as st
+
+import graficos
+from paginas.comum import (
+    base_memoria,
+    col_names,
+    estado_paginacao,
+    navegacao_paginas,
+    opcional,
+    run_consulta,
+    run_pagina,
+    run_varias,
+    seletor_tamanho_pagina,
+)
+
+
+# Resultados da busca global (por origem e no total)
+BUSCA_LIMITE = 50
+
+
+# Cada consulta é um fragmento: mexer em um filtro reexecuta só aquela seção,
+# sem refazer as outras consultas, a sidebar e as estatísticas
+@st.fragment
+def consulta_piratas_por_bando(modo_memoria):
+    #Consulta1 - Filtro de piratas por recompensa do banco
+    st.markdown("##  Piratas filtrados pela Recompensa Total do Bando")
+
+    min_recompensa_bando = st.slider(
+        "Recompensa total mínima do bando (em berries):",
+        min_value=0,
+        max_value=8000000000,
+        value=0,
+        step=50000000
+    )
+
+    tamanho = seletor_tamanho_pagina("pag_piratas_bando")
+    estado = estado_paginacao("pag_piratas_bando", (modo_memoria, min_recompensa_bando, tamanho))
+    inicio = estado["pilha"][-1]
+
+    if modo_memoria:
+        #Em memória a página é só uma fatia do frame já filtrado
+        filtrado = base_memoria().piratas_por_bando(min_recompensa_bando)
+        inicio = inicio or 0
+        piratas_bando_df = filtrado.iloc[inicio:inicio + tamanho]
+        proxima = inicio + tamanho if inicio + tamanho < len(filtrado) else None
+    else:
+        piratas_bando_df, proxima = run_pagina(
+            "piratas_por_bando_pagina", inicio, tamanho, min_recompensa=min_recompensa_bando
+        )
+
+    if not piratas_bando_df.empty:
+        #renomeação
+        st.dataframe(piratas_bando_df.rename(columns=col_names))
+    else:
+        st.info("Nenhum pirata encontrado com essa recompensa total de bando mínima.")
+    #Numa página vazia (ex.: os dados mudaram) o "Anterior" ainda precisa aparecer
+    if not piratas_bando_df.empty or len(estado["pilha"]) > 1:
+        navegacao_paginas("pag_piratas_bando", estado, proxima)
+
+    st.markdown("---")
+
+
+@st.fragment
+def consulta_personagens_fruta():
+    #Consulta2 - Filtro de personagens com Akuma no Mi por espécie e tipo de fruta
+    st.markdown("## Personagens com Akuma no Mi – Espécie e Tipo de Fruta")
+
+    #Carregar espécies disponíveis
+    especies_df = run_consulta("especies")
+    frutas_df = run_consulta("tipos_fruta")
+
+    especies = ["Todas"] + especies_df["nomeespecie"].dropna().tolist()
+    tipos_fruta = ["Todos"] + frutas_df["tipofruta"].dropna().tolist()
+
+    col1, col2 = st.columns(2)
+    with col1:
+        filtro_especie = st.selectbox("Filtrar por espécie:", especies)
+    with col2:
+        filtro_fruta = st.selectbox("Filtrar por tipo de fruta:", tipos_fruta)
+
+    tamanho = seletor_tamanho_pagina("pag_personagens_fruta")
+    estado = estado_paginacao("pag_personagens_fruta", (filtro_especie, filtro_fruta, tamanho))
+
+    personagens_fruta_df, proxima = run_pagina(
+        "personagens_fruta_pagina",
+        estado["pilha"][-1],
+        tamanho,
+        especie=opcional(filtro_especie, "Todas"),
+        tipo_fruta=opcional(filtro_fruta, "Todos"),
+    )
+
+
+    if not personagens_fruta_df.empty:
+        #renomeação
+        st.dataframe(personagens_fruta_df.rename(columns=col_names))
+    else:
+        st.info("Nenhum personagem encontrado com os filtros aplicados.")
+    #Numa página vazia (ex.: os dados mudaram) o "Anterior" ainda precisa aparecer
+    if not personagens_fruta_df.empty or len(estado["pilha"]) > 1:
+        navegacao_paginas("pag_personagens_fruta", estado, proxima)
+
+    st.markdown("---")
+
+
+@st.fragment
+def consulta_capitaes():
+    #Consulta 3 — Filtro de capitães de Bando por ranking por recompensa total cpm filtro de aliança
+    st.markdown("## Capitães de Bando – Ranking por Recompensa Total do Bando")
+
+    # Carregar alianças
+    aliancas_df = run_consulta("aliancas")
+    aliancas = ["Todas"] + aliancas_df["nomealianca"].dropna().tolist()
+
+    # Filtro por aliança
+    filtro_alianca = st.selectbox("Filtrar por aliança:", aliancas)
+
+    capitaes_df = run_consulta("capitaes", alianca=opcional(filtro_alianca, "Todas"))
+
+
+    if not capitaes_df.empty:
+        # Aplica a renomeação
+        st.dataframe(capitaes_df.rename(columns=col_names))
+    else:
+        st.info("Nenhum capitão encontrado com esse filtro.")
+
+    st.markdown("---")
+
+
+@st.fragment
+def consulta_periculosidade(modo_memoria):
+    st.markdown("## Periculosidade do Bando – Soma das Maiores Recompensas")
+
+    aliancas_df = run_consulta("aliancas")
+    aliancas = ["Todas"] + aliancas_df["nomealianca"].dropna().tolist()
+
+    #Novo slider para definir o 'N' (quantos membros somar)
+    num_membros = st.slider(
+        "Considerar os N membros com maiores recompensas:",
+        min_value=1,
+        max_value=20,
+        value=3, # Valor padrão (Top 3)
+        step=1
+    )
+
+    min_perigo = st.slider(
+        f"Recompensa Combinada Mínima (Soma do TOP {num_membros}):",
+        min_value=0,
+        max_value=10000000000,
+        value=0,
+        step=50000000
+    )
+
+    filtro_alianca2 = st.selectbox("Filtrar por aliança (Periculosidade):", aliancas)
+
+    if modo_memoria:
+        perigo_df = base_memoria().periculosidade(
+            num_membros, min_perigo, alianca=opcional(filtro_alianca2, "Todas")
+        )
+    else:
+        perigo_df = run_consulta(
+            "periculosidade",
+            num_membros=num_membros,
+            alianca=opcional(filtro_alianca2, "Todas"),
+            min_perigo=min_perigo,
+        )
+
+    if not perigo_df.empty:
+        # Renomeia as colunas antes de exibir
+        perigo_display = perigo_df.rename(columns=col_names)
+        
+        st.dataframe(
+            perigo_display,
+            column_config={
+                # Nota: Aqui usamos o NOVO nome da coluna após o rename
+                "Recompensa Combinada": st.column_config.NumberColumn(
+                    f"Soma (Top {num_membros})",
+                    format="$%d" # Formata como moeda
+                )
+            }
+        )
+    else:
+        st.info("Nenhum bando encontrado com esse critério.")
+
+    st.markdown("---")
+
+
+@st.fragment
+def consulta_poneglyphs():
+    # Consulta 4 — Rastreamento de Poneglyphs e Contexto Histórico
+
+    st.markdown("## 🗺️ Rastreamento de Poneglyphs e História Antiga")
+
+    st.markdown("""
+    Esta seção cruza a localização dos **Poneglyphs** com as **Ilhas**, a **Afiliação Política** do território 
+    e a **Região** onde se encontram.
+    """)
+
+    # Filtros para Poneglyphs
+    tipos_poneglyph_df = run_consulta("tipos_poneglyph")
+    areas_df = run_consulta("areas")
+
+    tipos_poneglyph = ["Todos"] + tipos_poneglyph_df["tipo"].tolist()
+    areas = ["Todas"] + areas_df["nomearea"].tolist()
+
+    col_p1, col_p2 = st.columns(2)
+
+    with col_p1:
+        filtro_tipo_pone = st.selectbox("Tipo de Poneglyph:", tipos_poneglyph)
+
+    with col_p2:
+        filtro_area = st.selectbox("Região (Área do Mar):", areas)
+
+    poneglyphs_df = run_consulta(
+        "poneglyphs",
+        tipo=opcional(filtro_tipo_pone, "Todos"),
+        area=opcional(filtro_area, "Todas"),
+    )
+
+    # Dicionário simplificado para renomear colunas
+    col_names_pone = {
+        'tipo': 'Tipo de Poneglyph',
+        'conteudo': 'Conteúdo/Detalhe',
+        'nomeilha': 'Localização (Ilha)',
+        'filiacaopolitica': 'Controle da Ilha',
+        'nomearea': 'Mar/Região'
+    }
+
+    if not poneglyphs_df.empty:
+        # Exibe a tabela renomeada
+        st.dataframe(poneglyphs_df.rename(columns=col_names_pone))
+        
+        # Visualização gráfica da distribuição por região
+        st.markdown("### Distribuição de Poneglyphs por Região")
+        distribuicao = graficos.limitar_categorias(poneglyphs_df['nomearea'].value_counts())
+        st.bar_chart(distribuicao)
+    else:
+        st.info("Nenhum Poneglyph encontrado com os filtros selecionados.")
+
+    st.markdown("---")
+
+
+@st.fragment
+def busca_global():
+    # Busca por nome/alcunha, fruta ou texto de poneglyph, feita no banco pelos
+    # índices de busca textual: só os resultados mais relevantes são trazidos
+    st.markdown("## 🔎 Busca")
+
+    termo = st.text_input(
+        "Buscar personagem, Akuma no Mi ou poneglyph:",
+        placeholder="ex.: Luffy, Gomu Gomu, Rio Poneglyph",
+    ).strip()
+
+    if len(termo) < 2:
+        st.caption("Digite ao menos 2 caracteres.")
+    else:
+        resultados_df = run_consulta("busca_global", termo=termo, limite=BUSCA_LIMITE)
+        if not resultados_df.empty:
+            st.dataframe(
+                resultados_df.rename(columns={
+                    'origem': 'Origem',
+                    'resultado': 'Resultado',
+                    'detalhe': 'Detalhe',
+                    'relevancia': 'Relevância',
+                }),
+                column_config={"Relevância": st.column_config.NumberColumn(format="%.2f")},
+                hide_index=True,
+            )
+        else:
+            st.info("Nada encontrado para essa busca.")
+
+    st.markdown("---")
+
+
+def renderizar():
+    modo_memoria = st.toggle(
+        "Filtrar em memória",
+        value=os.environ.get("DASHBOARD_MODO_MEMORIA") == "1",
+        help="Carrega piratas e bandos uma vez e aplica os filtros de recompensa sem consultar o banco a cada ajuste.",
+    )
+
+    # As listas dos filtros de todas as seções e a sidebar saem juntas, em paralelo;
+    # as chamadas das seções abaixo já encontram os resultados no cache
+    run_varias(
+        especies="especies",
+        tipos_fruta="tipos_fruta",
+        aliancas="aliancas",
+        tipos_poneglyph="tipos_poneglyph",
+        areas="areas",
+        snapshot_mundo="snapshot_mundo",
+    )
+
+    busca_global()
+    consulta_piratas_por_bando(modo_memoria)
+    consulta_personagens_fruta()
+    consulta_capitaes()
+    consulta_periculosidade(modo_memoria)
+    consulta_poneglyphs()
@@ -0,0 +1,61 @@
+"""Seção "Clusters & Outliers" (k-means 1-D e outliers por IQR)."""
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+import clusters
+import estatisticas
+import graficos
+from paginas.comum import interrompivel, run_lote
+
+
+@interrompivel
+def stats_clusters_outliers():
+    st.header("Clusters e Outliers")
+
+    # Cópia: o frame do cache é compartilhado e aqui ganha a coluna "cluster"
+    origem = run_lote("stats_clusters")["piratas"]
+    df = origem.copy()
+
+    # cluster (k-means 1-D; todos os k saem de uma vez e ficam em cache por versão dos dados)
+    if df["recompensaindividual"].dropna().empty:
+        st.info("Dados insuficientes.")
+    else:
+        agrupamento = clusters.agrupar(df["recompensaindividual"])
+        k = st.slider("Número de clusters", 2, 8, 3)
+        df["cluster"] = agrupamento.rotulos(k, df["recompensaindividual"])
+
+        # Acima de graficos.PONTOS_MAX o scatter vai reduzido (LTTB); a resolução completa é opcional
+        completo = st.checkbox("Resolução completa", key="clusters_resolucao_completa")
+        pontos = df if completo else graficos.reduzir_pontos(df, "recompensaindividual")
+        if len(pontos) < len(df):
+            st.caption(f"Mostrando {len(pontos):,} de {len(df):,} pontos.")
+
+        # Sem x, o plotly usa o índice do frame no eixo x. pontos é refeito a cada
+        # rerun; o conteúdo dele só depende do frame do cache, de k e da resolução
+        fig = graficos.figura(px.scatter, pontos, y="recompensaindividual", color="cluster",
+                              hover_name="nomepirata",
+                              chave=(graficos.assinatura(origem), k, completo))
+        st.plotly_chart(fig, use_container_width=True)
+
+        st.caption("Distribuição das recompensas")
+        st.bar_chart(graficos.histograma(df["recompensaindividual"]))
+
+        inercia = pd.Series(agrupamento.inercia, name="Inércia").loc[2:]
+        st.caption("Inércia por número de clusters")
+        st.line_chart(inercia)
+
+    # outliers (quartis e filtro calculados no banco; só as linhas acima do limite chegam aqui)
+    quartis, outliers = estatisticas.outliers_recompensa()
+    if "cluster" in df:
+        # Cluster de cada outlier, como na tabela original
+        outliers = outliers.merge(df[["nomepirata", "cluster"]], on="nomepirata", how="left")
+
+    st.subheader("Outliers")
+    if quartis["limite"] is not None:
+        st.caption(
+            f"Q1 = {quartis['q1']:,.0f} · Q3 = {quartis['q3']:,.0f} · "
+            f"limite (Q3 + 1,5 × IQR) = {quartis['limite']:,.0f}"
+            + (" · quartis estimados por amostra" if quartis["aproximado"] else "")
+        )
+    st.dataframe(outliers)
@@ -0,0 +1,62 @@
+"""Seção "Coaparições": quem aparece com quem nos capítulos."""
+import psycopg2.errors
+import streamlit as st
+
+import coaparicoes
+import consultas
+from paginas.comum import interrompivel
+
+
+@interrompivel
+def stats_coaparicoes():
+    st.header("Coaparições")
+
+    # Matriz personagem × capítulo em memória; só capítulos novos são lidos do banco
+    try:
+        grafo = coaparicoes.atual()
+    except psycopg2.errors.UndefinedColumn:
+        # Coluna do número do capítulo com outro nome no banco (ver consultas.COLUNA_CAPITULO)
+        st.warning(
+            f"Aparicao_em_capitulo não tem a coluna {consultas.COLUNA_CAPITULO}; "
+            "indique o nome certo em COAPARICOES_COLUNA_CAPITULO."
+        )
+        return
+    if not grafo.nomes:
+        st.info("Nenhuma aparição em capítulo registrada.")
+        return
+
+    centralidade = grafo.centralidade()
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Personagens", f"{len(grafo.nomes):,}")
+    col2.metric("Capítulos", f"{len(grafo.capitulos):,}")
+    col3.metric("Pares que já apareceram juntos", f"{int(centralidade['grau'].sum()) // 2:,}")
+
+    st.subheader("Pares com mais capítulos juntos")
+    st.dataframe(grafo.pares(20).rename(columns={
+        'personagem_1': 'Personagem A',
+        'personagem_2': 'Personagem B',
+        'capitulos_juntos': 'Capítulos Juntos',
+    }), hide_index=True)
+
+    st.subheader("Parceiros de um personagem")
+    # Ordem da centralidade: os personagens mais conectados aparecem primeiro
+    personagem = st.selectbox("Personagem:", centralidade["personagem"].tolist(), key="coaparicoes_personagem")
+    parceiros = grafo.parceiros(personagem, 15)
+    if not parceiros.empty:
+        st.bar_chart(parceiros.set_index("parceiro")["capitulos_juntos"], horizontal=True)
+    else:
+        st.info("Esse personagem nunca apareceu junto com outro.")
+
+    st.subheader("Centralidade")
+    st.caption(
+        "Grau: personagens distintos com quem apareceu · Força: soma dos capítulos em comum · "
+        "Autovetor: conexão com personagens que também são centrais (1 = o mais central)."
+    )
+    st.dataframe(centralidade.head(50).rename(columns={
+        'personagem': 'Personagem',
+        'aparicoes': 'Aparições',
+        'grau': 'Grau',
+        'forca': 'Força',
+        'autovetor': 'Autovetor',
+    }), hide_index=True)
@@ -0,0 +1,155 @@
+"""Peças usadas por todas as páginas: acesso aos dados, paginação e nomes de colunas."""
+import functools
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from streamlit.runtime.scriptrunner_utils.script_requests import ScriptRequestType
+
+import aquecimento
+import dados
+import db
+import snapshot
+
+
+#Uma consulta ainda interessa enquanto o Streamlit não tiver um rerun/stop que vá
+#interromper esta execução. É a mesma regra do próximo st.* (que lança o
+#RerunException): STOP, ou RERUN que não seja só de fragmentos acionados por
+#widgets. Lê atributos internos do Streamlit; se eles mudarem, devolve None
+#(não dá para saber) e as consultas simplesmente não são canceladas.
+def execucao_superada():
+    ctx = get_script_run_ctx(suppress_warning=True)
+    requisicoes = getattr(ctx, "script_requests", None)
+    estado = getattr(requisicoes, "_state", None)
+    if estado is None:
+        return None
+    if estado == ScriptRequestType.STOP:
+        return True
+    if estado == ScriptRequestType.RERUN:
+        rerun = getattr(requisicoes, "_rerun_data", None)
+        return not (rerun is not None and rerun.fragment_id_queue and not rerun.is_fragment_scoped_rerun)
+    return False
+
+
+db.definir_verificacao(execucao_superada)
+
+
+def interrompivel(funcao):
+    #Consulta cancelada sem resultado antigo para mostrar: o Streamlit já vai
+    #reexecutar (ou parar), então esta execução termina aqui, sem erro na tela.
+    #Com resultado antigo, ele é mostrado com um aviso
+    @functools.wraps(funcao)
+    def chamada(*args, **kwargs):
+        try:
+            resultado = funcao(*args, **kwargs)
+        except db.ConsultaCancelada:
+            st.stop()
+        avisar_resultados_antigos()
+        return resultado
+    return chamada
+
+
+#Consulta que passou do tempo limite (ou foi cancelada) e foi respondida com o
+#último resultado guardado, já vencido: quem está olhando precisa saber
+def avisar_resultados_antigos():
+    vencidos = dados.resultados_antigos()
+    if vencidos:
+        minutos = max(segundos for _, segundos in vencidos) / 60
+        st.warning(
+            "O banco não respondeu a tempo; parte dos dados é o último resultado "
+            f"guardado, vencido há até {minutos:.0f} min."
+        )
+
+
+#Função geral de execução: consultas do registro, cada uma em uma conexão do pool.
+#O cache (dados.py) é indexado pelo nome + parâmetros, não pelo texto do SQL,
+#e é invalidado por tabela quando o banco avisa que ela mudou.
+@interrompivel
+def run_consulta(nome, **params):
+    return dados.consulta(nome, **params)
+
+
+#Modo em memória: a base é carregada uma vez e compartilhada entre sessões (sem cópia)
+@interrompivel
+def base_memoria():
+    return dados.base_memoria()
+
+
+#Uma thread por processo atualiza a view da sidebar periodicamente
+@st.cache_resource
+def iniciar_snapshot():
+    return snapshot.iniciar_atualizacao_periodica()
+
+
+#Uma thread por processo escuta as alterações de tabelas e limpa o cache
+@st.cache_resource
+def iniciar_invalidacao():
+    return dados.iniciar_invalidacao()
+
+
+#Uma thread por processo deixa no cache o que a primeira visita vai pedir
+@st.cache_resource
+def iniciar_aquecimento():
+    return aquecimento.iniciar()
+
+
+#Abas de estatísticas: todas as consultas da aba saem juntas e voltam em um dict
+@interrompivel
+def run_lote(nome_lote):
+    return dados.lote(nome_lote)
+
+
+#Várias consultas de uma vez, executadas ao mesmo tempo (as que não estão no cache)
+@interrompivel
+def run_varias(**pedidos):
+    return dados.varias({chave: (nome, {}) for chave, nome in pedidos.items()})
+
+
+#Páginas das consultas grandes (keyset); cada página fica no cache separadamente
+@interrompivel
+def run_pagina(nome, apos, tamanho, **params):
+    return dados.pagina(nome, apos, tamanho, **params)
+
+
+def estado_paginacao(chave, filtros):
+    #Pilha com o início de cada página já visitada; volta à primeira se os filtros mudarem
+    estado = st.session_state.setdefault(chave, {"filtros": None, "pilha": [None]})
+    if estado["filtros"] != filtros:
+        estado["filtros"] = filtros
+        estado["pilha"] = [None]
+    return estado
+
+
+def navegacao_paginas(chave, estado, proxima):
+    pilha = estado["pilha"]
+    c1, c2, c3 = st.columns([1, 1, 6])
+    c1.button("◀ Anterior", key=f"{chave}_anterior", disabled=len(pilha) == 1, on_click=pilha.pop)
+    c2.button("Próxima ▶", key=f"{chave}_proxima", disabled=proxima is None,
+              on_click=pilha.append, args=(proxima,))
+    c3.caption(f"Página {len(pilha)}")
+
+
+def seletor_tamanho_pagina(chave):
+    return st.selectbox("Linhas por página:", [50, 100, 500, 1000], index=1, key=f"{chave}_tamanho")
+
+
+def opcional(valor, todos):
+    #"Todas"/"Todos" no selectbox vira NULL (sem filtro) na consulta
+    return None if valor == todos else valor
+
+
+# Dicionário para renomear as colunas para um formato mais legível
+col_names = {
+    'nomepersonagem': 'Nome do Personagem',
+    'recompensa': 'Recompensa',
+    'nomebando': 'Nome do Bando',
+    'nomealianca': 'Nome da Aliança',
+    'nomenavio': 'Nome do Navio',
+    'alcunha': 'Alcunha',
+    'Recompensa': 'Recompensa Individual',
+    'recompensatotalbando': 'Recompensa Total do Bando',
+    'nomeespecie': 'Espécie',
+    'nomefruta': 'Nome da Fruta',
+    'tipofruta': 'Tipo da Fruta',
+    'recompensacombinada': 'Recompensa Combinada',
+    'rn': 'Ranking'
+}
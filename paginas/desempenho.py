@@ -0,0 +1,39 @@
+"""Painel "Performance" (escondido): métricas das consultas deste processo."""
+import os
+
+import pandas as pd
+import streamlit as st
+
+import metricas
+import partida
+
+
+def painel_desempenho():
+    st.header("Performance")
+    st.caption("Métricas deste processo desde o início (ou desde a última limpeza).")
+
+    resumo = pd.DataFrame(metricas.resumo())
+    if resumo.empty:
+        st.info("Nenhuma consulta registrada ainda.")
+    else:
+        st.dataframe(resumo, hide_index=True)
+
+        executadas = resumo.dropna(subset=["p95_ms"])
+        if not executadas.empty:
+            st.subheader("Latência p50/p95 por consulta (ms)")
+            st.bar_chart(executadas.set_index("consulta")[["p50_ms", "p95_ms"]], stack=False)
+
+    partida_df = pd.DataFrame(partida.relatorio())
+    if not partida_df.empty:
+        st.subheader("Partida do processo (ms)")
+        st.dataframe(partida_df, hide_index=True)
+
+    c1, c2, c3 = st.columns(3)
+    c1.download_button("Exportar JSON", metricas.exportar_json(), "metricas.json", "application/json")
+    c2.download_button("Exportar Prometheus", metricas.exportar_prometheus(), "metricas.prom", "text/plain")
+    c3.button("Limpar métricas", on_click=metricas.limpar)
+
+
+def painel_desempenho_visivel():
+    #Aba escondida: aparece com ?perf=1 na URL ou DASHBOARD_PERF=1 no ambiente
+    return st.query_params.get("perf") == "1" or os.environ.get("DASHBOARD_PERF") == "1"
@@ -0,0 +1,179 @@
+"""Seções da aba de estatísticas (cada uma lê um lote de consultas)."""
+import plotly.express as px
+import streamlit as st
+
+import graficos
+from paginas.comum import run_lote
+
+
+def stats_piratas():
+    st.header("giPiratas — Estatísticas")
+    dados = run_lote("stats_piratas")
+
+    df_count = dados["total"]
+    st.metric("Total de Piratas", int(df_count.iloc[0]['total_piratas']))
+
+    stats = dados["resumo"]
+
+    row = stats.iloc[0]
+    c1, c2, c3, c4, c5 = st.columns(5)
+    c1.metric("Média", f"{row['media']:,}")
+    c2.metric("Mediana", f"{row['mediana']:,}")
+    c3.metric("Desvio Padrão", f"{row['desvio']:,}")
+    c4.metric("Menor", f"{row['minimo']:,}")
+    c5.metric("Maior", f"{row['maximo']:,}")
+
+    # Top 10 piratas
+    top10 = dados["top10"]
+
+    if not top10.empty:
+        st.subheader("Top 10 Piratas por Recompensa")
+        fig = graficos.figura(px.bar, top10, x="nomepirata", y="recompensa", text="recompensa",
+                              traces={"texttemplate": '%{text:,}'})
+        st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(top10)
+
+    shichi = dados["shichibukai"]
+    if not shichi.empty:
+        st.metric("Shichibukai", int(shichi.iloc[0]['total_shichibukai']))
+
+
+def stats_bandos():
+    st.header("Bandos — Análises")
+    dados = run_lote("stats_bandos")
+
+    total = dados["total"]
+    st.metric("Total de Bandos", int(total.iloc[0]['total_bandos']))
+
+    avg = dados["media"]
+    st.metric("Média de Recompensa Total", f"{avg.iloc[0]['media_bando']:,}")
+
+    # Top bandos
+    top = dados["top"]
+
+    if not top.empty:
+        fig = graficos.figura(
+            px.bar,
+            top,
+            y="nomebando",
+            x="recompensatotalbando",
+            orientation="h",
+            text="recompensatotalbando",
+            layout={"yaxis": {"categoryorder": "total ascending"}},
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(top)
+
+    # Relação capitão vs bando
+    rel = dados["capitao"]
+
+    if not rel.empty:
+        st.subheader("Multiplicador: Capitão vs Bando")
+        st.dataframe(rel)
+
+def stats_aliancas():
+    st.header("Alianças")
+    dados = run_lote("stats_aliancas")
+
+    total = dados["total"]
+    st.metric("Total de Alianças", int(total.iloc[0]['total_aliancas']))
+
+    top = dados["top"]
+
+    if not top.empty:
+        fig = graficos.figura(px.bar, top, x="nomealianca", y="recompensatotalalianca", text="recompensatotalalianca")
+        st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(top)
+
+    bandos = dados["bandos"]
+
+    if not bandos.empty:
+        st.subheader("Bandos por Aliança")
+        st.dataframe(bandos)
+
+def stats_frutas():
+    st.header("Akuma no Mi")
+    dados = run_lote("stats_frutas")
+
+    cnt = dados["total"]
+    st.metric("Total de Frutas", int(cnt.iloc[0]['total_frutas']))
+
+    tipos = dados["tipos"]
+
+    if not tipos.empty:
+        fig = graficos.figura(px.pie, tipos, names="tipofruta", values="total")
+        st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(tipos)
+
+    media = dados["media"]
+
+    if not media.empty:
+        fig = graficos.figura(px.bar, media, x="tipofruta", y="mediarecompensa", text="mediarecompensa")
+        st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(media)
+
+def stats_especies():
+    st.header("Espécies")
+    dados = run_lote("stats_especies")
+
+    qtd = dados["total"]
+    st.metric("Total de Espécies", int(qtd.iloc[0]['total_especies']))
+
+    personagens = dados["personagens"]
+
+    if not personagens.empty:
+        st.subheader("Personagens por Espécie")
+        st.dataframe(personagens)
+
+    media = dados["media"]
+
+    if not media.empty:
+        fig = graficos.figura(px.bar, media, x="nomeespecie", y="mediarecompensa")
+        st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(media)
+
+def stats_navios():
+    st.header("Navios")
+    dados = run_lote("stats_navios")
+
+    total = dados["total"]
+    st.metric("Total de Navios", int(total.iloc[0]['total_navios']))
+
+    por_bando = dados["por_bando"]
+
+    st.subheader("Navios por Bando")
+    st.dataframe(por_bando)
+
+
+def stats_ilhas_capitulos():
+    st.header("Ilhas & Capítulos")
+    dados = run_lote("stats_ilhas_capitulos")
+
+    ilhas = dados["ilhas"]
+    st.metric("Total de Ilhas", int(ilhas.iloc[0]['total_ilhas']))
+
+    cap = dados["capitulos"]
+
+    if not cap.empty:
+        st.subheader("Capítulos por Ilha")
+        st.dataframe(cap)
+
+    aparicoes = dados["aparicoes"]
+
+    if not aparicoes.empty:
+        st.subheader("Personagens com mais aparições")
+        st.dataframe(aparicoes)
+
+
+def stats_habilidades():
+    st.header("Habilidades")
+    dados = run_lote("stats_habilidades")
+
+    total = dados["total"]
+    st.metric("Total de Habilidades", int(total.iloc[0]['total_habs']))
+
+    ranking = dados["ranking"]
+
+    if not ranking.empty:
+        st.subheader("Personagens com mais habilidades")
+        st.dataframe(ranking)
@@ -0,0 +1,65 @@
+"""Sidebar "Estatísticas do Mundo" (uma linha da view mv_estatisticas_mundo)."""
+import streamlit as st
+
+from paginas.comum import iniciar_snapshot, run_consulta
+
+
+def sidebar_estatisticas():
+    st.sidebar.header("Estatísticas do Mundo")
+    iniciar_snapshot()
+
+    #Recordes de recompensa
+    st.sidebar.subheader("Os Mais Procurados")
+
+    # Todas as métricas da sidebar vêm de uma linha só (view mv_estatisticas_mundo)
+    mundo_df = run_consulta("snapshot_mundo")
+
+    if not mundo_df.empty:
+        # Dados do Bando
+        nome_bando = mundo_df.iloc[0]['nome_bando']
+        valor_bando = mundo_df.iloc[0]['valor_bando']
+        
+        # Dados do Pirata
+        nome_pirata = mundo_df.iloc[0]['nome_pirata']
+        valor_pirata = mundo_df.iloc[0]['valor_pirata']
+
+        st.sidebar.metric(
+            label="Maior Recompensa (Bando)",
+            value=f"B$ {valor_bando:,.0f}",
+            delta=nome_bando
+        )
+        
+        st.sidebar.metric(
+            label="Maior Recompensa (Individual)",
+            value=f"B$ {valor_pirata:,.0f}",
+            delta=nome_pirata
+        )
+
+    #Pop e frutas
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("População & Poder")
+
+    if not mundo_df.empty:
+        #Totais Gerais
+        c1, c2 = st.sidebar.columns(2)
+        c1.metric(" Piratas", mundo_df.iloc[0]['qtd_piratas'])
+        c2.metric("Marinha", mundo_df.iloc[0]['qtd_marinha'])
+        
+        st.sidebar.markdown("---")
+        # Detalhe Akuma no Mi
+        st.sidebar.markdown("**Akuma no Mi (Distribuição)**")
+        col_f1, col_f2, col_f3 = st.sidebar.columns(3)
+        
+        #métricas
+        col_f1.metric("Paramecia", mundo_df.iloc[0]['qtd_paramecia'])
+        col_f2.metric("Zoan", mundo_df.iloc[0]['qtd_zoan'], help="Inclui Míticas, Ancestrais e Artificiais")
+        col_f3.metric("Logia", mundo_df.iloc[0]['qtd_logia'])
+
+    #Geografia e navios
+    st.sidebar.markdown("---")
+    st.sidebar.subheader(" Geografia & Navios")
+
+    if not mundo_df.empty:
+        g1, g2 = st.sidebar.columns(2)
+        g1.metric("Ilhas Registradas", mundo_df.iloc[0]['total_ilhas'])
+        g2.metric("Navios no Mar", mundo_df.iloc[0]['navios_ativos'])
@@ -0,0 +1,89 @@
+"""Tempos de partida do processo do dashboard.
+
+app.py importa este módulo antes de tudo, então INICIO marca o começo do
+processo. Cada etapa (imports, primeira execução do script, carga das seções)
+é registrada só na primeira vez, por processo; o painel "Performance" mostra
+o relatório e ele também vai para o log quando a primeira execução termina.
+
+Uso: python partida.py
+     Mede, cada um em um processo Python novo, o tempo de import das
+     dependências pesadas do app.
+"""
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+INICIO = time.perf_counter()
+
+# Dependências que pesam na partida (só as necessárias vão para o começo do app.py)
+MODULOS_PESADOS = (
+    "streamlit",
+    "pandas",
+    "psycopg2",
+    "pyarrow.csv",
+    "plotly.express",
+    "sklearn.cluster",
+)
+
+_etapas = {}
+_lock = threading.Lock()
+_impresso = False
+
+
+def _registrar(etapa, duracao):
+    with _lock:
+        if etapa not in _etapas:
+            _etapas[etapa] = {
+                "desde_inicio_ms": (time.perf_counter() - INICIO) * 1000,
+                "duracao_ms": None if duracao is None else duracao * 1000,
+            }
+
+
+def marcar(etapa):
+    """Registra o instante em que a etapa foi atingida (só a primeira vez)."""
+    _registrar(etapa, None)
+
+
+@contextmanager
+def medir(etapa):
+    """Registra a duração do bloco e o instante em que terminou (só a primeira vez)."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        _registrar(etapa, time.perf_counter() - inicio)
+
+
+def relatorio():
+    with _lock:
+        return [{"etapa": etapa, **tempos} for etapa, tempos in _etapas.items()]
+
+
+def concluir(etapa="primeira_execucao"):
+    """Marca o fim da primeira execução do script e imprime o relatório uma vez."""
+    global _impresso
+    marcar(etapa)
+    with _lock:
+        if _impresso:
+            return
+        _impresso = True
+    for linha in relatorio():
+        duracao = "" if linha["duracao_ms"] is None else f" (duração {linha['duracao_ms']:.0f} ms)"
+        print(f"[partida] {linha['etapa']}: {linha['desde_inicio_ms']:.0f} ms{duracao}")
+
+
+def medir_imports(modulos=MODULOS_PESADOS):
+    """Tempo de import de cada módulo em um processo novo (sem nada em cache)."""
+    tempos = {}
+    for modulo in modulos:
+        codigo = f"import time; t = time.perf_counter(); import {modulo}; print(time.perf_counter() - t)"
+        resultado = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True)
+        tempos[modulo] = float(resultado.stdout) * 1000 if resultado.returncode == 0 else None
+    return tempos
+
+
+if __name__ == "__main__":
+    for modulo, ms in medir_imports().items():
+        print(f"{modulo}: {'não instalado' if ms is None else f'{ms:.0f} ms'}")
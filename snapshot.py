@@ -0,0 +1,57 @@
+"""Atualização periódica da view mv_estatisticas_mundo (sidebar).
+
+Roda dentro do app em uma thread de fundo, ou avulso via cron:
+    python snapshot.py
+"""
+import os
+import threading
+import time
+
+import migracoes
+
+INTERVALO_SEGUNDOS = float(os.environ.get("SNAPSHOT_REFRESH_SECONDS", "300"))
+
+# Chave do advisory lock: com várias réplicas, só uma faz o REFRESH por vez
+_CHAVE_LOCK = 741_001
+
+
+def atualizar_snapshot(conn):
+    """Faz o REFRESH se nenhuma outra réplica estiver fazendo. Devolve True se atualizou."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_try_advisory_lock(%s);", (_CHAVE_LOCK,))
+        if not cur.fetchone()[0]:
+            return False
+        try:
+            cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_estatisticas_mundo;")
+            # REFRESH não dispara triggers: avisa o cache de resultados diretamente
+            cur.execute("SELECT pg_notify('dashboard_invalidacao', 'mv_estatisticas_mundo');")
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s);", (_CHAVE_LOCK,))
+    return True
+
+
+def _loop(intervalo):
+    while True:
+        time.sleep(intervalo)
+        try:
+            conn = migracoes.conectar()
+            try:
+                atualizar_snapshot(conn)
+            finally:
+                conn.close()
+        except Exception as exc:  # a thread não pode morrer por uma falha pontual
+            print(f"[snapshot] falha ao atualizar mv_estatisticas_mundo: {exc}")
+
+
+def iniciar_atualizacao_periodica(intervalo=INTERVALO_SEGUNDOS):
+    thread = threading.Thread(target=_loop, args=(intervalo,), name="snapshot-mundo", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    conn = migracoes.conectar()
+    try:
+        print("Atualizado." if atualizar_snapshot(conn) else "Outra réplica já está atualizando.")
+    finally:
+        conn.close()
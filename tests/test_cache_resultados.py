@@ -0,0 +1,77 @@
+import time
+
+import numpy as np
+
+import cache_resultados as cr
+
+
+def _entrada(tamanho, tabelas=("pirata",), ttl=60):
+    return cr.Entrada(object(), time.time() + ttl, tabelas, tamanho)
+
+
+def test_lru_conta_bytes_e_expulsa_os_mais_antigos():
+    cache = cr.CacheLocal(max_bytes=100)
+    cache.guardar("a", _entrada(40))
+    cache.guardar("b", _entrada(40))
+    assert cache._bytes == 80
+
+    cache.obter("a")  # "a" passa a ser a mais recente
+    cache.guardar("c", _entrada(40))
+
+    assert cache._bytes == 80
+    assert cache.obter("b") is None
+    assert cache.obter("a") is not None and cache.obter("c") is not None
+
+
+def test_lru_substituir_chave_nao_conta_duas_vezes():
+    cache = cr.CacheLocal(max_bytes=100)
+    cache.guardar("a", _entrada(30))
+    cache.guardar("a", _entrada(50))
+    assert cache._bytes == 50
+
+
+def test_lru_ignora_entrada_maior_que_o_limite():
+    cache = cr.CacheLocal(max_bytes=100)
+    cache.guardar("a", _entrada(101))
+    assert cache.obter("a") is None
+    assert cache._bytes == 0
+
+
+def test_invalidar_tabela_remove_so_as_dependentes():
+    cache = cr.CacheLocal(max_bytes=1_000)
+    cache.guardar("piratas", _entrada(10, ("pirata",)))
+    cache.guardar("bandos", _entrada(20, ("bando",)))
+    cache.guardar("juncao", _entrada(30, ("pirata", "bando")))
+
+    cache.invalidar_tabela("pirata")
+
+    assert cache.obter("piratas") is None and cache.obter("juncao") is None
+    assert cache.obter("bandos") is not None
+    assert cache._bytes == 20
+    assert "pirata" not in cache._por_tabela
+    assert cache._por_tabela["bando"] == {"bandos"}
+
+
+def test_resultado_calculado_antes_da_invalidacao_nao_e_guardado():
+    cache = cr.CacheEmCamadas(cr.CacheLocal())
+    geracao = cache.geracao({"pirata"})
+    outra = cache.geracao({"bando"})
+
+    cache.invalidar_tabela("pirata")
+
+    assert not cache.guardar("velho", _entrada(10, ("pirata",)), geracao=geracao)
+    assert cache.obter("velho") is None
+    assert cache.guardar("bandos", _entrada(10, ("bando",)), geracao=outra)
+
+
+
+class _ComNbytes:
+    nbytes = 123
+
+    def __reduce__(self):
+        raise AssertionError("tamanho() não deveria serializar o valor")
+
+
+def test_tamanho_usa_nbytes_sem_pickle():
+    assert cr.tamanho(np.zeros(10)) == 80
+    assert cr.tamanho({"a": _ComNbytes(), "b": (_ComNbytes(),)}) == 246
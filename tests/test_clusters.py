@@ -0,0 +1,58 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+import clusters
+
+
+def _inercia_forca_bruta(x, w, k):
+    # Todas as partições de x (ordenado) em k intervalos contíguos
+    melhor = np.inf
+    for cortes in combinations(range(1, len(x)), k - 1):
+        limites = (0,) + cortes + (len(x),)
+        total = 0.0
+        for a, b in zip(limites, limites[1:]):
+            media = np.average(x[a:b], weights=w[a:b])
+            total += float(np.sum(w[a:b] * (x[a:b] - media) ** 2))
+        melhor = min(melhor, total)
+    return melhor
+
+
+@pytest.mark.parametrize("semente", range(20))
+def test_dp_igual_a_forca_bruta(semente):
+    rng = np.random.default_rng(semente)
+    valores = rng.choice(rng.integers(0, 5_000_000_000, size=9), size=30)
+    x, w = np.unique(valores, return_counts=True)
+    w = w.astype(float)
+
+    agrupamento = clusters.agrupar(valores)
+    # As somas de prefixo perdem alguns bits com recompensas na casa dos bilhões:
+    # a tolerância é relativa à inércia total
+    tolerancia = 1e-9 * agrupamento.inercia[1]
+
+    for k in range(1, min(clusters.K_MAX, len(x)) + 1):
+        esperado = _inercia_forca_bruta(x.astype(float), w, k)
+        assert agrupamento.inercia[k] == pytest.approx(esperado, abs=tolerancia)
+        # Os rótulos formam k intervalos crescentes e reproduzem a inércia ótima
+        rotulos = agrupamento.rotulos(k, x)
+        assert np.all(np.diff(rotulos) >= 0)
+        assert len(np.unique(rotulos)) == k
+        inercia = sum(
+            float(np.sum(w[rotulos == r] * (x[rotulos == r] - np.average(x[rotulos == r], weights=w[rotulos == r])) ** 2))
+            for r in np.unique(rotulos)
+        )
+        assert inercia == pytest.approx(esperado, abs=tolerancia)
+
+
+def test_rotulos_ignoram_nulos():
+    agrupamento = clusters.agrupar([1.0, 2.0, None, 100.0, 101.0])
+    rotulos = agrupamento.rotulos(2, [1.0, None, 101.0])
+    assert rotulos[0] == 0 and rotulos[2] == 1
+    assert np.isnan(rotulos[1])
+
+
+def test_k_maior_que_valores_distintos():
+    agrupamento = clusters.agrupar([5.0, 5.0, 7.0])
+    assert agrupamento.k_max == 2
+    assert agrupamento.inercia[2] == pytest.approx(0.0)
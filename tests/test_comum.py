@@ -0,0 +1,46 @@
+import types
+
+import pytest
+from streamlit.runtime.scriptrunner_utils.script_requests import RerunData, ScriptRequests
+
+from paginas import comum
+
+# execucao_superada lê atributos internos de ScriptRequests; se uma versão nova
+# do Streamlit os mudar, estes testes falham antes do cancelamento parar em silêncio
+
+
+@pytest.fixture
+def requisicoes(monkeypatch):
+    requisicoes = ScriptRequests()
+    ctx = types.SimpleNamespace(script_requests=requisicoes)
+    monkeypatch.setattr(comum, "get_script_run_ctx", lambda suppress_warning=False: ctx)
+    return requisicoes
+
+
+def test_atributos_internos_existem(requisicoes):
+    assert hasattr(requisicoes, "_state")
+    assert hasattr(requisicoes, "_rerun_data")
+
+
+def test_execucao_continua(requisicoes):
+    assert comum.execucao_superada() is False
+
+
+def test_stop_supera(requisicoes):
+    requisicoes.request_stop()
+    assert comum.execucao_superada() is True
+
+
+def test_rerun_supera(requisicoes):
+    requisicoes.request_rerun(RerunData())
+    assert comum.execucao_superada() is True
+
+
+def test_rerun_de_fragmento_nao_supera(requisicoes):
+    requisicoes.request_rerun(RerunData(fragment_id_queue=["fragmento"], is_fragment_scoped_rerun=False))
+    assert comum.execucao_superada() is False
+
+
+def test_sem_contexto(monkeypatch):
+    monkeypatch.setattr(comum, "get_script_run_ctx", lambda suppress_warning=False: None)
+    assert comum.execucao_superada() is None
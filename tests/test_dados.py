@@ -0,0 +1,44 @@
+import threading
+
+import dados
+
+
+def test_invalidacao_solta_execucao_em_andamento():
+    chamadas = []
+    libera = threading.Event()
+
+    def calcular():
+        chamadas.append(1)
+        libera.wait(5)
+        return len(chamadas)
+
+    pedido = dados.Pedido("teste", "teste:voo", frozenset({"pirata"}), calcular, False)
+    voos, novos = dados._embarcar({pedido.chave: pedido}, esperar=False)
+    dados._decolar({pedido.chave: pedido}, voos, lambda: {pedido.chave: pedido.calcular()})
+
+    # Outra tabela não solta nada; pirata solta: o próximo pedido dispara outra execução
+    dados._soltar_voos("bando")
+    assert dados._embarcar({pedido.chave: pedido}, esperar=False)[1] == []
+    dados._soltar_voos("pirata")
+    novos_voos, novos = dados._embarcar({pedido.chave: pedido}, esperar=False)
+    assert novos == [pedido.chave]
+    assert novos_voos[pedido.chave] is not voos[pedido.chave]
+
+    dados._decolar({pedido.chave: pedido}, novos_voos, lambda: {pedido.chave: pedido.calcular()})
+    libera.set()
+    assert voos[pedido.chave].futuro.result(5) in (1, 2)
+    assert novos_voos[pedido.chave].futuro.result(5) in (1, 2)
+    assert len(chamadas) == 2
+
+
+def test_lider_usa_resultado_guardado_antes_do_embarque():
+    # Simula outra execução que terminou e guardou entre a falta no cache e o _voar
+    chamadas = []
+    pedido = dados.Pedido("teste", "teste:guardado", frozenset({"pirata"}), lambda: chamadas.append(1), False)
+    dados._guardar(pedido, "pronto")
+
+    resultado = dados._voar({pedido.chave: pedido}, lambda chaves: {pedido.chave: pedido.calcular()})
+
+    assert resultado == {pedido.chave: "pronto"}
+    assert chamadas == []
+    assert pedido.chave not in dados._voos
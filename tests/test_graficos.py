@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import graficos
+
+
+@pytest.mark.parametrize("total,n", [(10_000, 500), (1_001, 3), (50, 49)])
+def test_lttb_mantem_extremos_e_respeita_n(total, n):
+    rng = np.random.default_rng(0)
+    x = np.arange(total, dtype=float)
+    y = rng.normal(size=total).cumsum()
+
+    indices = graficos.lttb(x, y, n)
+
+    assert len(indices) == n
+    assert indices[0] == 0 and indices[-1] == total - 1
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_sem_reducao():
+    assert list(graficos.lttb(np.arange(5), np.arange(5), 10)) == [0, 1, 2, 3, 4]
+
+
+def test_lttb_mantem_pico():
+    y = np.zeros(1_000)
+    y[537] = 100.0
+    assert 537 in graficos.lttb(np.arange(1_000), y, 50)
+
+
+def test_reduzir_pontos():
+    df = pd.DataFrame({"y": np.arange(5_000, dtype=float)})
+    df.loc[10, "y"] = np.nan
+
+    reduzido = graficos.reduzir_pontos(df, "y", max_pontos=100)
+
+    assert len(reduzido) == 100
+    assert reduzido["y"].notna().all()
+    assert reduzido.index[0] == 0 and reduzido.index[-1] == 4_999
+
+
+def test_figura_distingue_argumentos_grandes():
+    px = pytest.importorskip("plotly.express")
+    df = pd.DataFrame({"x": np.arange(1_000), "y": np.zeros(1_000)})
+    cores = pd.Series(["a"] * 1_000)
+    outras = cores.copy()
+    # Diferença no meio da série, que o repr omite
+    outras.iloc[500] = "b"
+
+    fig_a = graficos.figura(px.scatter, df, x="x", y="y", color=cores)
+    fig_b = graficos.figura(px.scatter, df, x="x", y="y", color=outras)
+
+    assert len(fig_a.data) == 1 and len(fig_b.data) == 2
+
+
+def test_figura_devolve_copia():
+    px = pytest.importorskip("plotly.express")
+    df = pd.DataFrame({"x": [1, 2, 3], "y": [3, 1, 2]})
+
+    fig = graficos.figura(px.bar, df, x="x", y="y")
+    fig.update_layout(title_text="alterada")
+
+    assert graficos.figura(px.bar, df, x="x", y="y").layout.title.text is None
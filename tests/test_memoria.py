@@ -0,0 +1,88 @@
+import math
+
+import pandas as pd
+import pytest
+
+import cache_resultados
+import memoria
+
+NULO = None
+
+# Bando B sem recompensas (SUM só de NULLs), pirata sem bando, bando sem total
+PIRATAS = [
+    # nomepersonagem, alcunha, recompensa, nomebando, recompensatotalbando, nomealianca
+    ("a1", "x", 500, "A", 1600, "Norte"),
+    ("a2", "x", NULO, "A", 1600, "Norte"),
+    ("a3", "x", 1000, "A", 1600, "Norte"),
+    ("a4", "x", 100, "A", 1600, "Norte"),
+    ("b1", "x", NULO, "B", 0, "Sul"),
+    ("c1", "x", 700, "C", 1400, NULO),
+    ("c2", "x", 700, "C", 1400, NULO),
+    ("d1", "x", 300, "D", NULO, "Sul"),
+    ("e1", "x", 50, "E", 50, "Sul"),
+    ("s1", "x", 900, NULO, NULO, NULO),
+]
+
+
+@pytest.fixture(scope="module")
+def base():
+    return memoria.BaseMemoria(pd.DataFrame(PIRATAS, columns=memoria.COLUNAS_PIRATAS))
+
+
+def _desc_nulos_primeiro(valor):
+    # ORDER BY ... DESC do Postgres: NULL é o maior valor
+    return (0, 0) if valor is None else (1, -valor)
+
+
+def _piratas_por_bando_sql(min_recompensa):
+    # WHERE RecompensaTotalBando >= min ORDER BY RecompensaTotalBando DESC, Recompensa DESC
+    linhas = [p for p in PIRATAS if p[4] is not None and p[4] >= min_recompensa]
+    return sorted(linhas, key=lambda p: (-p[4], _desc_nulos_primeiro(p[2])))
+
+
+def _periculosidade_sql(num_membros, min_perigo, alianca=None):
+    # ROW_NUMBER() OVER (PARTITION BY NomeBando ORDER BY Recompensa DESC) <= n,
+    # SUM(...) ignorando NULL e HAVING SUM(...) >= min (SUM só de NULL é NULL)
+    resultado = {}
+    for bando in {p[3] for p in PIRATAS if p[3] is not None}:
+        membros = sorted((p for p in PIRATAS if p[3] == bando), key=lambda p: _desc_nulos_primeiro(p[2]))
+        if alianca is not None and membros[0][5] != alianca:
+            continue
+        valores = [p[2] for p in membros[:num_membros] if p[2] is not None]
+        if valores and sum(valores) >= min_perigo:
+            resultado[bando] = sum(valores)
+    return resultado
+
+
+@pytest.mark.parametrize("min_recompensa", [0, 1, 50, 1400, 1500, 1600, 10_000])
+def test_piratas_por_bando(base, min_recompensa):
+    esperado = _piratas_por_bando_sql(min_recompensa)
+    obtido = base.piratas_por_bando(min_recompensa)
+
+    assert len(obtido) == len(esperado)
+    # Empates na ordem do SQL podem vir em qualquer ordem: compara as chaves e os nomes
+    chaves = [
+        (-t, _desc_nulos_primeiro(None if math.isnan(r) else r))
+        for t, r in zip(obtido["recompensatotalbando"], obtido["recompensa"])
+    ]
+    assert chaves == [(-p[4], _desc_nulos_primeiro(p[2])) for p in esperado]
+    assert sorted(obtido["nomepersonagem"]) == sorted(p[0] for p in esperado)
+
+
+@pytest.mark.parametrize("num_membros", [1, 2, 3, 20])
+@pytest.mark.parametrize("min_perigo", [0, 600, 1500])
+@pytest.mark.parametrize("alianca", [None, "Norte", "Sul"])
+def test_periculosidade(base, num_membros, min_perigo, alianca):
+    esperado = _periculosidade_sql(num_membros, min_perigo, alianca)
+    obtido = base.periculosidade(num_membros, min_perigo, alianca)
+
+    assert dict(zip(obtido["nomebando"], obtido["recompensacombinada"])) == esperado
+    assert list(obtido["recompensacombinada"]) == sorted(esperado.values(), reverse=True)
+
+
+def test_nbytes_soma_frames_e_arrays(base):
+    # Frame pequeno: a "amostra" das colunas de texto é a coluna inteira
+    frames = base.piratas.memory_usage(deep=True).sum() + base._bandos.memory_usage(deep=True).sum()
+    arrays = base._soma_acum.nbytes + base._inicio.nbytes
+    assert base.nbytes >= frames + arrays
+    assert base.nbytes == cache_resultados.tamanho(base)